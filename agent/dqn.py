@@ -2,19 +2,220 @@ from keras.models import Sequential
 from keras.layers import Dense, Flatten, Conv2D
 from keras.optimizers import Adam
 from rl.agents.dqn import DQNAgent
-from rl.memory import SequentialMemory
+from rl.memory import Experience, Memory, SequentialMemory
 from rl.callbacks import FileLogger, ModelIntervalCheckpoint
 from configurations import LOGGER
+from gym_trading.utils.actor_learner import ActorLearner
+from gym_trading.utils.numpy_policy import export_keras_model
+from gym_trading.utils.replay_memory import ReplayMemory
+import functools
+import numpy as np
 import os
 import gym
 import gym_trading
 
 
+def create_model(name: str, features_shape: tuple,
+                 number_of_actions: int) -> Sequential:
+    """
+    Create the default MLP or CNN model.
+
+    :param name: Neural network type ['mlp' or 'cnn']
+    :param features_shape: input shape, including the frame stack
+    :param number_of_actions: number of actions in the environment
+    :return: neural network
+    """
+    LOGGER.info("creating model for {}".format(name))
+    if name == 'cnn':
+        return _create_cnn_model(features_shape=features_shape,
+                                 number_of_actions=number_of_actions)
+    elif name == 'mlp':
+        return _create_mlp_model(features_shape=features_shape,
+                                 number_of_actions=number_of_actions)
+
+
+def _create_cnn_model(features_shape: tuple, number_of_actions: int) -> Sequential:
+    """
+    Create a Convolutional neural network with dense layer at the end.
+
+    :return: keras model
+    """
+    model = Sequential()
+    conv = Conv2D
+    model.add(conv(input_shape=features_shape,
+                   filters=5, kernel_size=[10, 1], padding='same', activation='relu',
+                   strides=[5, 1], data_format='channels_first'))
+    model.add(conv(filters=5, kernel_size=[5, 1], padding='same', activation='relu',
+                   strides=[2, 1], data_format='channels_first'))
+    model.add(conv(filters=5, kernel_size=[4, 1], padding='same', activation='relu',
+                   strides=[2, 1], data_format='channels_first'))
+    model.add(Flatten())
+    model.add(Dense(256, activation='relu'))
+    model.add(Dense(number_of_actions, activation='softmax'))
+    LOGGER.info(model.summary())
+    return model
+
+
+def _create_mlp_model(features_shape: tuple, number_of_actions: int) -> Sequential:
+    """
+    Create a DENSE neural network with dense layer at the end
+
+    :return: keras model
+    """
+    model = Sequential()
+    model.add(Dense(units=256, input_shape=features_shape, activation='relu'))
+    model.add(Dense(units=256, activation='relu'))
+    model.add(Flatten())
+    model.add(Dense(number_of_actions, activation='softmax'))
+    LOGGER.info(model.summary())
+    return model
+
+
+def create_dqn_model(name: str, features_shape: tuple, number_of_actions: int,
+                     dueling_network: bool = True) -> Sequential:
+    """
+    Create the Q-network of a DQN agent, including the dueling layer, which is used
+    by the actors of `ActorLearner` to select actions.
+
+    :param name: Neural network type ['mlp' or 'cnn']
+    :param features_shape: input shape, including the frame stack
+    :param number_of_actions: number of actions in the environment
+    :param dueling_network: boolean, use dueling network architecture
+    :return: neural network
+    """
+    agent = DQNAgent(model=create_model(name=name, features_shape=features_shape,
+                                        number_of_actions=number_of_actions),
+                     nb_actions=number_of_actions,
+                     memory=SequentialMemory(limit=1, window_length=features_shape[0]),
+                     enable_dueling_network=dueling_network,
+                     dueling_type='avg')
+    return agent.model
+
+
+class ReplayMemoryAdapter(Memory):
+
+    def __init__(self, env, limit: int = 1000000, seed: int = 1):
+        """
+        Keras-RL memory storing the transitions of a `gym_trading` environment in a
+        `ReplayMemory`, which references the day's normalized data instead of copying
+        every observation.
+
+        Keras-RL observes the state before an action in `get_recent_state()`, and
+        appends the transition once the environment stepped, so the transition is
+        completed with the next state's ID when the next state is observed.
+
+        :param env: (BaseEnvironment) environment stepped by the agent
+        :param limit: maximum number of transitions
+        :param seed: random seed number used to sample transitions
+        """
+        super(ReplayMemoryAdapter, self).__init__(window_length=1)
+        self.env = env
+        self.limit = limit
+        self.memory = ReplayMemory(limit=limit, window_size=env.window_size,
+                                   action_repeats=env.action_repeats,
+                                   format_3d=env.format_3d, seed=seed)
+        self._state = None  # ID of the last observation
+        self._last_step = None  # environment step of the last observation
+        self._pending = None  # transition waiting for its next state
+        self._after_terminal = False
+
+    @property
+    def nb_entries(self) -> int:
+        return len(self.memory)
+
+    def get_recent_state(self, current_observation: np.ndarray) -> list:
+        step = self.env.local_step_number
+        new_episode = self._last_step is None or step <= self._last_step
+        self._state = self.memory.observe(env=self.env, observation=current_observation,
+                                          new_episode=new_episode)
+        self._last_step = step
+        if self._pending is not None:
+            self.memory.append(next_state=self._state, **self._pending)
+            self._pending = None
+        return super(ReplayMemoryAdapter, self).get_recent_state(current_observation)
+
+    def append(self, observation: np.ndarray, action: int, reward: float,
+               terminal: bool, training: bool = True) -> None:
+        super(ReplayMemoryAdapter, self).append(observation, action, reward, terminal,
+                                                training=training)
+        if not training:
+            return
+        # Keras-RL steps once more on the terminal observation, before resetting
+        if not self._after_terminal:
+            self._pending = dict(state=self._state, action=action, reward=reward,
+                                 terminal=terminal)
+        self._after_terminal = terminal
+
+    def sample(self, batch_size: int, batch_idxs=None) -> list:
+        state0, actions, rewards, state1, terminals = self.memory.sample(
+            batch_size=batch_size)
+        return [Experience(state0=[s0], action=a, reward=r, state1=[s1], terminal1=t)
+                for s0, a, r, s1, t in zip(state0, actions.tolist(), rewards.tolist(),
+                                           state1, terminals.tolist())]
+
+    def get_config(self) -> dict:
+        config = super(ReplayMemoryAdapter, self).get_config()
+        config['limit'] = self.limit
+        return config
+
+
+class DQNLearner(object):
+
+    def __init__(self, agent: DQNAgent):
+        """
+        Learner of an `ActorLearner`, which updates a compiled Keras-RL `DQNAgent`
+        with batches of transitions, as in `DQNAgent.backward()`.
+
+        :param agent: compiled DQN agent
+        """
+        self.agent = agent
+        self.number_of_updates = 0
+
+    def get_weights(self) -> list:
+        return self.agent.model.get_weights()
+
+    def save_weights(self, filename: str) -> None:
+        self.agent.save_weights(filename, overwrite=True)
+
+    def update(self, state0: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               state1: np.ndarray, terminals: np.ndarray) -> list:
+        """
+        Train the Q-network on a batch of transitions.
+
+        :return: (list) training metrics
+        """
+        agent = self.agent
+        # Keras-RL models take a frame stack axis
+        state0, state1 = state0[:, np.newaxis], state1[:, np.newaxis]
+        batch = np.arange(state0.shape[0])
+
+        target_q_values = agent.target_model.predict_on_batch(state1)
+        if agent.enable_double_dqn:
+            next_actions = np.argmax(agent.model.predict_on_batch(state1), axis=1)
+            q_batch = target_q_values[batch, next_actions]
+        else:
+            q_batch = np.max(target_q_values, axis=1)
+        returns = rewards + agent.gamma * q_batch * (1. - terminals)
+
+        targets = np.zeros((state0.shape[0], agent.nb_actions), dtype=np.float32)
+        masks = np.zeros_like(targets)
+        targets[batch, actions] = returns
+        masks[batch, actions] = 1.
+        metrics = agent.trainable_model.train_on_batch(
+            [state0, targets, masks], [returns.astype(np.float32), targets])
+
+        self.number_of_updates += 1
+        if self.number_of_updates % agent.target_model_update == 0:
+            agent.update_target_model_hard()
+        return metrics
+
+
 class Agent(object):
     name = 'DQN'
 
     def __init__(self, number_of_training_steps=1e5, gamma=0.999, load_weights=False,
                  visualize=False, dueling_network=True, double_dqn=True, nn_type='mlp',
+                 number_of_actors=1, output_directory=None, memory_limit=1000000,
                  **kwargs):
         """
         Agent constructor
@@ -34,6 +235,11 @@ class Agent(object):
         :param visualize: boolean, visualize environment
         :param dueling_network: boolean, use dueling network architecture
         :param double_dqn: boolean, use double DQN for Q-value approximation
+        :param number_of_actors: int, number of actor processes stepping environments
+            during training; if greater than 1, train with `ActorLearner`
+        :param output_directory: str, directory of the weights, checkpoints and logs;
+            defaults to 'dqn_weights' next to this module
+        :param memory_limit: int, maximum number of transitions in the replay memory
         """
         # Agent arguments
         # self.env_name = id
@@ -41,8 +247,13 @@ class Agent(object):
         self.load_weights = load_weights
         self.number_of_training_steps = number_of_training_steps
         self.visualize = visualize
+        self.dueling_network = dueling_network
+        self.number_of_actors = number_of_actors
+        # number of environment steps taken by the last call to `start()`
+        self.number_of_steps = 0
 
         # Create environment
+        self.env_kwargs = kwargs
         self.env = gym.make(**kwargs)
         self.env_name = self.env.env.id
 
@@ -50,10 +261,13 @@ class Agent(object):
         # NOTE: 'Keras-RL' uses its own frame-stacker
         self.memory_frame_stack = 1  # Number of frames to stack e.g., 1.
         self.model = self.create_model(name=self.neural_network_type)
-        self.memory = SequentialMemory(limit=10000,
-                                       window_length=self.memory_frame_stack)
+        self.memory_limit = memory_limit
+        self.memory = ReplayMemoryAdapter(env=self.env.env, limit=memory_limit,
+                                          seed=kwargs.get('seed', 1))
         self.train = self.env.env.training
         self.cwd = os.path.dirname(os.path.realpath(__file__))
+        self.output_directory = output_directory or os.path.join(self.cwd,
+                                                                 'dqn_weights')
 
         # create the agent
         self.agent = DQNAgent(model=self.model,
@@ -82,48 +296,9 @@ class Agent(object):
         :param name: Neural network type ['mlp' or 'cnn']
         :return: neural network
         """
-        LOGGER.info("creating model for {}".format(name))
-        if name == 'cnn':
-            return self._create_cnn_model()
-        elif name == 'mlp':
-            return self._create_mlp_model()
-
-    def _create_cnn_model(self) -> Sequential:
-        """
-        Create a Convolutional neural network with dense layer at the end.
-
-        :return: keras model
-        """
-        features_shape = (self.memory_frame_stack, *self.env.observation_space.shape)
-        model = Sequential()
-        conv = Conv2D
-        model.add(conv(input_shape=features_shape,
-                       filters=5, kernel_size=[10, 1], padding='same', activation='relu',
-                       strides=[5, 1], data_format='channels_first'))
-        model.add(conv(filters=5, kernel_size=[5, 1], padding='same', activation='relu',
-                       strides=[2, 1], data_format='channels_first'))
-        model.add(conv(filters=5, kernel_size=[4, 1], padding='same', activation='relu',
-                       strides=[2, 1], data_format='channels_first'))
-        model.add(Flatten())
-        model.add(Dense(256, activation='relu'))
-        model.add(Dense(self.env.action_space.n, activation='softmax'))
-        LOGGER.info(model.summary())
-        return model
-
-    def _create_mlp_model(self) -> Sequential:
-        """
-        Create a DENSE neural network with dense layer at the end
-
-        :return: keras model
-        """
         features_shape = (self.memory_frame_stack, *self.env.observation_space.shape)
-        model = Sequential()
-        model.add(Dense(units=256, input_shape=features_shape, activation='relu'))
-        model.add(Dense(units=256, activation='relu'))
-        model.add(Flatten())
-        model.add(Dense(self.env.action_space.n, activation='softmax'))
-        LOGGER.info(model.summary())
-        return model
+        return create_model(name=name, features_shape=features_shape,
+                            number_of_actions=self.env.action_space.n)
 
     def start(self) -> None:
         """
@@ -131,10 +306,10 @@ class Agent(object):
 
         :return: (void)
         """
-        output_directory = os.path.join(self.cwd, 'dqn_weights')
+        output_directory = self.output_directory
         if not os.path.exists(output_directory):
             LOGGER.info('{} does not exist. Creating Directory.'.format(output_directory))
-            os.mkdir(output_directory)
+            os.makedirs(output_directory)
 
         weight_name = 'dqn_{}_{}_weights.h5f'.format(
             self.env_name, self.neural_network_type)
@@ -149,12 +324,10 @@ class Agent(object):
         if self.train:
             step_chkpt = '{step}.h5f'
             step_chkpt = 'dqn_{}_weights_{}'.format(self.env_name, step_chkpt)
-            checkpoint_weights_filename = os.path.join(self.cwd,
-                                                       'dqn_weights',
-                                                       step_chkpt)
+            checkpoint_weights_filename = os.path.join(output_directory, step_chkpt)
             LOGGER.info("checkpoint_weights_filename: {}".format(
                 checkpoint_weights_filename))
-            log_filename = os.path.join(self.cwd, 'dqn_weights',
+            log_filename = os.path.join(output_directory,
                                         'dqn_{}_log.json'.format(self.env_name))
             LOGGER.info('log_filename: {}'.format(log_filename))
 
@@ -162,6 +335,13 @@ class Agent(object):
                                                  interval=250000)]
             callbacks += [FileLogger(log_filename, interval=100)]
 
+            if self.number_of_actors > 1:
+                self.number_of_steps = self._train_actor_learner(
+                    checkpoint_weights_filename=checkpoint_weights_filename,
+                    log_filename=log_filename)
+                self.save_weights(weights_filename=weights_filename)
+                return
+
             LOGGER.info('Starting training...')
             self.agent.fit(self.env,
                            callbacks=callbacks,
@@ -169,10 +349,63 @@ class Agent(object):
                            log_interval=10000,
                            verbose=0,
                            visualize=self.visualize)
+            self.number_of_steps = int(self.agent.step)
             LOGGER.info("training over.")
-            LOGGER.info('Saving AGENT weights...')
-            self.agent.save_weights(weights_filename, overwrite=True)
-            LOGGER.info("AGENT weights saved.")
+            self.save_weights(weights_filename=weights_filename)
         else:
             LOGGER.info('Starting TEST...')
             self.agent.test(self.env, nb_episodes=2, visualize=self.visualize)
+            self.number_of_steps = int(self.agent.step)
+
+    def save_weights(self, weights_filename: str) -> None:
+        """
+        Save the agent's weights, and export the Q-network to a NumPy archive
+        (see `NumpyPolicy`) for running the agent without Keras.
+
+        :param weights_filename: path of the Keras weights
+        :return: (void)
+        """
+        LOGGER.info('Saving AGENT weights...')
+        self.agent.save_weights(weights_filename, overwrite=True)
+        export_keras_model(model=self.agent.model).save(
+            filename=os.path.splitext(weights_filename)[0] + '.npz')
+        LOGGER.info("AGENT weights saved.")
+
+    def _train_actor_learner(self, checkpoint_weights_filename: str,
+                             log_filename: str) -> int:
+        """
+        Train the agent with actor processes stepping their own environment, while
+        this process updates the Q-network.
+
+        :param checkpoint_weights_filename: path of the checkpoints, formatted with
+            the number of steps
+        :param log_filename: path of the actors' episode logs
+        :return: (int) number of transitions collected from the actors
+        """
+        env = self.env.env
+        actor_learner = ActorLearner(
+            learner=DQNLearner(agent=self.agent),
+            create_policy=functools.partial(
+                create_dqn_model, name=self.neural_network_type,
+                features_shape=(self.memory_frame_stack, *env.observation_space.shape),
+                number_of_actions=env.action_space.n,
+                dueling_network=self.dueling_network),
+            env_kwargs=self.env_kwargs,
+            window_size=env.window_size,
+            action_repeats=env.action_repeats,
+            format_3d=env.format_3d,
+            number_of_actors=self.number_of_actors,
+            memory_limit=self.memory_limit,
+            number_of_warmup_steps=self.agent.nb_steps_warmup,
+            seed=self.env_kwargs.get('seed', 1))
+        LOGGER.info('Starting training with {} actors...'.format(self.number_of_actors))
+        try:
+            actor_learner.train(number_of_steps=self.number_of_training_steps,
+                                checkpoint_filename=checkpoint_weights_filename,
+                                checkpoint_interval=250000,
+                                log_filename=log_filename,
+                                log_episode_interval=100)
+        finally:
+            actor_learner.close()
+        LOGGER.info("training over.")
+        return actor_learner.number_of_steps
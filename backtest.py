@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime as dt
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.results import get_commit
+from configurations import BACKTEST_PATH, LOGGER, TIMEZONE
+from gym_trading.envs import MarketMaker, TrendFollowing
+from gym_trading.utils.day_source import get_archive_days
+from gym_trading.utils.numpy_policy import NumpyPolicy
+from sweep import thread_limits
+
+ENVIRONMENTS = {MarketMaker.id: MarketMaker, TrendFollowing.id: TrendFollowing}
+
+# columns at the front of the report
+REPORT_COLUMNS = ['testing_file', 'fitting_file', 'number_of_steps', 'episode_reward',
+                  'realized_pnl', 'trade_count', 'average_trade_pnl']
+
+
+def get_day_pairs(days: list) -> list:
+    """
+    Pair every trading day with the day before it, which is used to normalize it
+    (same as `DaySource`).
+
+    :param days: trading days in chronological order
+    :return: (list of tuple) fitting file and testing file of each day but the first
+    """
+    assert len(days) > 1, "Error: at least two days are required, not {}".format(
+        len(days))
+    return list(zip(days[:-1], days[1:]))
+
+
+def _get_episode_results(env) -> dict:
+    """
+    Get the results of an environment's finished episode.
+
+    :param env: (BaseEnvironment) environment
+    :return: (dict) PnL, trade counts, and broker statistics
+    """
+    broker = env.broker
+    return dict(testing_file=env.day.testing_file,
+                fitting_file=env.day.fitting_file,
+                episode_reward=env.episode_stats.reward,
+                realized_pnl=(broker.realized_pnl / env.max_position) * 100.,
+                trade_count=broker.total_trade_count,
+                average_trade_pnl=broker.average_trade_pnl * 100.,
+                **broker.get_statistics())
+
+
+def backtest_days(day_pairs: list, policy_filename: str, env_id: str,
+                  env_kwargs: dict) -> (list, dict):
+    """
+    Evaluate a policy greedily on several trading days at once. All days advance
+    together, so the policy's inference is batched across days at each step, and
+    finished days leave the batch.
+
+    :param day_pairs: (list of tuple) fitting file and testing file of each day
+    :param policy_filename: policy saved with `NumpyPolicy.save()`
+    :param env_id: environment ID
+    :param env_kwargs: environment arguments, besides the data files
+    :return: (list of dict) results of each day, and (dict) time spent stepping the
+        environments and in inference
+    """
+    policy = NumpyPolicy.load(filename=policy_filename, batch_size=len(day_pairs))
+    env_kwargs = dict(dict(window_size=policy.input_shape[1]), **env_kwargs)
+    env_kwargs['training'] = False
+    timings = dict(env_seconds=0., inference_seconds=0.)
+    results = list()
+
+    # the environments print their episode statistics, which would interleave across
+    # the workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        envs = [ENVIRONMENTS[env_id](fitting_file=fitting_file,
+                                     testing_file=testing_file, **env_kwargs)
+                for fitting_file, testing_file in day_pairs]
+        observations = [env.reset() for env in envs]
+        number_of_steps = [0] * len(envs)
+        active = list(range(len(envs)))
+
+        while active:
+            start_time = perf_counter()
+            q_values = policy.predict_on_batch(np.stack([observations[i]
+                                                         for i in active]))
+            actions = np.argmax(q_values, axis=1).tolist()
+            timings['inference_seconds'] += perf_counter() - start_time
+
+            start_time = perf_counter()
+            still_active = list()
+            for i, action in zip(active, actions):
+                observations[i], _, done, _ = envs[i].step(action)
+                number_of_steps[i] += 1
+                if done:
+                    results.append(dict(_get_episode_results(env=envs[i]),
+                                        number_of_steps=number_of_steps[i]))
+                    envs[i].close()
+                    observations[i] = None
+                else:
+                    still_active.append(i)
+            active = still_active
+            timings['env_seconds'] += perf_counter() - start_time
+
+    return results, timings
+
+
+def run_backtest(days: list, policy_filename: str, env_id: str = MarketMaker.id,
+                 env_kwargs: dict or None = None, max_workers: int = 2,
+                 max_days_per_batch: int = 8, threads_per_worker: int = 1,
+                 path: str = BACKTEST_PATH) -> pd.DataFrame:
+    """
+    Evaluate a saved policy on a list of trading days in parallel worker processes,
+    and save a report with one row per day.
+
+    :param days: trading days in chronological order; every day but the first is
+        evaluated, normalized with the day before it
+    :param policy_filename: policy saved with `NumpyPolicy.save()` (e.g., the
+        '.npz' file saved next to the DQN agent's weights)
+    :param env_id: environment ID
+    :param env_kwargs: environment arguments, besides the data files (e.g.,
+        'symbol', 'max_position', 'action_repeats')
+    :param max_workers: number of worker processes
+    :param max_days_per_batch: maximum number of days a worker evaluates at once,
+        which bounds its memory usage
+    :param threads_per_worker: number of CPU threads used by each worker's
+        libraries
+    :param path: directory of the report
+    :return: (pd.DataFrame) results of each day
+    """
+    day_pairs = get_day_pairs(days=days)
+    # days are dealt to the batches in turn, so that batches are of similar size
+    number_of_batches = max(max_workers, -(-len(day_pairs) // max_days_per_batch))
+    batches = [day_pairs[i::number_of_batches] for i in range(number_of_batches)]
+    batches = [batch for batch in batches if batch]
+    LOGGER.info('Back-testing {} on {} days in {} batches with {} workers'.format(
+        policy_filename, len(day_pairs), len(batches), max_workers))
+
+    start_time = perf_counter()
+    results = list()
+    timings = dict(env_seconds=0., inference_seconds=0.)
+    with thread_limits(threads=threads_per_worker), ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(backtest_days, day_pairs=batch,
+                                   policy_filename=policy_filename, env_id=env_id,
+                                   env_kwargs=env_kwargs or dict())
+                   for batch in batches]
+        for future in as_completed(futures):
+            batch_results, batch_timings = future.result()
+            results.extend(batch_results)
+            for name, seconds in batch_timings.items():
+                timings[name] += seconds
+            LOGGER.info('Finished {}/{} days'.format(len(results), len(day_pairs)))
+    seconds = perf_counter() - start_time
+
+    report = pd.DataFrame(results)
+    columns = REPORT_COLUMNS + [c for c in report.columns if c not in REPORT_COLUMNS]
+    report = report[columns].sort_values('testing_file').reset_index(drop=True)
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+    filename = os.path.join(path, 'backtest_{}_{}.csv'.format(
+        get_commit(), dt.now(tz=TIMEZONE).strftime('%Y%m%d-%H%M%S')))
+    report.to_csv(filename, index=False)
+    LOGGER.info('Back-tested {} days ({:,} steps) in {:.1f} seconds; workers spent '
+                '{:.1f} seconds stepping environments and {:.1f} seconds in inference.'
+                ' Saved report to {}\n{}'.format(
+                    len(report), report['number_of_steps'].sum(), seconds,
+                    timings['env_seconds'], timings['inference_seconds'], filename,
+                    report[REPORT_COLUMNS].to_string(index=False)))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Evaluate a saved policy on many trading days in parallel.')
+    parser.add_argument('policy',
+                        help="Policy saved by the agent (e.g., "
+                             "'agent/dqn_weights/dqn_market-maker-v0_cnn_weights.npz')",
+                        type=str)
+    parser.add_argument('--days',
+                        nargs='+',
+                        default=None,
+                        help="Trading days in chronological order; defaults to the "
+                             "days exported for --symbol",
+                        type=str)
+    parser.add_argument('--symbol',
+                        default='LTC-USD',
+                        help="Name of currency pair or instrument",
+                        type=str)
+    parser.add_argument('--suffix',
+                        default='',
+                        help="Label of the exported days used by default (e.g., "
+                             "'100ms' for 'LTC-USD_2019-01-01_100ms.csv.xz')",
+                        type=str)
+    parser.add_argument('--id',
+                        default=MarketMaker.id,
+                        choices=list(ENVIRONMENTS.keys()),
+                        help="Environment ID",
+                        type=str)
+    parser.add_argument('--max_position',
+                        default=5,
+                        help="Maximum number of positions that are " +
+                             "able to be held in a broker's inventory",
+                        type=int)
+    parser.add_argument('--action_repeats',
+                        default=5,
+                        help="Number of steps to pass on between actions",
+                        type=int)
+    parser.add_argument('--max_workers',
+                        default=max(multiprocessing.cpu_count() - 1, 1),
+                        help="Number of worker processes",
+                        type=int)
+    parser.add_argument('--max_days_per_batch',
+                        default=8,
+                        help="Maximum number of days a worker evaluates at once",
+                        type=int)
+    args = parser.parse_args()
+
+    run_backtest(days=args.days or get_archive_days(symbol=args.symbol,
+                                                    suffix=args.suffix),
+                 policy_filename=args.policy,
+                 env_id=args.id,
+                 env_kwargs=dict(symbol=args.symbol,
+                                 max_position=args.max_position,
+                                 action_repeats=args.action_repeats,
+                                 recording_mode='ring',
+                                 recording_length=1),
+                 max_workers=args.max_workers,
+                 max_days_per_batch=args.max_days_per_batch)
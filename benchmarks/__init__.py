@@ -0,0 +1 @@
+from benchmarks.synthetic_ticks import SyntheticTickGenerator
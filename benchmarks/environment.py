@@ -0,0 +1,219 @@
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.results import save_results
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from configurations import EMA_ALPHA, LOGGER
+from gym_trading.envs import MarketMaker, TrendFollowing
+from gym_trading.envs.base_environment import VALID_REWARD_TYPES
+
+ENVIRONMENTS = {MarketMaker.id: MarketMaker, TrendFollowing.id: TrendFollowing}
+
+
+def _create_environment(env_id: str, data_file: str, window_size: int,
+                        format_3d: bool, reward_type: str, seed: int,
+                        ema_alpha: float or None):
+    """
+    Create an environment from the synthetic snapshot day.
+    """
+    return ENVIRONMENTS[env_id](symbol='BTC-USD',
+                                fitting_file=data_file,
+                                testing_file=data_file,
+                                max_position=10,
+                                window_size=window_size,
+                                seed=seed,
+                                action_repeats=5,
+                                training=False,
+                                format_3d=format_3d,
+                                reward_type=reward_type,
+                                ema_alpha=ema_alpha)
+
+
+def benchmark_environment(env_id: str, data_file: str, window_size: int = 100,
+                          format_3d: bool = False, reward_type: str = 'default',
+                          number_of_steps: int = 1000, number_of_resets: int = 3,
+                          seed: int = 1, ema_alpha: float or None = EMA_ALPHA) -> dict:
+    """
+    Measure construction time, reset latency and step throughput of an environment,
+    including the time spent in each phase of `step()` (see
+    `BaseEnvironment.enable_profiling()`).
+
+    :param env_id: environment ID
+    :param data_file: absolute path to the snapshot data
+    :param window_size: number of lags to include in observation space
+    :param format_3d: if TRUE, reshape observation space from matrix to tensor
+    :param reward_type: method for calculating the environment's reward
+    :param number_of_steps: number of calls to `step()` with random actions (the
+        same number of steps are taken again with profiling enabled)
+    :param number_of_resets: number of calls to `reset()`
+    :param seed: random seed number
+    :param ema_alpha: decay factor for EMA
+    :return: measurements
+    """
+    start_time = perf_counter()
+    env = _create_environment(env_id=env_id, data_file=data_file,
+                              window_size=window_size, format_3d=format_3d,
+                              reward_type=reward_type, seed=seed, ema_alpha=ema_alpha)
+    construction_seconds = perf_counter() - start_time
+
+    start_time = perf_counter()
+    for _ in range(number_of_resets):
+        env.reset()
+    reset_seconds = (perf_counter() - start_time) / number_of_resets
+
+    random_state = np.random.RandomState(seed=seed)
+    actions = random_state.randint(0, env.action_space.n, size=number_of_steps)
+
+    assert 2 * number_of_steps * env.action_repeats < \
+           env.max_steps - env.local_step_number, \
+        "Error: the snapshot day is too short for {} steps".format(number_of_steps)
+
+    # measure throughput without profiling, then profile the same number of steps
+    start_time = perf_counter()
+    for action in actions:
+        env.step(action)
+    elapsed = perf_counter() - start_time
+
+    env.enable_profiling()
+    for action in actions:
+        env.step(action)
+    profile = env.get_profile()
+
+    env.close()
+    return dict(construction_seconds=construction_seconds,
+                reset_milliseconds=reset_seconds * 1e3,
+                steps=number_of_steps,
+                steps_per_second=number_of_steps / elapsed,
+                microseconds_per_step=elapsed / number_of_steps * 1e6,
+                profile=profile)
+
+
+def run_benchmarks(env_ids: list = (MarketMaker.id, TrendFollowing.id),
+                   reward_types: list = tuple(VALID_REWARD_TYPES),
+                   window_sizes: list = (50, 100),
+                   formats_3d: list = (False, True),
+                   number_of_snapshots: int = 20000,
+                   number_of_steps: int = 1000,
+                   number_of_resets: int = 3,
+                   seed: int = 1,
+                   ema_alpha: float or None = EMA_ALPHA,
+                   save: bool = True) -> dict:
+    """
+    Run the environment benchmarks on a synthetic snapshot day.
+
+    :param env_ids: environment IDs to benchmark
+    :param reward_types: reward functions to benchmark
+    :param window_sizes: number of lags in the observation space to benchmark
+    :param formats_3d: `format_3d` settings to benchmark
+    :param number_of_snapshots: number of LOB snapshots in the synthetic day
+    :param number_of_steps: number of calls to `step()` per configuration
+    :param number_of_resets: number of calls to `reset()` per configuration
+    :param seed: random seed number
+    :param ema_alpha: decay factor for EMA
+    :param save: if TRUE, save the results to a JSON file
+    :return: benchmark parameters and results
+    """
+    parameters = dict(env_ids=list(env_ids),
+                      reward_types=list(reward_types),
+                      window_sizes=list(window_sizes),
+                      formats_3d=list(formats_3d),
+                      number_of_snapshots=number_of_snapshots,
+                      number_of_steps=number_of_steps,
+                      number_of_resets=number_of_resets,
+                      seed=seed,
+                      ema_alpha=ema_alpha)
+    results = dict()
+
+    data_path = tempfile.mkdtemp()
+    try:
+        data_file = export_snapshot_day(path=data_path,
+                                        number_of_snapshots=number_of_snapshots,
+                                        seed=seed)
+        for env_id in env_ids:
+            results[env_id] = dict()
+            for window_size in window_sizes:
+                for format_3d in formats_3d:
+                    configuration = f'window_{window_size}_3d_{format_3d}'
+                    results[env_id][configuration] = dict()
+                    for reward_type in reward_types:
+                        # environments print episode statistics on every reset
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            result = benchmark_environment(
+                                env_id=env_id, data_file=data_file,
+                                window_size=window_size, format_3d=format_3d,
+                                reward_type=reward_type,
+                                number_of_steps=number_of_steps,
+                                number_of_resets=number_of_resets,
+                                seed=seed, ema_alpha=ema_alpha)
+                        results[env_id][configuration][reward_type] = result
+                        LOGGER.info('{} {} {}: {:,.0f} steps/second'.format(
+                            env_id, configuration, reward_type,
+                            result['steps_per_second']))
+    finally:
+        shutil.rmtree(data_path)
+
+    if save:
+        save_results(name='environment', parameters=parameters, results=results)
+
+    return dict(parameters=parameters, results=results)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark gym_trading environments on a synthetic snapshot day.')
+    parser.add_argument('--env_ids',
+                        default=[MarketMaker.id, TrendFollowing.id],
+                        nargs='+',
+                        choices=list(ENVIRONMENTS.keys()),
+                        help="Environments to benchmark")
+    parser.add_argument('--reward_types',
+                        default=VALID_REWARD_TYPES,
+                        nargs='+',
+                        choices=VALID_REWARD_TYPES,
+                        help="Reward functions to benchmark")
+    parser.add_argument('--window_sizes',
+                        default=[50, 100],
+                        nargs='+',
+                        help="Number of lags in the observation space",
+                        type=int)
+    parser.add_argument('--formats_3d',
+                        default=['False', 'True'],
+                        nargs='+',
+                        choices=['False', 'True'],
+                        help="Benchmark with format_3d off and/or on")
+    parser.add_argument('--number_of_snapshots',
+                        default=20000,
+                        help="Number of LOB snapshots in the synthetic day",
+                        type=int)
+    parser.add_argument('--number_of_steps',
+                        default=1000,
+                        help="Number of steps per configuration",
+                        type=int)
+    parser.add_argument('--number_of_resets',
+                        default=3,
+                        help="Number of resets per configuration",
+                        type=int)
+    parser.add_argument('--seed',
+                        default=1,
+                        help="Random number seed",
+                        type=int)
+    args = parser.parse_args()
+
+    run_benchmarks(env_ids=args.env_ids,
+                   reward_types=args.reward_types,
+                   window_sizes=args.window_sizes,
+                   formats_3d=[value == 'True' for value in args.formats_3d],
+                   number_of_snapshots=args.number_of_snapshots,
+                   number_of_steps=args.number_of_steps,
+                   number_of_resets=args.number_of_resets,
+                   seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import argparse
+import gc
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.results import save_results
+from benchmarks.synthetic_ticks import SyntheticTickGenerator, WARM_UP_TYPES
+from configurations import LOGGER, REPEATS_COLUMN
+from data_recorder.connector_components.book_kernel import NUMBA_ENABLED
+from data_recorder.database.simulator import Simulator, get_orderbook_from_symbol
+
+BOOK_TYPES = dict(python=False, compiled=True)
+
+
+def _to_ticks(tick_history: pd.DataFrame) -> list:
+    """
+    Convert tick history into dictionaries in the same way as the `Simulator`.
+    """
+    return [tx._asdict() for tx in tick_history.itertuples()]
+
+
+def _split_warm_up(ticks: list) -> (list, list):
+    """
+    Split ticks into the book snapshot and the messages that follow it.
+    """
+    number_of_warm_up_ticks = 0
+    for tick in ticks:
+        if tick['type'] not in WARM_UP_TYPES:
+            break
+        number_of_warm_up_ticks += 1
+    return ticks[:number_of_warm_up_ticks], ticks[number_of_warm_up_ticks:]
+
+
+def _load_order_book(sym: str, compiled: bool, warm_up_ticks: list):
+    """
+    Create an order book and load the book snapshot.
+    """
+    order_book = get_orderbook_from_symbol(symbol=sym, compiled=compiled)(sym=sym)
+    for tick in warm_up_ticks:
+        order_book.new_tick(msg=tick)
+    return order_book
+
+
+def benchmark_new_tick(sym: str, tick_history: pd.DataFrame, compiled: bool,
+                       repeats: int = 3) -> dict:
+    """
+    Measure the throughput of `OrderBook.new_tick()` after the book snapshot is
+    loaded.
+
+    :param sym: instrument name
+    :param tick_history: synthetic tick history
+    :param compiled: if TRUE, use the compiled book kernel
+    :param repeats: number of times to replay the ticks (the median is reported)
+    :return: measurements
+    """
+    elapsed = list()
+    number_of_ticks = 0
+    for _ in range(repeats):
+        # ticks are converted for every repeat since `new_tick()` modifies them
+        warm_up_ticks, ticks = _split_warm_up(_to_ticks(tick_history))
+        order_book = _load_order_book(sym=sym, compiled=compiled,
+                                      warm_up_ticks=warm_up_ticks)
+        number_of_ticks = len(ticks)
+        new_tick = order_book.new_tick
+        start_time = perf_counter()
+        for tick in ticks:
+            new_tick(msg=tick)
+        elapsed.append(perf_counter() - start_time)
+
+    seconds = float(np.median(elapsed))
+    return dict(ticks=number_of_ticks,
+                seconds=seconds,
+                ticks_per_second=number_of_ticks / seconds)
+
+
+def benchmark_render_book(sym: str, tick_history: pd.DataFrame, compiled: bool,
+                          number_of_renders: int = 10000) -> dict:
+    """
+    Measure the latency of `OrderBook.render_book()` on a book in steady state.
+
+    :param sym: instrument name
+    :param tick_history: synthetic tick history
+    :param compiled: if TRUE, use the compiled book kernel
+    :param number_of_renders: number of calls to `render_book()`
+    :return: measurements
+    """
+    warm_up_ticks, ticks = _split_warm_up(_to_ticks(tick_history))
+    order_book = _load_order_book(sym=sym, compiled=compiled,
+                                  warm_up_ticks=warm_up_ticks)
+    for tick in ticks:
+        order_book.new_tick(msg=tick)
+
+    render_book = order_book.render_book
+    start_time = perf_counter()
+    for _ in range(number_of_renders):
+        render_book()
+    elapsed = perf_counter() - start_time
+
+    return dict(renders=number_of_renders,
+                microseconds_per_render=elapsed / number_of_renders * 1e6)
+
+
+def benchmark_memory(sym: str, tick_history: pd.DataFrame, compiled: bool) -> dict:
+    """
+    Measure the memory retained by the order book per resting order after loading
+    the book snapshot.
+
+    :param sym: instrument name
+    :param tick_history: synthetic tick history
+    :param compiled: if TRUE, use the compiled book kernel
+    :return: measurements
+    """
+    warm_up_tick_history = tick_history.loc[tick_history['type'].isin(WARM_UP_TYPES)]
+    gc.collect()
+    tracemalloc.start()
+    order_book = _load_order_book(sym=sym, compiled=compiled,
+                                  warm_up_ticks=_to_ticks(warm_up_tick_history))
+    gc.collect()
+    retained_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    number_of_orders = len(order_book.bids.order_map) + len(order_book.asks.order_map)
+    return dict(resting_orders=number_of_orders,
+                bytes=retained_bytes,
+                bytes_per_resting_order=retained_bytes / number_of_orders)
+
+
+def benchmark_snapshot_history(sym: str, tick_history: pd.DataFrame,
+                               compiled: bool) -> dict:
+    """
+    Measure the end-to-end throughput of replaying tick history into LOB snapshots
+    (i.e., `Simulator.get_orderbook_snapshot_history()` without the database query).
+
+    :param sym: instrument name
+    :param tick_history: synthetic tick history
+    :param compiled: if TRUE, use the compiled book kernel
+    :return: measurements
+    """
+    sim = Simulator()
+    start_time = perf_counter()
+    snapshots = sim.replay_tick_history(tick_history=tick_history,
+                                        instrument_name=sym,
+                                        compiled=compiled)
+    elapsed = perf_counter() - start_time
+
+    # repeated snapshots are run-length encoded into a single row
+    number_of_snapshots = int(snapshots[REPEATS_COLUMN].sum())
+    return dict(ticks=tick_history.shape[0],
+                snapshots=number_of_snapshots,
+                rows=snapshots.shape[0],
+                seconds=elapsed,
+                ticks_per_second=tick_history.shape[0] / elapsed,
+                snapshots_per_second=number_of_snapshots / elapsed)
+
+
+def run_benchmarks(exchanges: list = ('coinbase', 'bitfinex'),
+                   book_types: list = ('python', 'compiled'),
+                   number_of_messages: int = 100000,
+                   messages_per_second: float = 50.,
+                   book_depth: int = 100,
+                   orders_per_level: int = 3,
+                   number_of_renders: int = 10000,
+                   repeats: int = 3,
+                   seed: int = 1,
+                   save: bool = True) -> dict:
+    """
+    Run the replay benchmarks on synthetic tick streams.
+
+    :param exchanges: exchanges to generate tick streams for
+    :param book_types: 'python' for the `Book` and/or 'compiled' for the
+        `CompiledBook` implementations
+    :param number_of_messages: number of messages after the book snapshot
+    :param messages_per_second: average arrival rate of order book events
+    :param book_depth: number of price levels per side in the book snapshot
+    :param orders_per_level: number of orders per price level in the book snapshot
+    :param number_of_renders: number of calls to `render_book()`
+    :param repeats: number of times to replay the ticks for `new_tick()`
+    :param seed: random number seed for the tick generator
+    :param save: if TRUE, save the results to a JSON file
+    :return: benchmark parameters and results
+    """
+    parameters = dict(exchanges=list(exchanges),
+                      book_types=list(book_types),
+                      number_of_messages=number_of_messages,
+                      messages_per_second=messages_per_second,
+                      book_depth=book_depth,
+                      orders_per_level=orders_per_level,
+                      number_of_renders=number_of_renders,
+                      repeats=repeats,
+                      seed=seed,
+                      numba_enabled=NUMBA_ENABLED)
+    results = dict()
+
+    for exchange in exchanges:
+        generator = SyntheticTickGenerator(exchange=exchange,
+                                           messages_per_second=messages_per_second,
+                                           book_depth=book_depth,
+                                           orders_per_level=orders_per_level,
+                                           seed=seed)
+        tick_history = generator.to_tick_history(
+            generator.generate(number_of_messages=number_of_messages))
+        sym = generator.sym
+        LOGGER.info('Generated {} ticks for {}'.format(tick_history.shape[0], sym))
+
+        results[exchange] = dict()
+        for book_type in book_types:
+            compiled = BOOK_TYPES[book_type]
+            if compiled:
+                # compile the book kernel before timing anything
+                _load_order_book(sym=sym, compiled=True,
+                                 warm_up_ticks=_to_ticks(tick_history.iloc[:1000]))
+
+            results[exchange][book_type] = dict(
+                new_tick=benchmark_new_tick(sym=sym, tick_history=tick_history,
+                                            compiled=compiled, repeats=repeats),
+                render_book=benchmark_render_book(
+                    sym=sym, tick_history=tick_history, compiled=compiled,
+                    number_of_renders=number_of_renders),
+                memory=benchmark_memory(sym=sym, tick_history=tick_history,
+                                        compiled=compiled),
+                snapshot_history=benchmark_snapshot_history(
+                    sym=sym, tick_history=tick_history, compiled=compiled),
+            )
+            LOGGER.info('{} {}: {}'.format(exchange, book_type,
+                                           results[exchange][book_type]))
+
+    if save:
+        save_results(name='replay', parameters=parameters, results=results)
+
+    return dict(parameters=parameters, results=results)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark order book replay on synthetic tick streams.')
+    parser.add_argument('--exchanges',
+                        default=['coinbase', 'bitfinex'],
+                        nargs='+',
+                        choices=['coinbase', 'bitfinex'],
+                        help="Exchanges to generate tick streams for")
+    parser.add_argument('--book_types',
+                        default=['python', 'compiled'],
+                        nargs='+',
+                        choices=list(BOOK_TYPES.keys()),
+                        help="Book implementations to benchmark")
+    parser.add_argument('--number_of_messages',
+                        default=100000,
+                        help="Number of messages after the book snapshot",
+                        type=int)
+    parser.add_argument('--messages_per_second',
+                        default=50.,
+                        help="Average arrival rate of order book events",
+                        type=float)
+    parser.add_argument('--book_depth',
+                        default=100,
+                        help="Number of price levels per side in the book snapshot",
+                        type=int)
+    parser.add_argument('--orders_per_level',
+                        default=3,
+                        help="Number of orders per price level in the book snapshot",
+                        type=int)
+    parser.add_argument('--number_of_renders',
+                        default=10000,
+                        help="Number of calls to render_book()",
+                        type=int)
+    parser.add_argument('--repeats',
+                        default=3,
+                        help="Number of times to replay the ticks for new_tick()",
+                        type=int)
+    parser.add_argument('--seed',
+                        default=1,
+                        help="Random number seed for the tick generator",
+                        type=int)
+    args = parser.parse_args()
+
+    run_benchmarks(exchanges=args.exchanges,
+                   book_types=args.book_types,
+                   number_of_messages=args.number_of_messages,
+                   messages_per_second=args.messages_per_second,
+                   book_depth=args.book_depth,
+                   orders_per_level=args.orders_per_level,
+                   number_of_renders=args.number_of_renders,
+                   repeats=args.repeats,
+                   seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
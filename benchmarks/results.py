@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from configurations import BENCHMARK_PATH, LOGGER, ROOT_PATH, TIMEZONE
+
+
+def get_commit() -> str:
+    """
+    Get the git commit of the working tree, so results can be compared across commits.
+
+    :return: short commit hash, or 'unknown' if git is not available
+    """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         cwd=ROOT_PATH, stderr=subprocess.DEVNULL)
+        return commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def get_environment() -> dict:
+    """
+    Get the versions of the interpreter and libraries that affect benchmark results.
+
+    :return: dictionary of environment details
+    """
+    return dict(python=platform.python_version(),
+                platform=platform.platform(),
+                processor=platform.processor(),
+                numpy=np.__version__,
+                pandas=pd.__version__)
+
+
+def save_results(name: str, parameters: dict, results: dict,
+                 path: str = BENCHMARK_PATH) -> str:
+    """
+    Save benchmark results to a JSON file named after the benchmark, commit and time.
+
+    :param name: name of the benchmark (e.g., 'replay')
+    :param parameters: parameters used to run the benchmark
+    :param results: benchmark measurements
+    :param path: directory to save the results into
+    :return: path to the JSON file
+    """
+    commit = get_commit()
+    now = dt.now(tz=TIMEZONE)
+    data = dict(benchmark=name,
+                commit=commit,
+                timestamp=str(now),
+                environment=get_environment(),
+                parameters=parameters,
+                results=results)
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    filename = os.path.join(path, '{}_{}_{}.json'.format(
+        name, commit, now.strftime('%Y%m%d-%H%M%S')))
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+    LOGGER.info('Saved benchmark results to {}'.format(filename))
+    return filename
+
+
+def load_results(filename: str) -> dict:
+    """
+    Load benchmark results from a JSON file.
+
+    :param filename: path to the JSON file
+    :return: benchmark results
+    """
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def _flatten(results: dict, prefix: str = '') -> dict:
+    """
+    Flatten nested dictionaries of measurements into {'a.b.c': value}.
+    """
+    flat = dict()
+    for key, value in results.items():
+        name = '{}.{}'.format(prefix, key) if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix=name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline: dict, current: dict) -> pd.DataFrame:
+    """
+    Compare the measurements of two benchmark runs.
+
+    :param baseline: results loaded with `load_results()` for the reference commit
+    :param current: results loaded with `load_results()` for the new commit
+    :return: (pd.DataFrame) baseline and current values, and the percent change
+        for every measurement found in both runs
+    """
+    baseline_results = _flatten(baseline['results'])
+    current_results = _flatten(current['results'])
+    metrics = [name for name in baseline_results if name in current_results]
+
+    comparison = pd.DataFrame(
+        data=[(baseline_results[name], current_results[name]) for name in metrics],
+        index=metrics,
+        columns=[baseline.get('commit', 'baseline'), current.get('commit', 'current')])
+    comparison['change_pct'] = (comparison.iloc[:, 1] / comparison.iloc[:, 0] - 1.) * 100.
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the results of two benchmark runs.')
+    parser.add_argument('baseline', help="JSON results of the reference commit", type=str)
+    parser.add_argument('current', help="JSON results of the new commit", type=str)
+    args = parser.parse_args()
+
+    comparison = compare_results(baseline=load_results(args.baseline),
+                                 current=load_results(args.current))
+    LOGGER.info('\n{}'.format(comparison.to_string()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import os
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from configurations import INCLUDE_ORDERFLOW, MAX_BOOK_ROWS, TIMEZONE
+
+
+def get_snapshot_feature_names(include_orderflow: bool = INCLUDE_ORDERFLOW) -> list:
+    """
+    Get the column names of a LOB snapshot (same as
+    `OrderBook.render_lob_feature_names()`, which cannot be imported without the
+    database dependencies).
+
+    :param include_orderflow: if TRUE, order flow imbalance stats are included in set
+    :return: list containing features names
+    """
+    feature_names = ['midpoint', 'spread', 'buys', 'sells']
+    feature_types = ['distance', 'notional']
+    if include_orderflow:
+        feature_types += ['cancel_notional', 'limit_notional', 'market_notional']
+
+    for side in ['bids', 'asks']:
+        for feature in feature_types:
+            for row in range(MAX_BOOK_ROWS):
+                feature_names.append(f"{side}_{feature}_{row}")
+
+    return feature_names
+
+
+def generate_snapshot_day(number_of_snapshots: int = 86400,
+                          midpoint: float = 100.,
+                          tick_size: float = 0.01,
+                          volatility: float = 1e-4,
+                          seed: int = 1,
+                          start_time: dt or None = None) -> pd.DataFrame:
+    """
+    Generate LOB snapshots in the same format as `Simulator.extract_features()`
+    exports, with one snapshot per second.
+
+    Midpoint prices follow a geometric random walk, and the price levels, notional
+    values, order flow and trades are drawn at random around the midpoint.
+
+    :param number_of_snapshots: number of LOB snapshots (86400 is one day)
+    :param midpoint: midpoint price of the first snapshot
+    :param tick_size: minimum price increment
+    :param volatility: standard deviation of the midpoint's log returns per snapshot
+    :param seed: random number seed
+    :param start_time: time of the first snapshot
+    :return: (pd.DataFrame) LOB snapshots with a 'system_time' column
+    """
+    random_state = np.random.RandomState(seed=seed)
+    n = number_of_snapshots
+    shape = (n, MAX_BOOK_ROWS)
+
+    # best bid and ask on the tick grid
+    log_returns = random_state.normal(loc=0., scale=volatility, size=n)
+    log_returns[0] = 0.
+    prices = midpoint * np.exp(np.cumsum(log_returns))
+    spreads = 1 + random_state.poisson(lam=0.5, size=n)
+    best_bids = np.round(prices / tick_size - spreads / 2.) * tick_size
+    best_asks = best_bids + spreads * tick_size
+    midpoints = (best_bids + best_asks) / 2.
+
+    # price levels are one or more ticks apart
+    bid_prices = best_bids[:, None] - tick_size * (
+            np.cumsum(1 + random_state.poisson(lam=0.3, size=shape), axis=1) - 1)
+    ask_prices = best_asks[:, None] + tick_size * (
+            np.cumsum(1 + random_state.poisson(lam=0.3, size=shape), axis=1) - 1)
+
+    def _notional(scale: float, probability: float) -> np.ndarray:
+        notional = random_state.lognormal(mean=np.log(scale), sigma=1., size=shape)
+        return np.round(notional * (random_state.rand(*shape) < probability), 2)
+
+    def _trades() -> np.ndarray:
+        notional = random_state.lognormal(mean=np.log(midpoint), sigma=1., size=n)
+        return np.round(notional * (random_state.rand(n) < 0.3), 2)
+
+    data = dict(midpoint=midpoints,
+                spread=np.round(best_asks - best_bids, 4),
+                buys=_trades(),
+                sells=_trades())
+    for side, side_prices in (('bids', bid_prices), ('asks', ask_prices)):
+        side_data = dict(
+            distance=side_prices / midpoints[:, None] - 1.,
+            notional=_notional(scale=midpoint * 5., probability=1.),
+            cancel_notional=_notional(scale=midpoint, probability=0.2),
+            limit_notional=_notional(scale=midpoint, probability=0.3),
+            market_notional=_notional(scale=midpoint, probability=0.05),
+        )
+        for feature, values in side_data.items():
+            for row in range(MAX_BOOK_ROWS):
+                data[f"{side}_{feature}_{row}"] = values[:, row]
+
+    if start_time is None:
+        start_time = dt(2019, 9, 26, tzinfo=TIMEZONE)
+    system_time = pd.date_range(start=start_time, periods=n, freq='S')
+
+    snapshots = pd.DataFrame(data=data)[get_snapshot_feature_names()]
+    snapshots.insert(loc=0, column='system_time', value=system_time)
+    return snapshots
+
+
+def export_snapshot_day(path: str, filename: str = 'synthetic_BTC-USD', **kwargs) -> str:
+    """
+    Export a synthetic snapshot day to an (uncompressed) csv, which can be passed to
+    the environments as a `fitting_file` or `testing_file` with an absolute path.
+
+    :param path: directory to save the csv into
+    :param filename: filename without the extension
+    :param kwargs: arguments passed to `generate_snapshot_day()`
+    :return: full path to the csv
+    """
+    filepath = os.path.join(path, filename) + '.csv'
+    generate_snapshot_day(**kwargs).to_csv(path_or_buf=filepath, index=False)
+    return filepath
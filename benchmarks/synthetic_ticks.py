@@ -0,0 +1,342 @@
+import uuid
+from datetime import datetime as dt
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sortedcontainers import SortedDict
+
+from configurations import TIMEZONE
+
+SYMBOL_BY_EXCHANGE = dict(coinbase='BTC-USD', bitfinex='tBTCUSD')
+WARM_UP_TYPES = {'load_book', 'preload', 'book_loaded'}
+
+
+class SyntheticTickGenerator(object):
+    # Probability of each order book event: new limit order, cancellation,
+    # market order (trade), and order size change
+    EVENT_PROBABILITIES = (0.42, 0.35, 0.15, 0.08)
+
+    def __init__(self,
+                 exchange: str = 'coinbase',
+                 sym: str or None = None,
+                 messages_per_second: float = 50.,
+                 book_depth: int = 100,
+                 orders_per_level: int = 3,
+                 midpoint: float = 100.,
+                 tick_size: float = 0.01,
+                 seed: int = 1,
+                 start_time: dt or None = None):
+        """
+        Generator of level-3 tick streams with the same message layout as the
+        data recorded by the Coinbase and Bitfinex connectors.
+
+        The stream starts with a book snapshot (i.e., 'load_book', 'preload' and
+        'book_loaded' messages), followed by limit orders, cancellations, trades and
+        order size changes arriving as a Poisson process. New limit orders are placed
+        across the depth of the book, so that the book keeps roughly the same number
+        of price levels as the snapshot.
+
+        :param exchange: 'coinbase' or 'bitfinex'
+        :param sym: instrument name (defaults to the exchange's BTC pair)
+        :param messages_per_second: average arrival rate of order book events
+        :param book_depth: number of price levels per side in the book snapshot
+        :param orders_per_level: number of resting orders per price level in the
+            book snapshot
+        :param midpoint: midpoint price of the book snapshot
+        :param tick_size: minimum price increment
+        :param seed: random number seed
+        :param start_time: time of the book snapshot
+        """
+        assert exchange in SYMBOL_BY_EXCHANGE, \
+            "Error: exchange must be one of {}, not {}".format(
+                list(SYMBOL_BY_EXCHANGE.keys()), exchange)
+        self.exchange = exchange
+        self.sym = sym if sym is not None else SYMBOL_BY_EXCHANGE[exchange]
+        self.messages_per_second = messages_per_second
+        self.book_depth = book_depth
+        self.orders_per_level = orders_per_level
+        self.midpoint = midpoint
+        self.tick_size = tick_size
+        self.seed = seed
+
+        self._random_state = np.random.RandomState(seed=seed)
+        self._time = start_time if start_time is not None else \
+            dt(2019, 9, 26, tzinfo=TIMEZONE)
+        self._sequence = 1000
+        self._order_count = 0
+        self._trade_count = 0
+        # price levels are kept in units of tick size to avoid float rounding
+        self._levels = dict(buy=SortedDict(), sell=SortedDict())
+        self._orders = dict()
+        # list of resting order IDs for picking orders at random in O(1)
+        self._order_ids = list()
+        self._order_index = dict()
+
+    def generate(self, number_of_messages: int) -> list:
+        """
+        Generate a book snapshot followed by at least `number_of_messages` messages.
+
+        Note: every call starts from a new book snapshot, as if the recorder
+        reconnected to the exchange.
+
+        :param number_of_messages: number of messages to generate after the snapshot
+        :return: list of tick messages (dicts)
+        """
+        messages = self._load_book()
+        number_of_warm_up_messages = len(messages)
+        number_of_orders_in_snapshot = len(self._orders)
+        while len(messages) - number_of_warm_up_messages < number_of_messages:
+            self._time += timedelta(
+                seconds=self._random_state.exponential(1. / self.messages_per_second))
+            event = self._random_state.choice(len(self.EVENT_PROBABILITIES),
+                                              p=self.EVENT_PROBABILITIES)
+            # keep the number of resting orders close to the snapshot
+            if self._random_state.rand() > len(self._orders) / number_of_orders_in_snapshot:
+                event = 0
+            side = 'buy' if self._random_state.rand() < 0.5 else 'sell'
+            # refill a side of the book before it can be emptied
+            thin_sides = [s for s in ('buy', 'sell') if len(self._levels[s]) < 2]
+            if thin_sides:
+                messages += self._add_order(side=thin_sides[0])
+            elif event == 0:
+                messages += self._add_order(side=side)
+            elif event == 1:
+                messages += self._cancel_order(order_id=self._random_order_id())
+            elif event == 2:
+                messages += self._trade(side=side)
+            else:
+                messages += self._change_order(order_id=self._random_order_id())
+        return messages
+
+    def to_tick_history(self, messages: list) -> pd.DataFrame:
+        """
+        Convert messages into the same layout as an Arctic TickStore query result.
+
+        :param messages: tick messages from `generate()`
+        :return: (pd.DataFrame) tick history indexed by system time
+        """
+        tick_history = pd.DataFrame(messages)
+        for column in tick_history.columns:
+            if tick_history[column].dtype == object:
+                tick_history[column] = tick_history[column].where(
+                    tick_history[column].notnull(), None)
+        tick_history.index = pd.to_datetime(tick_history['system_time'])
+        tick_history.index.name = 'index'
+        return tick_history
+
+    def _price(self, ticks: int) -> float:
+        """
+        Convert a price from units of tick size to a float.
+        """
+        return round(ticks * self.tick_size, 8)
+
+    def _size(self) -> float:
+        """
+        Draw an order size from a log-normal distribution.
+        """
+        return round(self._random_state.lognormal(mean=-1., sigma=1.) + 0.0001, 8)
+
+    def _best(self, side: str) -> int:
+        """
+        Best price on one side of the book (in units of tick size).
+        """
+        levels = self._levels[side]
+        return levels.peekitem(-1)[0] if side == 'buy' else levels.peekitem(0)[0]
+
+    def _new_order_id(self) -> str or int:
+        self._order_count += 1
+        if self.exchange == 'coinbase':
+            return str(uuid.UUID(int=self._order_count))
+        return 30000000000 + self._order_count
+
+    def _random_order_id(self) -> str or int:
+        return self._order_ids[self._random_state.randint(0, len(self._order_ids))]
+
+    def _rest(self, order_id: str or int, side: str, ticks: int, size: float) -> None:
+        """
+        Add an order to the generator's book.
+        """
+        self._orders[order_id] = [side, ticks, size]
+        self._levels[side].setdefault(ticks, list()).append(order_id)
+        self._order_index[order_id] = len(self._order_ids)
+        self._order_ids.append(order_id)
+
+    def _unrest(self, order_id: str or int) -> None:
+        """
+        Remove an order from the generator's book.
+        """
+        side, ticks, _ = self._orders.pop(order_id)
+        level = self._levels[side][ticks]
+        level.remove(order_id)
+        if len(level) == 0:
+            del self._levels[side][ticks]
+        # swap with the last order ID to remove from the list in O(1)
+        index = self._order_index.pop(order_id)
+        last_order_id = self._order_ids.pop()
+        if last_order_id != order_id:
+            self._order_ids[index] = last_order_id
+            self._order_index[last_order_id] = index
+
+    def _message(self, **kwargs) -> dict:
+        """
+        Create a message with the fields added by the recorder.
+        """
+        msg = dict(product_id=self.sym, **kwargs)
+        if self.exchange == 'coinbase':
+            self._sequence += 1
+            msg['sequence'] = self._sequence
+            msg['time'] = str(self._time)
+        msg['system_time'] = str(self._time)
+        return msg
+
+    def _load_book(self) -> list:
+        """
+        Create the order book snapshot messages.
+        """
+        for side in self._levels:
+            self._levels[side].clear()
+        self._orders.clear()
+        self._order_ids.clear()
+        self._order_index.clear()
+
+        messages = list()
+        if self.exchange == 'coinbase':
+            messages.append(dict(type='load_book', product_id=self.sym,
+                                 sequence=self._sequence,
+                                 system_time=str(self._time)))
+        else:
+            messages.append(dict(type='load_book', product_id=self.sym,
+                                 system_time=str(self._time)))
+
+        midpoint_ticks = int(round(self.midpoint / self.tick_size))
+        for side, direction in (('buy', -1), ('sell', 1)):
+            for level in range(self.book_depth):
+                ticks = midpoint_ticks + direction * (level + 1)
+                for _ in range(self.orders_per_level):
+                    order_id = self._new_order_id()
+                    size = self._size()
+                    self._rest(order_id=order_id, side=side, ticks=ticks, size=size)
+                    msg = dict(type='preload', order_id=order_id,
+                               price=self._price(ticks), size=size, side=side,
+                               product_id=self.sym, system_time=str(self._time))
+                    if self.exchange == 'coinbase':
+                        msg['sequence'] = self._sequence
+                        msg['time'] = str(self._time)
+                    messages.append(msg)
+
+        msg = dict(type='book_loaded', product_id=self.sym, system_time=str(self._time))
+        if self.exchange == 'coinbase':
+            msg['sequence'] = self._sequence
+        messages.append(msg)
+        return messages
+
+    def _add_order(self, side: str) -> list:
+        """
+        Place a new limit order without crossing the book. Half of the orders are
+        placed near the inside of the book, and the rest are spread evenly across the
+        depth of the book.
+        """
+        if self._random_state.rand() < 0.5:
+            offset = self._random_state.geometric(p=0.25) - 2
+        else:
+            offset = self._random_state.randint(-1, self.book_depth)
+        if side == 'buy':
+            ceiling = self._best('sell') - 1
+            ticks = self._best('buy') - offset
+            ticks = max(min(ticks, ceiling), ceiling - self.book_depth)
+        else:
+            floor = self._best('buy') + 1
+            ticks = self._best('sell') + offset
+            ticks = min(max(ticks, floor), floor + self.book_depth)
+
+        order_id = self._new_order_id()
+        size = self._size()
+        self._rest(order_id=order_id, side=side, ticks=ticks, size=size)
+        price = self._price(ticks)
+
+        if self.exchange == 'coinbase':
+            return [self._message(type='received', order_id=order_id,
+                                  order_type='limit', size=str(size),
+                                  price=str(price), side=side),
+                    self._message(type='open', order_id=order_id, price=str(price),
+                                  remaining_size=str(size), side=side)]
+        return [self._message(type='update', order_id=order_id, price=price,
+                              size=size, side=side)]
+
+    def _cancel_order(self, order_id: str or int) -> list:
+        """
+        Cancel a resting order.
+        """
+        side, ticks, size = self._orders[order_id]
+        self._unrest(order_id=order_id)
+        price = self._price(ticks)
+
+        if self.exchange == 'coinbase':
+            return [self._message(type='done', order_id=order_id, price=str(price),
+                                  remaining_size=str(size), reason='canceled',
+                                  side=side)]
+        return [self._message(type='update', order_id=order_id, price=0.,
+                              size=size, side=side)]
+
+    def _change_order(self, order_id: str or int) -> list:
+        """
+        Reduce the size of a resting order.
+        """
+        side, ticks, size = self._orders[order_id]
+        new_size = round(size * self._random_state.uniform(0.1, 0.9), 8)
+        self._orders[order_id][2] = new_size
+        price = self._price(ticks)
+
+        if self.exchange == 'coinbase':
+            return [self._message(type='change', order_id=order_id, price=str(price),
+                                  new_size=str(new_size), old_size=str(size),
+                                  side=side)]
+        return [self._message(type='update', order_id=order_id, price=price,
+                              size=new_size, side=side)]
+
+    def _trade(self, side: str) -> list:
+        """
+        Execute a market order against the oldest order at the best price on `side`.
+        """
+        ticks = self._best(side)
+        order_id = self._levels[side][ticks][0]
+        size = self._orders[order_id][2]
+        # market orders fill the resting order completely half the time
+        if self._random_state.rand() < 0.5:
+            trade_size = size
+        else:
+            trade_size = round(size * self._random_state.uniform(0.1, 0.9), 8)
+        remaining_size = round(size - trade_size, 8)
+        price = self._price(ticks)
+        self._trade_count += 1
+
+        if self.exchange == 'coinbase':
+            messages = [self._message(type='match', trade_id=self._trade_count,
+                                      maker_order_id=order_id,
+                                      taker_order_id=self._new_order_id(),
+                                      price=str(price), size=str(trade_size),
+                                      side=side)]
+            if remaining_size <= 0.:
+                self._unrest(order_id=order_id)
+                messages.append(self._message(type='done', order_id=order_id,
+                                              price=str(price), remaining_size='0',
+                                              reason='filled', side=side))
+            else:
+                self._orders[order_id][2] = remaining_size
+            return messages
+
+        # trades matched on the bids are sells, which Bitfinex records as negative
+        messages = [self._message(type='te', price=price,
+                                  size=trade_size if side == 'sell' else -trade_size,
+                                  side='upticks' if side == 'sell' else 'downticks')]
+        if remaining_size <= 0.:
+            self._unrest(order_id=order_id)
+            messages.append(self._message(type='update', order_id=order_id, price=0.,
+                                          size=size, side=side))
+        else:
+            self._orders[order_id][2] = remaining_size
+            messages.append(self._message(type='update', order_id=order_id,
+                                          price=price, size=remaining_size,
+                                          side=side))
+        return messages
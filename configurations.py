@@ -9,6 +9,7 @@ LOGGER = logging.getLogger('crypto_rl_log')
 
 # ./recorder.py
 SNAPSHOT_RATE = 1.0  # For example, 0.25 = 4x per second
+LATENCY_BUDGET_IN_MICROSECONDS = 50000  # from a LOB snapshot to the live agent's action
 BASKET = [('BTC-USD', 'tBTCUSD'),
           # ('ETH-USD', 'tETHUSD'),
           # ('LTC-USD', 'tLTCUSD')
@@ -33,12 +34,16 @@ TIMEZONE = tz.utc
 
 # ./data_recorder/database/simulator.py
 SNAPSHOT_RATE_IN_MICROSECONDS = 1000000  # 1 second
+REPEATS_COLUMN = 'repeats'  # number of consecutive snapshots stored in an exported row
 
 # ./gym_trading/utils/broker.py
 MARKET_ORDER_FEE = 0.0020
 LIMIT_ORDER_FEE = 0.0
 SLIPPAGE = 0.0005
 
+# ./gym_trading/utils/day_source.py
+DAY_CACHE_MAX_BYTES = 4 * 1024 ** 3  # memory budget of the prepared trading day cache
+
 # ./indicators/*
 INDICATOR_WINDOW = [60 * i for i in [5, 15]]  # Convert minutes to seconds
 INDICATOR_WINDOW_MAX = max(INDICATOR_WINDOW)
@@ -51,3 +56,6 @@ ENCOURAGEMENT = 0.000000000001
 # Data Directory
 ROOT_PATH = os.path.dirname(os.path.realpath(__file__))
 DATA_PATH = os.path.join(ROOT_PATH, 'data_recorder', 'database', 'data_exports')
+BENCHMARK_PATH = os.path.join(ROOT_PATH, 'benchmarks', 'results')
+SWEEP_PATH = os.path.join(ROOT_PATH, 'sweeps')
+BACKTEST_PATH = os.path.join(ROOT_PATH, 'backtests')
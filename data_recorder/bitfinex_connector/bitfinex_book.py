@@ -1,5 +1,7 @@
 from configurations import RECORD_DATA
+from data_recorder.connector_components import book_kernel as kernel
 from data_recorder.connector_components.book import Book
+from data_recorder.connector_components.compiled_book import CompiledBook
 
 
 class BitfinexBook(Book):
@@ -101,3 +103,76 @@ class BitfinexBook(Book):
 
         elif RECORD_DATA:
             print('remove_order: order_id not found %s\n' % msg)
+
+
+class CompiledBitfinexBook(CompiledBook):
+
+    def __init__(self, **kwargs):
+        super(CompiledBitfinexBook, self).__init__(**kwargs)
+
+    def insert_order(self, msg: dict) -> None:
+        """
+        Create new node.
+
+        :param msg: incoming new order
+        :return: (void)
+        """
+        price = msg['price']
+        self.order_map[msg['order_id']] = [price, msg['size']]
+        self._ensure_capacity()
+        kernel.insert_order(self._levels, self._size, price, abs(msg['size']))
+
+    def match(self, msg: dict) -> None:
+        """
+        Capture order arrival flows (i.e., incoming market orders) in the same way as
+        `BitfinexBook.match()`.
+
+        :param msg: buy or sell transaction message from Bitfinex
+        :return: (void)
+        """
+        price = msg.get('price', None)
+        if price is not None:
+            kernel.add_market(self._levels, self._size, price, abs(msg['size']))
+
+    def change(self, msg: dict) -> None:
+        """
+        Update inventory.
+
+        :param msg: order update message from Bitfinex
+        :return: (void)
+        """
+        old_order = self.order_map[msg['order_id']]
+        diff = msg['size'] - old_order[1]
+
+        vol_change = diff != float(0)
+        px_change = msg['price'] != old_order[0]
+
+        if px_change:
+            self.remove_order(msg)
+            self.insert_order(msg)
+
+        elif vol_change:
+            old_order[1] = msg['size']
+            kernel.add_quantity(self._levels, self._size, old_order[0], diff)
+
+    def remove_order(self, msg: dict) -> None:
+        """
+        Done messages result in the order being removed from map.
+
+        :param msg: remove order message from Bitfinex
+        :return: (void)
+        """
+        msg_order_id = msg.get('order_id', None)
+        if msg_order_id in self.order_map:
+            price, size = self.order_map.pop(msg_order_id)
+            order_size = abs(size)
+            # Note: Bitfinex does not have 'canceled' message types, thus every
+            # removal is captured by the cancel trackers (same as `BitfinexBook`).
+            if not kernel.remove_order(self._levels, self._size, price, order_size,
+                                       order_size, True):
+                print('remove_order: price not in msg...adj_price = {} '.format(
+                    price))
+                print('Incoming order: %s' % msg)
+
+        elif RECORD_DATA:
+            print('remove_order: order_id not found %s\n' % msg)
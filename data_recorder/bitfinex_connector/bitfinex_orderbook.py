@@ -3,7 +3,10 @@ from time import time
 import numpy as np
 
 from configurations import LOGGER
-from data_recorder.connector_components.orderbook import OrderBook
+from data_recorder.connector_components.orderbook import (
+    BOOK_LOADED, BUY, LOAD_BOOK, MESSAGE_TYPE_CODES, PRELOAD, SELL, TRADE, UPDATE,
+    OrderBook,
+)
 
 
 class BitfinexOrderBook(OrderBook):
@@ -11,6 +14,16 @@ class BitfinexOrderBook(OrderBook):
     def __init__(self, **kwargs):
         super(BitfinexOrderBook, self).__init__(exchange='bitfinex', **kwargs)
         self.channel_id = {'book': int(0), 'trades': int(0)}
+        # trade trackers indexed by the side of the trade
+        self._trade_trackers = (self.buy_tracker, self.sell_tracker)
+        # jump table of replay message handlers indexed by message type code
+        handlers = {UPDATE: self._process_update_replay,
+                    PRELOAD: self._process_preload_replay,
+                    TRADE: self._process_te_replay,
+                    LOAD_BOOK: self._process_load_book_replay,
+                    BOOK_LOADED: self._process_book_loaded_replay}
+        self._handlers = [handlers.get(message_type, self._process_unknown_replay)
+                          for message_type in range(len(MESSAGE_TYPE_CODES) + 1)]
 
     def new_tick(self, msg: dict):
         """
@@ -30,22 +43,8 @@ class BitfinexOrderBook(OrderBook):
         elif isinstance(msg, dict):
             if 'event' in msg:
                 return self._process_events(msg)
-            elif msg['type'] == 'te':
-                self.last_tick_time = msg.get('system_time', None)
-                return self._process_trades_replay(msg)
-            elif msg['type'] in ['update', 'preload']:
-                self.last_tick_time = msg.get('system_time', None)
-                return self._process_book_replay(msg)
-            elif msg['type'] == 'load_book':
-                self.clear_book()
-                return True
-            elif msg['type'] == 'book_loaded':
-                self.bids.warming_up = False
-                self.asks.warming_up = False
-                return True
-            else:
-                LOGGER.info('new_tick() message does not know how to be processed = %s' %
-                            str(msg))
+            message_type, side = self.decode_message(msg)
+            return self._handlers[message_type](msg, side)
 
         # unhandled exception
         else:
@@ -136,59 +135,49 @@ class BitfinexOrderBook(OrderBook):
 
             return True
 
-    def _process_book_replay(self, order):
-        """
-        Internal method to process FULL BOOK market data
-        :param order: incoming tick
-        :return: False if re-subscription in required
-        """
+    def _process_update_replay(self, msg: dict, side: int) -> bool:
+        self.last_tick_time = msg.get('system_time', None)
         # clean up the data types
-        order['price'] = float(order['price'])
-        order['size'] = float(order['size'])
-
-        if order['type'] == 'update':
-            # order should be removed from the book
-            if order['price'] == float(0):
-                if order['side'] == 'buy':
-                    self.bids.remove_order(order)
-                elif order['side'] == 'sell':
-                    self.asks.remove_order(order)
-            # order is a new order or size update for bids
-            elif order['side'] == 'buy':
-                if order['order_id'] in self.bids.order_map:
-                    self.bids.change(order)
-                else:
-                    self.bids.insert_order(order)
-            # order is a new order or size update for asks
-            elif order['side'] == 'sell':
-                if order['order_id'] in self.asks.order_map:
-                    self.asks.change(order)
-                else:
-                    self.asks.insert_order(order)
-            # unhandled tick message
-            else:
-                raise ValueError('_process_book_replay: unhandled message\n%s' % str(order))
+        msg['price'] = float(msg['price'])
+        msg['size'] = float(msg['size'])
+
+        book = self.books[side]
+        # order should be removed from the book
+        if msg['price'] == 0.:
+            book.remove_order(msg)
+        # order is a size update
+        elif msg['order_id'] in book.order_map:
+            book.change(msg)
+        # order is a new order
+        else:
+            book.insert_order(msg)
+        return True
 
-        elif order['type'] == 'preload':
-            if order['side'] == 'buy':
-                self.bids.insert_order(order)
-            else:
-                self.asks.insert_order(order)
+    def _process_preload_replay(self, msg: dict, side: int) -> bool:
+        self.last_tick_time = msg.get('system_time', None)
+        # clean up the data types
+        msg['price'] = float(msg['price'])
+        msg['size'] = float(msg['size'])
+        self.books[side].insert_order(msg)
+        return True
 
-        elif order['type'] == 'te':
-            trade_notional = order['price'] * order['size']
-            if order['side'] == 'upticks':
-                self.buy_tracker.add(notional=trade_notional)
-                self.asks.match(order)
-            else:
-                self.sell_tracker.add(notional=trade_notional)
-                self.bids.match(order)
+    def _process_te_replay(self, msg: dict, side: int) -> bool:
+        self.last_tick_time = msg.get('system_time', None)
+        return self._process_trades_replay(msg=msg, side=side)
 
-        else:
-            raise ValueError('_process_book_replay() Unhandled list msg %s' % order)
+    def _process_load_book_replay(self, msg: dict, side: int) -> bool:
+        self.clear_book()
+        return True
 
+    def _process_book_loaded_replay(self, msg: dict, side: int) -> bool:
+        self.bids.warming_up = False
+        self.asks.warming_up = False
         return True
 
+    def _process_unknown_replay(self, msg: dict, side: int) -> None:
+        LOGGER.info('new_tick() message does not know how to be processed = %s' %
+                    str(msg))
+
     def _process_trades(self, msg):
         """
         Internal method to process trade messages
@@ -215,18 +204,17 @@ class BitfinexOrderBook(OrderBook):
                 "product_id": self.sym
             }
             self.db.new_tick(trade)
-            return self._process_trades_replay(msg=trade)
+            return self._process_trades_replay(msg=trade,
+                                               side=BUY if side == 'upticks' else SELL)
 
         return True
 
-    def _process_trades_replay(self, msg):
+    def _process_trades_replay(self, msg: dict, side: int) -> bool:
         trade_notional = msg['price'] * msg['size']
-        if msg['side'] == 'upticks':
-            self.buy_tracker.add(notional=trade_notional)
-            self.asks.match(msg)
-        else:
-            self.sell_tracker.add(notional=trade_notional)
-            self.bids.match(msg)
+        # upticks are buys matched on the asks book, and downticks are sells matched
+        # on the bids book
+        self._trade_trackers[side].add(notional=trade_notional)
+        self.books[1 - side].match(msg)
         return True
 
     def _process_events(self, msg):
@@ -278,3 +266,14 @@ class BitfinexOrderBook(OrderBook):
             elif code == 10401:
                 LOGGER.info('\nBitfinex - %s: 10401 Not subscribed' % self.sym)
                 return True
+
+
+class CompiledBitfinexOrderBook(BitfinexOrderBook):
+
+    def __init__(self, **kwargs):
+        """
+        Bitfinex Order Book backed by the compiled price level kernel.
+
+        :param sym: Instrument or cryptocurrency pair name
+        """
+        super(CompiledBitfinexOrderBook, self).__init__(compiled=True, **kwargs)
@@ -1,5 +1,7 @@
 from configurations import LOGGER, RECORD_DATA
+from data_recorder.connector_components import book_kernel as kernel
 from data_recorder.connector_components.book import Book
+from data_recorder.connector_components.compiled_book import CompiledBook
 
 
 class CoinbaseBook(Book):
@@ -123,3 +125,80 @@ class CoinbaseBook(Book):
                             (msg['product_id'], str(price)))
 
             del self.order_map[msg_order_id]
+
+
+class CompiledCoinbaseBook(CompiledBook):
+
+    def __init__(self, **kwargs):
+        """
+        Coinbase Book constructor, backed by the compiled price level kernel.
+        """
+        super(CompiledCoinbaseBook, self).__init__(**kwargs)
+
+    def insert_order(self, msg: dict) -> None:
+        """
+        Create new node.
+
+        :param msg: incoming order message
+        """
+        msg_order_id = msg.get('order_id', None)
+        if msg_order_id not in self.order_map:
+            price = float(msg['price'])
+            size = float(msg.get('size') or msg['remaining_size'])
+            self.order_map[msg_order_id] = [price, size]
+            self._ensure_capacity()
+            kernel.insert_order(self._levels, self._size, price, size)
+
+    def match(self, msg: dict) -> None:
+        """
+        Change volume of book.
+
+        :param msg: incoming order message
+        """
+        msg_order_id = msg.get('maker_order_id', None)
+        if msg_order_id in self.order_map:
+            old_order = self.order_map[msg_order_id]
+            price = float(msg['price'])
+            remove_size = float(msg['size'])
+            if kernel.match_order(self._levels, self._size, price, remove_size,
+                                  old_order[0]):
+                old_order[0] = price
+                old_order[1] -= remove_size
+            else:
+                LOGGER.info('\nmatch: price not in tree already [%s]\n' % msg)
+        elif RECORD_DATA:
+            LOGGER.warn('\n%s match: order id cannot be found for %s\n' % (self.sym, msg))
+
+    def change(self, msg: dict) -> None:
+        """
+        Update inventory.
+
+        :param msg: incoming order message
+        """
+        if 'price' in msg:
+            msg_order_id = msg.get('order_id', None)
+            if msg_order_id in self.order_map:
+                old_order = self.order_map[msg_order_id]
+                new_size = float(msg['new_size'])
+                diff = old_order[1] - new_size
+                old_order[1] = new_size
+                kernel.remove_quantity(self._levels, self._size, old_order[0], diff)
+            elif RECORD_DATA:
+                LOGGER.info('\n%s change: missing order_ID [%s] from order_map\n' %
+                            (self.sym, msg))
+
+    def remove_order(self, msg: dict) -> None:
+        """
+        Done messages result in the order being removed from map.
+
+        :param msg: incoming order message
+        """
+        msg_order_id = msg.get('order_id', None)
+        if msg_order_id in self.order_map:
+            price, size = self.order_map.pop(msg_order_id)
+            is_canceled = msg.get('reason', None) == 'canceled'
+            cancel_size = float(msg.get('remaining_size') or 0.) if is_canceled else 0.
+            if not kernel.remove_order(self._levels, self._size, price, size,
+                                       cancel_size, is_canceled) and RECORD_DATA:
+                LOGGER.info('%s remove_order: price not in price_map [%s]' %
+                            (msg['product_id'], str(price)))
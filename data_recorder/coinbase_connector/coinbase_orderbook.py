@@ -5,7 +5,15 @@ import numpy as np
 import requests
 
 from configurations import COINBASE_BOOK_ENDPOINT, LOGGER, TIMEZONE
-from data_recorder.connector_components.orderbook import OrderBook
+from data_recorder.connector_components.orderbook import (
+    BOOK_LOADED, CHANGE, DONE, LOAD_BOOK, MATCH, MESSAGE_TYPE_CODES, OPEN, PRELOAD,
+    RECEIVED, OrderBook,
+)
+
+# message types used for data replays
+REPLAY_MESSAGE_TYPES = frozenset((LOAD_BOOK, BOOK_LOADED, PRELOAD))
+# message types of the Coinbase full channel
+BOOK_MESSAGE_TYPES = frozenset((RECEIVED, OPEN, DONE, MATCH, CHANGE))
 
 
 class CoinbaseOrderBook(OrderBook):
@@ -20,6 +28,20 @@ class CoinbaseOrderBook(OrderBook):
         super(CoinbaseOrderBook, self).__init__(exchange='coinbase', **kwargs)
         self.sequence = 0
         self.diff = 0
+        # trade trackers indexed by the side of the book that is matched
+        self._trade_trackers = (self.sell_tracker, self.buy_tracker)
+        # jump table of message handlers indexed by message type code; 'preload'
+        # messages are processed like 'open' messages
+        handlers = {RECEIVED: self._process_received,
+                    OPEN: self._process_open,
+                    DONE: self._process_done,
+                    MATCH: self._process_match,
+                    CHANGE: self._process_change,
+                    PRELOAD: self._process_open,
+                    LOAD_BOOK: self._process_load_book,
+                    BOOK_LOADED: self._process_book_loaded}
+        self._handlers = [handlers.get(message_type, self._process_unknown)
+                          for message_type in range(len(MESSAGE_TYPE_CODES) + 1)]
 
     def _get_book(self) -> dict:
         """
@@ -102,9 +124,9 @@ class CoinbaseOrderBook(OrderBook):
         :param msg: incoming tick
         :return: False if there is an exception
         """
-        message_type = msg['type']
+        message_type, side = self.decode_message(msg)
         if 'sequence' not in msg:
-            if message_type == 'subscriptions':
+            if msg['type'] == 'subscriptions':
                 # request an order book snapshot after the
                 #   websocket feed is established
                 LOGGER.info('Coinbase Subscriptions successful for : %s' % self.sym)
@@ -125,21 +147,21 @@ class CoinbaseOrderBook(OrderBook):
         if self.diff == 1:
             # tick sequences increase by an increment of one
             self.sequence = new_sequence
-        elif message_type in ['load_book', 'book_loaded', 'preload']:
+        elif message_type in REPLAY_MESSAGE_TYPES:
             # message types used for data replays
             self.sequence = new_sequence
         elif self.diff <= 0:
-            if message_type in ['received', 'open', 'done', 'match', 'change']:
+            if message_type in BOOK_MESSAGE_TYPES:
                 LOGGER.info('%s [%s] has a stale tick: current %i | incoming %i' % (
-                    self.sym, message_type, self.sequence, new_sequence))
+                    self.sym, msg['type'], self.sequence, new_sequence))
                 return True
             else:
                 LOGGER.warn('UNKNOWN-%s %s has a stale tick: current %i | incoming %i' % (
-                    self.sym, message_type, self.sequence, new_sequence))
+                    self.sym, msg['type'], self.sequence, new_sequence))
                 return True
         else:  # when the tick sequence difference is greater than 1
             LOGGER.info('sequence gap: %s missing %i messages. new_sequence: %i [%s]\n' %
-                        (self.sym, self.diff, new_sequence, message_type))
+                        (self.sym, self.diff, new_sequence, msg['type']))
             self.sequence = new_sequence
             return False
 
@@ -148,62 +170,51 @@ class CoinbaseOrderBook(OrderBook):
         self.last_tick_time = msg.get('time', None)
         # make sure CONFIGS.RECORDING is false when replaying data
 
-        side = msg['side']
-        if message_type == 'received':
-            return True
+        return self._handlers[message_type](msg, side)
 
-        elif message_type == 'open':
-            if side == 'buy':
-                self.bids.insert_order(msg)
-                return True
-            else:
-                self.asks.insert_order(msg)
-                return True
+    def _process_received(self, msg: dict, side: int) -> bool:
+        return True
 
-        elif message_type == 'done':
-            if side == 'buy':
-                self.bids.remove_order(msg)
-                return True
-            else:
-                self.asks.remove_order(msg)
-                return True
+    def _process_open(self, msg: dict, side: int) -> bool:
+        self.books[side].insert_order(msg)
+        return True
 
-        elif message_type == 'match':
-            trade_notional = float(msg['price']) * float(msg['size'])
-            if side == 'buy':  # trades matched on the bids book are considered sells
-                self.sell_tracker.add(notional=trade_notional)
-                self.bids.match(msg)
-                return True
-            else:  # trades matched on the asks book are considered buys
-                self.buy_tracker.add(notional=trade_notional)
-                self.asks.match(msg)
-                return True
+    def _process_done(self, msg: dict, side: int) -> bool:
+        self.books[side].remove_order(msg)
+        return True
 
-        elif message_type == 'change':
-            if side == 'buy':
-                self.bids.change(msg)
-                return True
-            else:
-                self.asks.change(msg)
-                return True
+    def _process_match(self, msg: dict, side: int) -> bool:
+        trade_notional = float(msg['price']) * float(msg['size'])
+        # trades matched on the bids book are considered sells, and trades matched
+        # on the asks book are considered buys
+        self._trade_trackers[side].add(notional=trade_notional)
+        self.books[side].match(msg)
+        return True
 
-        elif message_type == 'preload':
-            if side == 'buy':
-                self.bids.insert_order(msg)
-                return True
-            else:
-                self.asks.insert_order(msg)
-                return True
+    def _process_change(self, msg: dict, side: int) -> bool:
+        self.books[side].change(msg)
+        return True
 
-        elif message_type == 'load_book':
-            self.clear_book()
-            return True
+    def _process_load_book(self, msg: dict, side: int) -> bool:
+        self.clear_book()
+        return True
 
-        elif message_type == 'book_loaded':
-            self.bids.warming_up = self.asks.warming_up = False
-            LOGGER.info("Book finished loading at {}".format(self.last_tick_time))
-            return True
+    def _process_book_loaded(self, msg: dict, side: int) -> bool:
+        self.bids.warming_up = self.asks.warming_up = False
+        LOGGER.info("Book finished loading at {}".format(self.last_tick_time))
+        return True
 
-        else:
-            LOGGER.warn('\n\n\nunhandled message type\n%s\n\n' % str(msg))
-            return False
+    def _process_unknown(self, msg: dict, side: int) -> bool:
+        LOGGER.warn('\n\n\nunhandled message type\n%s\n\n' % str(msg))
+        return False
+
+
+class CompiledCoinbaseOrderBook(CoinbaseOrderBook):
+
+    def __init__(self, **kwargs):
+        """
+        Coinbase Order Book backed by the compiled price level kernel.
+
+        :param sym: Instrument or cryptocurrency pair name
+        """
+        super(CompiledCoinbaseOrderBook, self).__init__(compiled=True, **kwargs)
@@ -0,0 +1,300 @@
+import numpy as np
+
+from configurations import LOGGER
+
+try:
+    from numba import njit
+
+    NUMBA_ENABLED = True
+except ImportError:
+    NUMBA_ENABLED = False
+    LOGGER.info('numba is not installed: the book kernel will run as plain python.')
+
+
+    def njit(*args, **kwargs):
+        """
+        Stand-in for `numba.njit` which returns the python function untouched.
+        """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Column layout of the price level table. Each row is one price level, and rows are
+# kept sorted by price in ascending order, mirroring the `SortedDict` in `Book`.
+PRICE = 0
+QUANTITY = 1
+COUNT = 2
+NOTIONAL = 3
+# Trackers for order flow (same as `PriceLevel`)
+LIMIT_COUNT = 4
+LIMIT_QUANTITY = 5
+LIMIT_NOTIONAL = 6
+MARKET_COUNT = 7
+MARKET_QUANTITY = 8
+MARKET_NOTIONAL = 9
+CANCEL_COUNT = 10
+CANCEL_QUANTITY = 11
+CANCEL_NOTIONAL = 12
+NUMBER_OF_COLUMNS = 13
+
+# Row layout of the render buffer filled by `render_levels()`
+RENDER_DISTANCE = 0
+RENDER_NOTIONAL = 1
+RENDER_CANCEL_NOTIONAL = 2
+RENDER_LIMIT_NOTIONAL = 3
+RENDER_MARKET_NOTIONAL = 4
+NUMBER_OF_RENDER_ROWS = 5
+
+
+@njit
+def search_level(levels: np.ndarray, size: int, price: float) -> int:
+    """
+    Binary search for the row of a price level.
+
+    :param levels: price level table
+    :param size: number of price levels in use
+    :param price: price level to look up
+    :return: row number where the price is (or would be inserted)
+    """
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        if levels[middle, PRICE] < price:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+@njit
+def find_level(levels: np.ndarray, size: np.ndarray, price: float) -> int:
+    """
+    Get the row of an existing price level.
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level to look up
+    :return: row number, or -1 if the price level does not exist
+    """
+    row = search_level(levels, size[0], price)
+    if row < size[0] and levels[row, PRICE] == price:
+        return row
+    return -1
+
+
+@njit
+def create_level(levels: np.ndarray, size: np.ndarray, price: float) -> int:
+    """
+    Get the row of a price level, inserting a new row if it does not exist yet.
+
+    Note: the caller is responsible for making sure the table has a free row.
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level to look up or create
+    :return: row number of the price level
+    """
+    number_of_levels = size[0]
+    row = search_level(levels, number_of_levels, price)
+    if row < number_of_levels and levels[row, PRICE] == price:
+        return row
+    # shift the rows above the new price level up by one (backwards, since the
+    # source and destination overlap)
+    for i in range(number_of_levels, row, -1):
+        for j in range(NUMBER_OF_COLUMNS):
+            levels[i, j] = levels[i - 1, j]
+    for j in range(NUMBER_OF_COLUMNS):
+        levels[row, j] = 0.
+    levels[row, PRICE] = price
+    size[0] = number_of_levels + 1
+    return row
+
+
+@njit
+def delete_level(levels: np.ndarray, size: np.ndarray, row: int) -> None:
+    """
+    Remove a price level from the table.
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param row: row number of the price level to remove
+    :return: (void)
+    """
+    number_of_levels = size[0] - 1
+    for i in range(row, number_of_levels):
+        for j in range(NUMBER_OF_COLUMNS):
+            levels[i, j] = levels[i + 1, j]
+    size[0] = number_of_levels
+
+
+@njit
+def insert_order(levels: np.ndarray, size: np.ndarray, price: float,
+                 quantity: float) -> None:
+    """
+    Add a new limit order to a price level (equivalent to `PriceLevel.add_limit()`,
+    `PriceLevel.add_quantity()` and `PriceLevel.add_count()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: order price
+    :param quantity: order size
+    :return: (void)
+    """
+    row = create_level(levels, size, price)
+    levels[row, LIMIT_COUNT] += 1.
+    levels[row, LIMIT_QUANTITY] += quantity
+    levels[row, LIMIT_NOTIONAL] += quantity * price
+    levels[row, QUANTITY] += quantity
+    levels[row, NOTIONAL] += quantity * price
+    levels[row, COUNT] += 1.
+
+
+@njit
+def match_order(levels: np.ndarray, size: np.ndarray, price: float, quantity: float,
+                order_price: float) -> bool:
+    """
+    Execute a market order against a price level (equivalent to
+    `PriceLevel.add_market()` and `PriceLevel.remove_quantity()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level where the trade occurred
+    :param quantity: trade size
+    :param order_price: price of the resting order used for notional values
+    :return: TRUE if the price level exists
+    """
+    row = find_level(levels, size, price)
+    if row < 0:
+        return False
+    levels[row, MARKET_COUNT] += 1.
+    levels[row, MARKET_QUANTITY] += quantity
+    levels[row, MARKET_NOTIONAL] += quantity * order_price
+    levels[row, QUANTITY] -= quantity
+    levels[row, NOTIONAL] -= quantity * order_price
+    return True
+
+
+@njit
+def add_market(levels: np.ndarray, size: np.ndarray, price: float,
+               quantity: float) -> bool:
+    """
+    Record a market order arrival without changing the price level's inventory
+    (equivalent to `PriceLevel.add_market()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level where the trade occurred
+    :param quantity: trade size
+    :return: TRUE if the price level exists
+    """
+    row = find_level(levels, size, price)
+    if row < 0:
+        return False
+    levels[row, MARKET_COUNT] += 1.
+    levels[row, MARKET_QUANTITY] += quantity
+    levels[row, MARKET_NOTIONAL] += quantity * price
+    return True
+
+
+@njit
+def add_quantity(levels: np.ndarray, size: np.ndarray, price: float,
+                 quantity: float) -> bool:
+    """
+    Add units to a price level (equivalent to `PriceLevel.add_quantity()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level
+    :param quantity: order size
+    :return: TRUE if the price level exists
+    """
+    row = find_level(levels, size, price)
+    if row < 0:
+        return False
+    levels[row, QUANTITY] += quantity
+    levels[row, NOTIONAL] += quantity * price
+    return True
+
+
+@njit
+def remove_quantity(levels: np.ndarray, size: np.ndarray, price: float,
+                    quantity: float) -> bool:
+    """
+    Remove units from a price level (equivalent to `PriceLevel.remove_quantity()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level
+    :param quantity: order size
+    :return: TRUE if the price level exists
+    """
+    row = find_level(levels, size, price)
+    if row < 0:
+        return False
+    levels[row, QUANTITY] -= quantity
+    levels[row, NOTIONAL] -= quantity * price
+    return True
+
+
+@njit
+def remove_order(levels: np.ndarray, size: np.ndarray, price: float, quantity: float,
+                 cancel_quantity: float, is_canceled: bool) -> bool:
+    """
+    Remove a resting order from a price level, and remove the price level once it is
+    empty (equivalent to `PriceLevel.add_cancel()`, `PriceLevel.remove_quantity()`,
+    `PriceLevel.remove_count()` and `Book.remove_price()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param price: price level
+    :param quantity: order size removed from the price level
+    :param cancel_quantity: order size recorded by the cancel tracker
+    :param is_canceled: if TRUE, the order removal is recorded as a cancellation
+    :return: TRUE if the price level exists
+    """
+    row = find_level(levels, size, price)
+    if row < 0:
+        return False
+    if is_canceled:
+        levels[row, CANCEL_COUNT] += 1.
+        levels[row, CANCEL_QUANTITY] += cancel_quantity
+        levels[row, CANCEL_NOTIONAL] += cancel_quantity * price
+    levels[row, QUANTITY] -= quantity
+    levels[row, NOTIONAL] -= quantity * price
+    levels[row, COUNT] -= 1.
+    if levels[row, COUNT] == 0.:
+        delete_level(levels, size, row)
+    return True
+
+
+@njit
+def render_levels(levels: np.ndarray, size: np.ndarray, midpoint: float,
+                  ascending: bool, max_rows: int, rows_to_clear: int,
+                  out: np.ndarray) -> int:
+    """
+    Walk the top of the book to derive the LOB feature set and clear the order flow
+    trackers (equivalent to `Book.get_asks_to_list()` and `Book.get_bids_to_list()`).
+
+    :param levels: price level table
+    :param size: single element array with the number of price levels in use
+    :param midpoint: current midpoint
+    :param ascending: TRUE to walk the table from the lowest price (asks),
+        FALSE to walk from the highest price (bids)
+    :param max_rows: number of price levels to render
+    :param rows_to_clear: number of price levels to clear the trackers on
+    :param out: render buffer of shape (NUMBER_OF_RENDER_ROWS, max_rows)
+    :return: number of price levels rendered
+    """
+    number_of_levels = size[0]
+    rows = min(number_of_levels, rows_to_clear)
+    for i in range(rows):
+        row = i if ascending else number_of_levels - 1 - i
+        if i < max_rows:
+            out[RENDER_DISTANCE, i] = (levels[row, PRICE] / midpoint) - 1.
+            out[RENDER_NOTIONAL, i] = levels[row, NOTIONAL]
+            out[RENDER_CANCEL_NOTIONAL, i] = levels[row, CANCEL_NOTIONAL]
+            out[RENDER_LIMIT_NOTIONAL, i] = levels[row, LIMIT_NOTIONAL]
+            out[RENDER_MARKET_NOTIONAL, i] = levels[row, MARKET_NOTIONAL]
+        for j in range(LIMIT_COUNT, NUMBER_OF_COLUMNS):
+            levels[row, j] = 0.
+    return min(rows, max_rows)
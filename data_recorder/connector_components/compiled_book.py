@@ -0,0 +1,189 @@
+from abc import ABC
+
+import numpy as np
+
+from configurations import INCLUDE_ORDERFLOW, MAX_BOOK_ROWS
+from data_recorder.connector_components import book_kernel as kernel
+from data_recorder.connector_components.book import Book
+from data_recorder.connector_components.price_level import PriceLevel
+
+
+class CompiledBook(Book, ABC):
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, sym: str, side: str):
+        """
+        Book backed by a price level table stored in a numpy array and updated with
+        the (numba compiled, if installed) functions in `book_kernel.py`.
+
+        Outputs are identical to `Book`, but the `price_dict` is replaced by the
+        price level table, and the `order_map` only stores [price, size] per order.
+
+        :param sym: currency symbol
+        :param side: 'bids' or 'asks'
+        """
+        super(CompiledBook, self).__init__(sym=sym, side=side)
+        self.price_dict = None
+        self._levels = np.zeros((CompiledBook.INITIAL_CAPACITY,
+                                 kernel.NUMBER_OF_COLUMNS), dtype=np.float64)
+        self._size = np.zeros(1, dtype=np.int64)
+        self._render_buffer = np.zeros((kernel.NUMBER_OF_RENDER_ROWS, MAX_BOOK_ROWS),
+                                       dtype=np.float64)
+
+    def __len__(self):
+        return int(self._size[0])
+
+    def clear(self) -> None:
+        """
+        Reset price level table and order map.
+
+        :return: void
+        """
+        self._levels[:] = 0.
+        self._size[0] = 0
+        self.order_map = dict()
+        self.warming_up = True
+
+    def _ensure_capacity(self) -> None:
+        """
+        Double the price level table when all rows are in use.
+
+        :return: void
+        """
+        if self._size[0] < self._levels.shape[0]:
+            return
+        levels = np.zeros((self._levels.shape[0] * 2, kernel.NUMBER_OF_COLUMNS),
+                          dtype=np.float64)
+        levels[:self._levels.shape[0]] = self._levels
+        self._levels = levels
+
+    def create_price(self, price: float) -> None:
+        """
+        Create new node.
+
+        :param price: price level to create in LOB
+        :return:
+        """
+        self._ensure_capacity()
+        kernel.create_level(self._levels, self._size, price)
+
+    def remove_price(self, price: float) -> None:
+        """
+        Remove node.
+
+        :param price: price level to remove from LOB
+        :return:
+        """
+        row = kernel.find_level(self._levels, self._size, price)
+        if row >= 0:
+            kernel.delete_level(self._levels, self._size, row)
+
+    def has_price(self, price: float) -> bool:
+        """
+        Check if a price level exists in the LOB.
+
+        :param price: price level to look up
+        :return: TRUE if the price level exists
+        """
+        return kernel.find_level(self._levels, self._size, price) >= 0
+
+    def _get_price_level(self, row: int) -> (float, PriceLevel):
+        """
+        Create a `PriceLevel` from a row in the price level table.
+
+        :param row: row number of the price level
+        :return: (float) price, (PriceLevel) copy of the price level
+        """
+        values = self._levels[row].tolist()
+        price = values[kernel.PRICE]
+        level = PriceLevel(price=price, quantity=values[kernel.QUANTITY])
+        level._count = int(values[kernel.COUNT])
+        level._notional = values[kernel.NOTIONAL]
+        level._limit_count = int(values[kernel.LIMIT_COUNT])
+        level._limit_quantity = values[kernel.LIMIT_QUANTITY]
+        level._limit_notional = values[kernel.LIMIT_NOTIONAL]
+        level._market_count = int(values[kernel.MARKET_COUNT])
+        level._market_quantity = values[kernel.MARKET_QUANTITY]
+        level._market_notional = values[kernel.MARKET_NOTIONAL]
+        level._cancel_count = int(values[kernel.CANCEL_COUNT])
+        level._cancel_quantity = values[kernel.CANCEL_QUANTITY]
+        level._cancel_notional = values[kernel.CANCEL_NOTIONAL]
+        return price, level
+
+    def get_ask(self) -> (float, PriceLevel):
+        """
+        Best offer
+
+        :return: (float) inside ask, (PriceLevel) ask size and number of orders
+        """
+        if self._size[0] > 0:
+            return self._get_price_level(row=0)
+        else:
+            return 0.0, PriceLevel(price=0., quantity=0.)
+
+    def get_bid(self) -> (float, PriceLevel):
+        """
+        Best bid
+
+        :return: (float) inside bid, (PriceLevel) bid size and number of orders
+        """
+        if self._size[0] > 0:
+            return self._get_price_level(row=int(self._size[0]) - 1)
+        else:
+            return 0.0, PriceLevel(price=0., quantity=0.)
+
+    def _render(self, midpoint: float, ascending: bool) -> tuple:
+        """
+        Walk the LOB with the kernel and copy the results into the render arrays.
+
+        Notional values are rounded with python's `round()` to match `PriceLevel`.
+
+        :param midpoint: current midpoint
+        :param ascending: TRUE for asks, FALSE for bids
+        :return: tuple containing derived LOB feature set
+        """
+        book_rows_to_clear = Book.CLEAR_MAX_ROWS if INCLUDE_ORDERFLOW else MAX_BOOK_ROWS
+        rows = kernel.render_levels(self._levels, self._size, midpoint, ascending,
+                                    MAX_BOOK_ROWS, book_rows_to_clear,
+                                    self._render_buffer)
+        buffer = self._render_buffer[:, :rows]
+        self._distances[:rows] = buffer[kernel.RENDER_DISTANCE]
+        self._notionals[:rows] = [
+            round(notional, 2) for notional in buffer[kernel.RENDER_NOTIONAL].tolist()]
+
+        # append all the data points together
+        book_data = (self._distances, self._notionals,)
+
+        # include order flow arrival statistics
+        if INCLUDE_ORDERFLOW:
+            self._cancel_notionals[:rows] = [
+                round(notional, 2) for notional in
+                buffer[kernel.RENDER_CANCEL_NOTIONAL].tolist()]
+            self._limit_notionals[:rows] = [
+                round(notional, 2) for notional in
+                buffer[kernel.RENDER_LIMIT_NOTIONAL].tolist()]
+            self._market_notionals[:rows] = [
+                round(notional, 2) for notional in
+                buffer[kernel.RENDER_MARKET_NOTIONAL].tolist()]
+            book_data += (self._cancel_notionals, self._limit_notionals,
+                          self._market_notionals,)
+
+        return book_data
+
+    def get_asks_to_list(self, midpoint: float) -> tuple:
+        """
+        Walk the LOB to derive the same feature set as `Book.get_asks_to_list()`.
+
+        :param midpoint: current midpoint
+        :return: tuple containing derived LOB feature set
+        """
+        return self._render(midpoint=midpoint, ascending=True)
+
+    def get_bids_to_list(self, midpoint: float) -> tuple:
+        """
+        Walk the LOB to derive the same feature set as `Book.get_bids_to_list()`.
+
+        :param midpoint: current midpoint
+        :return: tuple containing derived LOB feature set
+        """
+        return self._render(midpoint=midpoint, ascending=False)
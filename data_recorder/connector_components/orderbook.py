@@ -3,29 +3,52 @@ from abc import ABC, abstractmethod
 import numpy as np
 
 from configurations import INCLUDE_ORDERFLOW, LOGGER, MAX_BOOK_ROWS
-from data_recorder.bitfinex_connector.bitfinex_book import BitfinexBook
-from data_recorder.coinbase_connector.coinbase_book import CoinbaseBook
+from data_recorder.bitfinex_connector.bitfinex_book import (
+    BitfinexBook, CompiledBitfinexBook,
+)
+from data_recorder.coinbase_connector.coinbase_book import (
+    CoinbaseBook, CompiledCoinbaseBook,
+)
 from data_recorder.connector_components.trade_tracker import TradeTracker
 from data_recorder.database.database import Database
 
+# message types and sides are decoded into small integer codes once per message, so
+# ticks are dispatched through jump tables instead of chains of string comparisons
+(UNKNOWN, RECEIVED, OPEN, DONE, MATCH, CHANGE, UPDATE, TRADE, PRELOAD, LOAD_BOOK,
+ BOOK_LOADED) = range(11)
+MESSAGE_TYPE_CODES = dict(received=RECEIVED, open=OPEN, done=DONE, match=MATCH,
+                          change=CHANGE, update=UPDATE, te=TRADE, preload=PRELOAD,
+                          load_book=LOAD_BOOK, book_loaded=BOOK_LOADED)
+# sides index (bids, asks) tuples; as before, any side that is not a buy is a sell
+BUY, SELL = 0, 1
+SIDE_CODES = dict(buy=BUY, upticks=BUY)
+
 BOOK_BY_EXCHANGE = dict(coinbase=CoinbaseBook, bitfinex=BitfinexBook)
+COMPILED_BOOK_BY_EXCHANGE = dict(coinbase=CompiledCoinbaseBook,
+                                 bitfinex=CompiledBitfinexBook)
 
 
 class OrderBook(ABC):
 
-    def __init__(self, sym: str, exchange: str):
+    def __init__(self, sym: str, exchange: str, compiled: bool = False):
         """
         OrderBook constructor.
 
         :param sym: instrument name
         :param exchange: 'coinbase' or 'bitfinex' or 'bitmex'
+        :param compiled: if TRUE, use the array-backed books from `compiled_book.py`
         """
         self.sym = sym
         self.db = Database(sym=sym, exchange=exchange)
-        self.db.init_db_connection()
-        self.bids = BOOK_BY_EXCHANGE[exchange](sym=sym, side='bids')
-        self.asks = BOOK_BY_EXCHANGE[exchange](sym=sym, side='asks')
+        # only connect to Arctic when recording, since replays do not write ticks
+        if self.db.recording:
+            self.db.init_db_connection()
+        book_by_exchange = COMPILED_BOOK_BY_EXCHANGE if compiled else BOOK_BY_EXCHANGE
+        self.bids = book_by_exchange[exchange](sym=sym, side='bids')
+        self.asks = book_by_exchange[exchange](sym=sym, side='asks')
         self.exchange = exchange
+        # bids and asks indexed by side code
+        self.books = (self.bids, self.asks)
         self.midpoint = float()
         self.spread = float()
         self.buy_tracker = TradeTracker()
@@ -46,6 +69,17 @@ class OrderBook(ABC):
         """
         return True
 
+    @staticmethod
+    def decode_message(msg: dict) -> (int, int):
+        """
+        Decode the message type and side of a tick into integer codes.
+
+        :param msg: incoming tick
+        :return: (int) message type code, and (int) side code
+        """
+        return (MESSAGE_TYPE_CODES.get(msg['type'], UNKNOWN),
+                SIDE_CODES.get(msg.get('side'), SELL))
+
     def clear_trade_trackers(self) -> None:
         """
         Reset buy and sell trade trackers; used between LOB snapshots.
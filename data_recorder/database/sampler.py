@@ -0,0 +1,320 @@
+# sampler.py
+#
+#   Strategies for deciding when LOB snapshots are taken while replaying tick history
+#
+#
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from configurations import REPEATS_COLUMN, SNAPSHOT_RATE_IN_MICROSECONDS
+
+# order flow and trade features accumulate between snapshots, whereas all other LOB
+# features describe the state of the book at the time of the snapshot
+FLOW_FEATURES = ('buys', 'sells')
+FLOW_FEATURE_TYPES = ('_cancel_notional_', '_limit_notional_', '_market_notional_')
+TRADE_TICK_TYPES = ('match', 'te')
+
+
+def get_flow_feature_mask(feature_names: list) -> np.ndarray:
+    """
+    Get a mask of the order flow and trade features in a LOB snapshot.
+
+    :param feature_names: LOB feature names (e.g., `render_lob_feature_names()`)
+    :return: (np.array) TRUE for features accumulated between snapshots
+    """
+    return np.array([name in FLOW_FEATURES or
+                     any(feature_type in name for feature_type in FLOW_FEATURE_TYPES)
+                     for name in feature_names], dtype=np.bool_)
+
+
+class Sampler(ABC):
+
+    def __init__(self):
+        """
+        Base class for LOB snapshot sampling strategies.
+
+        Several samplers can be used in the same replay; the order book is rendered
+        whenever any sampler takes a snapshot, so each sampler accumulates the order
+        flow and trades of every render since its own last snapshot.
+        """
+        self.snapshots = list()
+        self.snapshot_times = list()
+        self.repeats = list()
+        self._flow_mask = None
+        self._flow = None
+
+    def __str__(self):
+        return '{}: [label={} | snapshots={}]'.format(
+            self.__class__.__name__, self.label, len(self.snapshots))
+
+    @property
+    @abstractmethod
+    def label(self) -> str:
+        """
+        Name of the sampler, used to name its outputs (e.g., '1s').
+
+        :return: (str) label
+        """
+        pass
+
+    def reset(self, start_time: int, flow_mask: np.ndarray) -> None:
+        """
+        Reset the sampler at the start of a replay.
+
+        :param start_time: time of the first tick after the order book is loaded
+            (nanoseconds since the epoch)
+        :param flow_mask: mask of the order flow and trade features in a LOB snapshot
+        :return: (void)
+        """
+        self.snapshots.clear()
+        self.snapshot_times.clear()
+        self.repeats.clear()
+        self._flow_mask = flow_mask
+        self._flow = np.zeros(int(flow_mask.sum()), dtype=np.float64)
+
+    @abstractmethod
+    def get_snapshot_times(self, tick_time: int, tick: dict, order_book) -> Sequence:
+        """
+        Get the times of the snapshots to take before processing a tick.
+
+        :param tick_time: time of the incoming tick (nanoseconds since the epoch)
+        :param tick: incoming tick
+        :param order_book: (OrderBook) order book, which has processed every tick
+            before the incoming tick
+        :return: snapshot times (empty if no snapshot is taken)
+        """
+        pass
+
+    def add_flow(self, snapshot: np.ndarray) -> None:
+        """
+        Accumulate the order flow and trades of a LOB render.
+
+        :param snapshot: output of `render_book()`
+        :return: (void)
+        """
+        self._flow += snapshot[self._flow_mask]
+
+    def add_snapshots(self, snapshot: np.ndarray, snapshot_times: Sequence) -> None:
+        """
+        Take snapshots with the accumulated order flow and trades.
+
+        Snapshots taken from the same render are identical apart from their time, so
+        they are run-length encoded: a single row is stored with the time of the first
+        snapshot in `snapshot_times`, and the number of snapshots in `repeats`.
+
+        :param snapshot: output of `render_book()` (after `add_flow()`)
+        :param snapshot_times: times of the snapshots (nanoseconds since the epoch)
+        :return: (void)
+        """
+        snapshot = snapshot.copy()
+        snapshot[self._flow_mask] = self._flow
+        self._flow[:] = 0.
+        self.snapshots.append(snapshot)
+        self.snapshot_times.append(snapshot_times[0])
+        self.repeats.append(len(snapshot_times))
+
+
+class TimeSampler(Sampler):
+
+    def __init__(self, snapshot_rate: int = SNAPSHOT_RATE_IN_MICROSECONDS):
+        """
+        Take snapshots at a fixed wall-clock interval. If no ticks arrive during an
+        interval, the previous snapshot is repeated (see `expand_snapshots()`).
+
+        :param snapshot_rate: number of microseconds between snapshots
+        """
+        super().__init__()
+        assert snapshot_rate > 0, \
+            "Error: snapshot_rate must be positive, not {}".format(snapshot_rate)
+        self.snapshot_rate = snapshot_rate
+        self._interval = snapshot_rate * 1000
+        self._last_snapshot_time = None
+
+    @property
+    def label(self) -> str:
+        return get_snapshot_rate_label(snapshot_rate=self.snapshot_rate)
+
+    def reset(self, start_time: int, flow_mask: np.ndarray) -> None:
+        super().reset(start_time=start_time, flow_mask=flow_mask)
+        self._last_snapshot_time = start_time
+
+    def get_snapshot_times(self, tick_time: int, tick: dict, order_book) -> Sequence:
+        # derive the number of LOB snapshot insertions for the data buffer; ticks
+        # that are out of sequence (i.e., older than the last snapshot) do not
+        # trigger snapshots
+        multiple = (tick_time - self._last_snapshot_time) // self._interval
+        if multiple <= 0:
+            return ()
+
+        first_snapshot_time = self._last_snapshot_time + self._interval
+        self._last_snapshot_time += multiple * self._interval
+        return range(first_snapshot_time, self._last_snapshot_time + 1, self._interval)
+
+
+class EventSampler(Sampler, ABC):
+
+    def __init__(self, threshold: float):
+        """
+        Base class for event-driven sampling: a single snapshot is taken once the
+        number of events since the last snapshot reaches `threshold`, so the number of
+        snapshots follows market activity and quiet periods do not repeat snapshots.
+
+        Events are counted once the order book has processed a tick, so snapshots are
+        taken before the next tick is processed and are timestamped with the time of
+        the last tick processed by the order book.
+
+        :param threshold: number of events between snapshots
+        """
+        super().__init__()
+        assert threshold > 0, \
+            "Error: threshold must be positive, not {}".format(threshold)
+        self.threshold = threshold
+        self._events = 0.
+        self._last_tick_time = None
+
+    def reset(self, start_time: int, flow_mask: np.ndarray) -> None:
+        super().reset(start_time=start_time, flow_mask=flow_mask)
+        self._events = 0.
+        self._last_tick_time = start_time
+
+    @abstractmethod
+    def _get_events(self, tick: dict, order_book) -> float:
+        """
+        Count the events of the last tick processed by the order book.
+
+        :param tick: incoming tick (not processed by the order book yet)
+        :param order_book: (OrderBook) order book, which has processed every tick
+            before the incoming tick
+        :return: (float) number of events
+        """
+        pass
+
+    def get_snapshot_times(self, tick_time: int, tick: dict, order_book) -> Sequence:
+        snapshot_times = ()
+        self._events += self._get_events(tick=tick, order_book=order_book)
+        if self._events >= self.threshold:
+            self._events = 0.
+            snapshot_times = (self._last_tick_time,)
+
+        # stale ticks can be older than the last tick, but timestamps must not go back
+        if tick_time > self._last_tick_time:
+            self._last_tick_time = tick_time
+        return snapshot_times
+
+
+class MessageSampler(EventSampler):
+
+    def __init__(self, number_of_messages: int = 1000):
+        """
+        Take a snapshot every `number_of_messages` ticks (i.e., tick-time sampling).
+
+        :param number_of_messages: number of ticks between snapshots
+        """
+        super().__init__(threshold=number_of_messages)
+
+    @property
+    def label(self) -> str:
+        return '{}_messages'.format(self.threshold)
+
+    def _get_events(self, tick: dict, order_book) -> float:
+        return 1.
+
+
+class NotionalSampler(EventSampler):
+
+    def __init__(self, notional: float = 1000000.):
+        """
+        Take a snapshot every time `notional` is traded (i.e., volume bars).
+
+        Note: trades larger than `notional` result in one snapshot, rather than one
+        snapshot per multiple of `notional`.
+
+        :param notional: traded notional value between snapshots
+        """
+        super().__init__(threshold=notional)
+        self._tick_notional = 0.
+
+    @property
+    def label(self) -> str:
+        return '{:g}_notional'.format(self.threshold)
+
+    def reset(self, start_time: int, flow_mask: np.ndarray) -> None:
+        super().reset(start_time=start_time, flow_mask=flow_mask)
+        self._tick_notional = 0.
+
+    def _get_events(self, tick: dict, order_book) -> float:
+        # the notional of the incoming tick is counted once it has been processed;
+        # 'match' ticks are trades on Coinbase and 'te' ticks are trades on Bitfinex
+        # (where sell trades have a negative size)
+        notional = self._tick_notional
+        if tick['type'] in TRADE_TICK_TYPES:
+            self._tick_notional = abs(float(tick['price']) * float(tick['size']))
+        else:
+            self._tick_notional = 0.
+        return notional
+
+
+class MidpointSampler(EventSampler):
+
+    def __init__(self, number_of_changes: int = 10):
+        """
+        Take a snapshot every `number_of_changes` changes in the midpoint price.
+
+        :param number_of_changes: number of midpoint changes between snapshots
+        """
+        super().__init__(threshold=number_of_changes)
+        self._last_midpoint = None
+
+    @property
+    def label(self) -> str:
+        return '{}_midpoint_changes'.format(self.threshold)
+
+    def reset(self, start_time: int, flow_mask: np.ndarray) -> None:
+        super().reset(start_time=start_time, flow_mask=flow_mask)
+        self._last_midpoint = None
+
+    def _get_events(self, tick: dict, order_book) -> float:
+        midpoint = (order_book.best_bid[0] + order_book.best_ask[0]) / 2.
+        changed = self._last_midpoint is not None and midpoint != self._last_midpoint
+        self._last_midpoint = midpoint
+        return 1. if changed else 0.
+
+
+def expand_snapshots(data: pd.DataFrame, snapshot_rate: int or None = None) \
+        -> pd.DataFrame:
+    """
+    Expand run-length encoded LOB snapshots into one row per snapshot.
+
+    :param data: (pd.DataFrame) LOB snapshots with a REPEATS_COLUMN, as returned by
+        `Simulator.replay_tick_history()`
+    :param snapshot_rate: number of microseconds between the snapshots of a
+        `TimeSampler`, used to derive the time of the repeated snapshots; if NONE,
+        repeated snapshots keep the time of the first snapshot
+    :return: (pd.DataFrame) LOB snapshots without a REPEATS_COLUMN
+    """
+    repeats = data[REPEATS_COLUMN].to_numpy(dtype=np.int64)
+    expanded = data.drop(REPEATS_COLUMN, axis=1).iloc[
+        np.repeat(np.arange(repeats.shape[0]), repeats)].reset_index(drop=True)
+    if snapshot_rate is not None:
+        # number of intervals since the first snapshot of each run
+        offsets = np.arange(expanded.shape[0]) - np.repeat(np.cumsum(repeats) - repeats,
+                                                          repeats)
+        expanded['system_time'] += pd.to_timedelta(offsets * snapshot_rate, unit='us')
+    return expanded
+
+
+def get_snapshot_rate_label(snapshot_rate: int) -> str:
+    """
+    Get a readable label for a snapshot rate (e.g., 1000000 -> '1s').
+
+    :param snapshot_rate: number of microseconds between snapshots
+    :return: (str) label
+    """
+    if snapshot_rate % 1000000 == 0:
+        return '{}s'.format(snapshot_rate // 1000000)
+    if snapshot_rate % 1000 == 0:
+        return '{}ms'.format(snapshot_rate // 1000)
+    return '{}us'.format(snapshot_rate)
@@ -1,18 +1,25 @@
 import os
 from datetime import datetime as dt
-from datetime import timedelta
 from typing import Type, Union
 
 import numpy as np
 import pandas as pd
-from dateutil.parser import parse
 
-from configurations import DATA_PATH, LOGGER, SNAPSHOT_RATE_IN_MICROSECONDS, TIMEZONE
-from data_recorder.bitfinex_connector.bitfinex_orderbook import BitfinexOrderBook
-from data_recorder.coinbase_connector.coinbase_orderbook import CoinbaseOrderBook
+from configurations import (
+    DATA_PATH, LOGGER, REPEATS_COLUMN, SNAPSHOT_RATE_IN_MICROSECONDS, TIMEZONE,
+)
+from data_recorder.bitfinex_connector.bitfinex_orderbook import (
+    BitfinexOrderBook, CompiledBitfinexOrderBook,
+)
+from data_recorder.coinbase_connector.coinbase_orderbook import (
+    CoinbaseOrderBook, CompiledCoinbaseOrderBook,
+)
 from data_recorder.database.database import Database
+from data_recorder.database.sampler import TimeSampler, get_flow_feature_mask
 
 DATA_EXPORTS_PATH = DATA_PATH
+# missing timestamps (NaT) after converting tick times to nanoseconds since the epoch
+NAT = np.iinfo(np.int64).min
 
 
 def _get_exchange_from_symbol(symbol: str) -> str:
@@ -35,26 +42,33 @@ def _get_exchange_from_symbol(symbol: str) -> str:
     return symbol_inventory[symbol]
 
 
-def _get_orderbook_from_exchange(exchange: str) -> \
+def _get_orderbook_from_exchange(exchange: str, compiled: bool = False) -> \
         Type[Union[CoinbaseOrderBook, BitfinexOrderBook]]:
     """
     Get order book given an exchange name.
 
     :param exchange: name of exchange ['bitfinex' or 'coinbase']
+    :param compiled: if TRUE, get the order book backed by the compiled book kernel
     :return: order book for 'exchange'
     """
+    if compiled:
+        return dict(coinbase=CompiledCoinbaseOrderBook,
+                    bitfinex=CompiledBitfinexOrderBook)[exchange]
     return dict(coinbase=CoinbaseOrderBook, bitfinex=BitfinexOrderBook)[exchange]
 
 
-def get_orderbook_from_symbol(symbol: str) -> \
+def get_orderbook_from_symbol(symbol: str, compiled: bool = False) -> \
         Type[Union[CoinbaseOrderBook, BitfinexOrderBook]]:
     """
     Get order book given an instrument name.
 
     :param symbol: instrument name
+    :param compiled: if TRUE, get the order book backed by the compiled book kernel
+        (outputs are identical to the pure python order book)
     :return: order book for 'symbol'
     """
-    return _get_orderbook_from_exchange(exchange=_get_exchange_from_symbol(symbol=symbol))
+    return _get_orderbook_from_exchange(exchange=_get_exchange_from_symbol(symbol=symbol),
+                                        compiled=compiled)
 
 
 class Simulator(object):
@@ -115,28 +129,10 @@ class Simulator(object):
 
         return ema_labels
 
-    @staticmethod
-    def _get_microsecond_delta(new_tick_time: dt, last_snapshot_time: dt) -> int:
-        """
-        Calculate difference between two consecutive ticks.
-
-        Note: only tracks timedelta for up to a minute.
-
-        :param new_tick_time: datetime of incoming tick
-        :param last_snapshot_time: datetime of last LOB snapshot
-        :return: (int) delta between ticks
-        """
-
-        if last_snapshot_time > new_tick_time:
-            return -1
-
-        snapshot_tick_time_delta = new_tick_time - last_snapshot_time
-        seconds = snapshot_tick_time_delta.seconds * 1000000
-        microseconds = snapshot_tick_time_delta.microseconds
-
-        return seconds + microseconds
-
-    def get_orderbook_snapshot_history(self, query: dict) -> pd.DataFrame or None:
+    def get_orderbook_snapshot_history(self, query: dict, compiled: bool = False,
+                                       snapshot_rates: list or None = None,
+                                       samplers: list or None = None) \
+            -> pd.DataFrame or dict or None:
         """
         Function to replay historical market data and generate the features used for
         reinforcement learning & training.
@@ -147,8 +143,16 @@ class Simulator(object):
             support Bitfinex only order book reconstruction.
 
         :param query: (dict) query for finding tick history in Arctic TickStore
+        :param compiled: if TRUE, replay with the compiled book kernel
+        :param snapshot_rates: (list) numbers of microseconds between LOB snapshots;
+            all the snapshot rates are produced from a single replay. If NONE (and
+            `samplers` is NONE), snapshots are taken every
+            SNAPSHOT_RATE_IN_MICROSECONDS.
+        :param samplers: (list) additional `Sampler`s (e.g., event-driven samplers)
+            produced from the same replay
         :return: (pd.DataFrame) snapshots of limit order books using a
-                stationary feature set
+                stationary feature set, or a (dict) of snapshots keyed by sampler label
+                (e.g., '100ms') if `snapshot_rates` or `samplers` is provided
         """
         self.db.init_db_connection()
 
@@ -157,31 +161,72 @@ class Simulator(object):
             LOGGER.warn("Query returned no data: {}".format(query))
             return None
 
+        if snapshot_rates is None and samplers is None:
+            return self.replay_tick_history(tick_history=tick_history,
+                                            instrument_name=query['ccy'][0],
+                                            compiled=compiled)
+
+        samplers = [TimeSampler(snapshot_rate=rate) for rate in snapshot_rates or []] + \
+            list(samplers or [])
+        snapshots = self.replay_tick_history(tick_history=tick_history,
+                                             instrument_name=query['ccy'][0],
+                                             compiled=compiled,
+                                             samplers=samplers)
+        return dict(zip([sampler.label for sampler in samplers], snapshots))
+
+    def replay_tick_history(self, tick_history: pd.DataFrame, instrument_name: str,
+                            compiled: bool = False, samplers: list or None = None) \
+            -> pd.DataFrame or list:
+        """
+        Replay tick history through an order book and take LOB snapshots whenever
+        the samplers call for one (by default, every SNAPSHOT_RATE_IN_MICROSECONDS
+        interval).
+
+        :param tick_history: (pd.DataFrame) tick messages in the same format as the
+            results from an Arctic TickStore query
+        :param instrument_name: instrument name used to select the order book
+        :param compiled: if TRUE, replay with the compiled book kernel
+        :param samplers: (list) `Sampler`s deciding when to take LOB snapshots; each
+            sampler's snapshots include the order flow since its own last snapshot
+        :return: (pd.DataFrame) snapshots of limit order books using a
+                stationary feature set, or a (list) of snapshots for each sampler if
+                `samplers` is provided. Snapshots are run-length encoded: consecutive
+                snapshots without any ticks in between are stored once, with their
+                number in the REPEATS_COLUMN (see `expand_snapshots()`).
+        """
         loop_length = tick_history.shape[0]
 
-        # number of microseconds between LOB snapshots
-        snapshot_interval_milliseconds = SNAPSHOT_RATE_IN_MICROSECONDS // 1000
+        return_list = samplers is not None
+        if samplers is None:
+            samplers = [TimeSampler(snapshot_rate=SNAPSHOT_RATE_IN_MICROSECONDS)]
 
-        snapshot_list = list()
-        last_snapshot_time = None
+        replay_started = False
         tick_types_for_warm_up = {'load_book', 'book_loaded', 'preload'}
 
-        instrument_name = query['ccy'][0]
         assert isinstance(instrument_name, str), \
             "Error: instrument_name must be a string, not -> {}".format(
                 type(instrument_name))
 
         LOGGER.info('querying {}'.format(instrument_name))
 
-        order_book = get_orderbook_from_symbol(symbol=instrument_name)(
-            sym=instrument_name)
+        order_book = get_orderbook_from_symbol(symbol=instrument_name,
+                                               compiled=compiled)(sym=instrument_name)
+        feature_names = order_book.render_lob_feature_names()
+        flow_mask = get_flow_feature_mask(feature_names=feature_names)
 
         start_time = dt.now(tz=TIMEZONE)
-        LOGGER.info('Starting get_orderbook_snapshot_history() loop with %i ticks for %s'
-                    % (loop_length, query['ccy']))
+
+        # convert the timestamps of all ticks at once to nanoseconds since the epoch,
+        # so the samplers only use integer arithmetic
+        tick_times = pd.to_datetime(tick_history['system_time'], utc=True)
+        tick_times = tick_times.to_numpy(dtype=np.int64).tolist()
+
+        LOGGER.info('Starting replay_tick_history() loop with %i ticks for %s'
+                    % (loop_length, instrument_name))
 
         # loop through all ticks returned from the Arctic Tick Store query.
-        for count, tx in enumerate(tick_history.itertuples()):
+        for count, (tx, new_tick_time) in enumerate(zip(tick_history.itertuples(),
+                                                        tick_times)):
 
             # periodically print number of steps completed
             if count % 250000 == 0:
@@ -207,16 +252,13 @@ class Simulator(object):
                         instrument_name, tick))
                 continue
 
-            # timestamp for incoming tick
-            new_tick_time = parse(tick.get('system_time'))
-
             # remove ticks without timestamps (should not exist/happen)
-            if new_tick_time is None:
+            if new_tick_time == NAT:
                 LOGGER.info('No tick time: {}'.format(tick))
                 continue
 
             # initialize the LOB snapshot timer
-            if last_snapshot_time is None:
+            if replay_started is False:
                 # process first ticks and check if they're stale ticks; if so,
                 # skip to the next loop.
                 order_book.new_tick(tick)
@@ -225,83 +267,121 @@ class Simulator(object):
                 if last_tick_time is None:
                     continue
 
-                last_tick_time_dt = parse(last_tick_time)
-                last_snapshot_time = last_tick_time_dt
-                LOGGER.info('{} first tick: {} '.format(order_book.sym, new_tick_time))
+                replay_started = True
+                last_snapshot_time = pd.Timestamp(last_tick_time).value
+                for sampler in samplers:
+                    sampler.reset(start_time=last_snapshot_time, flow_mask=flow_mask)
+                LOGGER.info('{} first tick: {} '.format(
+                    order_book.sym, pd.Timestamp(new_tick_time, tz=TIMEZONE)))
                 # skip to next loop
                 continue
 
-            # calculate the amount of time between the incoming
-            #   tick and tick received before that
-            diff = self._get_microsecond_delta(new_tick_time, last_snapshot_time)
-
-            # update the LOB, but do not take a LOB snapshot if the tick time is
-            # out of sequence. This occurs when pre-loading a LOB with stale tick
-            # times in general.
-            if diff == -1:
-                order_book.new_tick(msg=tick)
-                continue
-
-            # derive the number of LOB snapshot insertions for the data buffer.
-            multiple = diff // SNAPSHOT_RATE_IN_MICROSECONDS  # 1000000 is 1 second
-
-            # proceed if we have one or more insertions to make
-            if multiple <= 0:
-                order_book.new_tick(msg=tick)
-                continue
-
-            order_book_snapshot = order_book.render_book()
-            for i in range(multiple):
-                last_snapshot_time += timedelta(
-                    milliseconds=snapshot_interval_milliseconds)
-                snapshot_list.append(np.hstack((last_snapshot_time, order_book_snapshot)))
+            # check which samplers take snapshots before the tick is processed. Note:
+            # ticks that are out of sequence (e.g., stale ticks when pre-loading a LOB)
+            # update the LOB without triggering a time-based snapshot.
+            snapshot_times = [sampler.get_snapshot_times(tick_time=new_tick_time,
+                                                         tick=tick,
+                                                         order_book=order_book)
+                              for sampler in samplers]
+
+            if any(snapshot_times):
+                order_book_snapshot = order_book.render_book()
+                for sampler, sampler_snapshot_times in zip(samplers, snapshot_times):
+                    sampler.add_flow(snapshot=order_book_snapshot)
+                    if sampler_snapshot_times:
+                        sampler.add_snapshots(snapshot=order_book_snapshot,
+                                              snapshot_times=sampler_snapshot_times)
 
             # update order book with most recent tick now, so the snapshots
             # are up to date for the next iteration of the loop.
             order_book.new_tick(msg=tick)
-            continue
 
         elapsed = max((dt.now(tz=TIMEZONE) - start_time).seconds, 1)
         LOGGER.info('Completed run_simulation() with %i ticks in %i seconds '
                     'at %i ticks/second'
                     % (loop_length, elapsed, loop_length // elapsed))
 
-        orderbook_snapshot_history = pd.DataFrame(
-            data=snapshot_list,
-            columns=['system_time'] + order_book.render_lob_feature_names()
-        )
-
-        # remove NAs from data set (and print the amount)
-        before_shape = orderbook_snapshot_history.shape[0]
-        orderbook_snapshot_history = orderbook_snapshot_history.dropna(axis=0)
-        difference_in_records = orderbook_snapshot_history.shape[0] - before_shape
-        LOGGER.info("{} {} rows due to NA values".format(
-            'Dropping' if difference_in_records <= 0 else 'Adding',
-            abs(difference_in_records))
-        )
+        orderbook_snapshot_histories = list()
+        for sampler in samplers:
+            orderbook_snapshot_history = pd.DataFrame(
+                data=np.reshape(sampler.snapshots, (-1, len(feature_names))),
+                columns=feature_names
+            )
+            # timestamps are only converted back to datetimes for the final data set
+            orderbook_snapshot_history.insert(
+                loc=0, column='system_time',
+                value=pd.to_datetime(np.asarray(sampler.snapshot_times, dtype=np.int64),
+                                     utc=True).tz_convert(TIMEZONE))
+            orderbook_snapshot_history[REPEATS_COLUMN] = sampler.repeats
+
+            # remove NAs from data set (and print the amount)
+            before_shape = orderbook_snapshot_history.shape[0]
+            orderbook_snapshot_history = orderbook_snapshot_history.dropna(axis=0)
+            difference_in_records = orderbook_snapshot_history.shape[0] - before_shape
+            LOGGER.info("{} {} {} rows due to NA values".format(
+                sampler.label,
+                'Dropping' if difference_in_records <= 0 else 'Adding',
+                abs(difference_in_records))
+            )
+            orderbook_snapshot_histories.append(orderbook_snapshot_history)
+
+        if return_list:
+            return orderbook_snapshot_histories
+        return orderbook_snapshot_histories[0]
+
+    def _export_days(self, data: pd.DataFrame, filename: str, suffix: str = '') -> None:
+        """
+        Export LOB snapshots to a compressed csv per day.
 
-        return orderbook_snapshot_history
+        Note: run-length encoded snapshots are exported with the day of their first
+        snapshot.
 
-    def extract_features(self, query: dict) -> None:
+        :param data: (pd.DataFrame) LOB snapshots
+        :param filename: file name prefix (e.g., instrument name)
+        :param suffix: file name suffix (e.g., snapshot rate)
+        :return: void
+        """
+        dates = data['system_time'].dt.date.unique()
+        LOGGER.info('dates: {}'.format(dates))
+        for date in dates[:]:
+            # for date in dates[1:]:
+            tmp = data.loc[data['system_time'].dt.date == date]
+            name = '{}_{}'.format(filename, date)
+            if suffix:
+                name += '_{}'.format(suffix)
+            self.export_to_csv(tmp, filename=name, compress=True)
+
+    def extract_features(self, query: dict, compiled: bool = False,
+                         snapshot_rates: list or None = None,
+                         samplers: list or None = None) -> None:
         """
         Create and export limit order book data to csv. This function
         exports multiple days of data and ensures each day starts and
         ends exactly on time.
 
         :param query: (dict) ccy=sym, daterange=(YYYYMMDD,YYYYMMDD)
+        :param compiled: if TRUE, replay with the compiled book kernel
+        :param snapshot_rates: (list) numbers of microseconds between LOB snapshots,
+            which are exported to separate files (e.g., 'BTC-USD_2019-01-01_100ms');
+            if NONE (and `samplers` is NONE), snapshots are taken every
+            SNAPSHOT_RATE_IN_MICROSECONDS.
+        :param samplers: (list) additional `Sampler`s (e.g., event-driven samplers),
+            which are exported to separate files named after the sampler's label
+            (e.g., 'BTC-USD_2019-01-01_1000_messages')
         :return: void
         """
         start_time = dt.now(tz=TIMEZONE)
 
-        order_book_data = self.get_orderbook_snapshot_history(query=query)
-        if order_book_data is not None:
-            dates = order_book_data['system_time'].dt.date.unique()
-            LOGGER.info('dates: {}'.format(dates))
-            for date in dates[:]:
-                # for date in dates[1:]:
-                tmp = order_book_data.loc[order_book_data['system_time'].dt.date == date]
-                self.export_to_csv(
-                    tmp, filename='{}_{}'.format(query['ccy'][0], date), compress=True)
+        order_book_data = self.get_orderbook_snapshot_history(
+            query=query, compiled=compiled, snapshot_rates=snapshot_rates,
+            samplers=samplers)
+        if order_book_data is None:
+            pass
+        elif isinstance(order_book_data, pd.DataFrame):
+            self._export_days(data=order_book_data, filename=query['ccy'][0])
+        else:
+            for label, data in order_book_data.items():
+                self._export_days(data=data, filename=query['ccy'][0], suffix=label)
 
         elapsed = (dt.now(tz=TIMEZONE) - start_time).seconds
         LOGGER.info('***\nSimulator.extract_features() executed in %i seconds\n***'
@@ -0,0 +1,173 @@
+import unittest
+
+import numpy as np
+
+from configurations import MAX_BOOK_ROWS
+from data_recorder.bitfinex_connector.bitfinex_book import (
+    BitfinexBook, CompiledBitfinexBook,
+)
+from data_recorder.coinbase_connector.coinbase_book import (
+    CoinbaseBook, CompiledCoinbaseBook,
+)
+
+
+def _coinbase_messages(number_of_messages: int, seed: int = 1) -> list:
+    """
+    Create a random stream of Coinbase 'open', 'match', 'change' and 'done' messages
+    for the bid side of the book.
+    """
+    random_state = np.random.RandomState(seed=seed)
+    resting_orders = dict()
+    messages = list()
+    for i in range(number_of_messages):
+        action = random_state.randint(0, 4) if resting_orders else 0
+        if action == 0:
+            order_id = f'order-{i}'
+            price = round(100. - random_state.randint(0, 80) * 0.01, 2)
+            size = round(random_state.uniform(0.01, 5.), 8)
+            resting_orders[order_id] = (price, size)
+            messages.append(dict(type='open', order_id=order_id, price=str(price),
+                                 remaining_size=str(size), side='buy', time=i,
+                                 product_id='BTC-USD'))
+            continue
+        order_id = list(resting_orders.keys())[
+            random_state.randint(0, len(resting_orders))]
+        price, size = resting_orders[order_id]
+        if action == 1:
+            trade_size = round(size * random_state.uniform(0.1, 0.9), 8)
+            resting_orders[order_id] = (price, size - trade_size)
+            messages.append(dict(type='match', maker_order_id=order_id,
+                                 price=str(price), size=str(trade_size), side='buy',
+                                 time=i, product_id='BTC-USD'))
+        elif action == 2:
+            new_size = round(size * random_state.uniform(0.1, 0.9), 8)
+            resting_orders[order_id] = (price, new_size)
+            messages.append(dict(type='change', order_id=order_id, price=str(price),
+                                 new_size=str(new_size), side='buy', time=i,
+                                 product_id='BTC-USD'))
+        else:
+            del resting_orders[order_id]
+            reason = 'canceled' if random_state.rand() < 0.8 else 'filled'
+            messages.append(dict(type='done', order_id=order_id, reason=reason,
+                                 remaining_size=str(size), side='buy', time=i,
+                                 product_id='BTC-USD'))
+    return messages
+
+
+def _bitfinex_messages(number_of_messages: int, seed: int = 1) -> list:
+    """
+    Create a random stream of Bitfinex order updates and trades for the ask side of
+    the book.
+    """
+    random_state = np.random.RandomState(seed=seed)
+    resting_orders = dict()
+    messages = list()
+    for i in range(number_of_messages):
+        action = random_state.randint(0, 4) if resting_orders else 0
+        if action == 0:
+            order_id = i
+            price = round(100. + random_state.randint(1, 80) * 0.01, 2)
+            size = round(random_state.uniform(0.01, 5.), 8)
+            resting_orders[order_id] = (price, size)
+            messages.append(dict(type='update', order_id=order_id, price=price,
+                                 size=size, side='sell'))
+            continue
+        order_id = list(resting_orders.keys())[
+            random_state.randint(0, len(resting_orders))]
+        price, size = resting_orders[order_id]
+        if action == 1:
+            messages.append(dict(type='te', price=price, side='upticks',
+                                 size=round(size * random_state.uniform(0.1, 1.), 8)))
+        elif action == 2:
+            if random_state.rand() < 0.5:
+                price = round(100. + random_state.randint(1, 80) * 0.01, 2)
+            size = round(random_state.uniform(0.01, 5.), 8)
+            resting_orders[order_id] = (price, size)
+            messages.append(dict(type='update', order_id=order_id, price=price,
+                                 size=size, side='sell'))
+        else:
+            del resting_orders[order_id]
+            messages.append(dict(type='update', order_id=order_id, price=0.,
+                                 size=size, side='sell'))
+    return messages
+
+
+def _process_coinbase(book, msg: dict) -> None:
+    if msg['type'] == 'open':
+        book.insert_order(msg)
+    elif msg['type'] == 'match':
+        book.match(msg)
+    elif msg['type'] == 'change':
+        book.change(msg)
+    else:
+        book.remove_order(msg)
+
+
+def _process_bitfinex(book, msg: dict) -> None:
+    msg = dict(msg)
+    if msg['type'] == 'te':
+        book.match(msg)
+    elif msg['price'] == 0.:
+        book.remove_order(msg)
+    elif msg['order_id'] in book.order_map:
+        book.change(msg)
+    else:
+        book.insert_order(msg)
+
+
+class CompiledBookTestCases(unittest.TestCase):
+
+    def _assert_same_render(self, book, compiled_book, midpoint: float,
+                            is_bids: bool) -> None:
+        if is_bids:
+            expected = book.get_bids_to_list(midpoint=midpoint)
+            actual = compiled_book.get_bids_to_list(midpoint=midpoint)
+        else:
+            expected = book.get_asks_to_list(midpoint=midpoint)
+            actual = compiled_book.get_asks_to_list(midpoint=midpoint)
+        # rows beyond the depth of the book are left uninitialized by `Book`
+        rows = min(len(book.price_dict), MAX_BOOK_ROWS)
+        self.assertEqual(len(expected), len(actual))
+        for expected_data, actual_data in zip(expected, actual):
+            np.testing.assert_array_equal(expected_data[:rows], actual_data[:rows])
+
+    def test_coinbase_compiled_book(self):
+        book = CoinbaseBook(sym='BTC-USD', side='bids')
+        compiled_book = CompiledCoinbaseBook(sym='BTC-USD', side='bids')
+        for i, msg in enumerate(_coinbase_messages(number_of_messages=20000)):
+            _process_coinbase(book=book, msg=msg)
+            _process_coinbase(book=compiled_book, msg=msg)
+            if i % 500 == 499:
+                self.assertEqual(book.get_bid()[0], compiled_book.get_bid()[0])
+                self.assertEqual(len(book.price_dict), len(compiled_book))
+                self._assert_same_render(book=book, compiled_book=compiled_book,
+                                         midpoint=100.01, is_bids=True)
+
+    def test_bitfinex_compiled_book(self):
+        book = BitfinexBook(sym='tBTCUSD', side='asks')
+        compiled_book = CompiledBitfinexBook(sym='tBTCUSD', side='asks')
+        for i, msg in enumerate(_bitfinex_messages(number_of_messages=20000)):
+            _process_bitfinex(book=book, msg=msg)
+            _process_bitfinex(book=compiled_book, msg=msg)
+            if i % 500 == 499:
+                self.assertEqual(book.get_ask()[0], compiled_book.get_ask()[0])
+                self.assertEqual(len(book.price_dict), len(compiled_book))
+                self._assert_same_render(book=book, compiled_book=compiled_book,
+                                         midpoint=99.99, is_bids=False)
+
+    def test_compiled_book_capacity(self):
+        compiled_book = CompiledBitfinexBook(sym='tBTCUSD', side='bids')
+        number_of_levels = CompiledBitfinexBook.INITIAL_CAPACITY * 3
+        for i in range(number_of_levels):
+            compiled_book.insert_order(dict(order_id=i, price=float(i + 1), size=1.))
+        self.assertEqual(number_of_levels, len(compiled_book))
+        self.assertEqual(float(number_of_levels), compiled_book.get_bid()[0])
+        self.assertEqual(1., compiled_book.get_ask()[0])
+
+        compiled_book.clear()
+        self.assertEqual(0, len(compiled_book))
+        self.assertEqual(0., compiled_book.get_bid()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from data_recorder.bitfinex_connector.bitfinex_orderbook import BitfinexOrderBook
+from data_recorder.coinbase_connector.coinbase_orderbook import CoinbaseOrderBook
+from data_recorder.connector_components.orderbook import (
+    BUY, MATCH, OrderBook, PRELOAD, SELL, TRADE, UNKNOWN,
+)
+
+
+def _coinbase_message(sequence: int, **kwargs) -> dict:
+    """
+    Create a Coinbase message as replayed from the tick store.
+    """
+    return dict(sequence=sequence, time=str(sequence), product_id='BTC-USD', **kwargs)
+
+
+class OrderBookTestCases(unittest.TestCase):
+
+    def test_decode_message(self):
+        self.assertEqual((MATCH, BUY),
+                         OrderBook.decode_message(dict(type='match', side='buy')))
+        self.assertEqual((TRADE, BUY),
+                         OrderBook.decode_message(dict(type='te', side='upticks')))
+        self.assertEqual((PRELOAD, SELL),
+                         OrderBook.decode_message(dict(type='preload', side='sell')))
+        # messages without a side (e.g., 'load_book') are decoded as sells
+        self.assertEqual((UNKNOWN, SELL), OrderBook.decode_message(dict(type='foo')))
+
+    def test_coinbase_dispatch(self):
+        order_book = CoinbaseOrderBook(sym='BTC-USD')
+        messages = [
+            _coinbase_message(1, type='load_book'),
+            _coinbase_message(2, type='preload', order_id='a', price='99.',
+                              size='1.', side='buy'),
+            _coinbase_message(3, type='preload', order_id='b', price='101.',
+                              size='2.', side='sell'),
+            _coinbase_message(4, type='book_loaded'),
+            # trades matched on the asks book are buys
+            _coinbase_message(5, type='match', maker_order_id='b', price='101.',
+                              size='0.5', side='sell'),
+            _coinbase_message(6, type='change', order_id='a', price='99.',
+                              new_size='3.', side='buy'),
+        ]
+        for message in messages:
+            self.assertTrue(order_book.new_tick(message))
+
+        self.assertTrue(order_book.done_warming_up)
+        self.assertEqual(50.5, order_book.buy_tracker.notional)
+        self.assertEqual(0., order_book.sell_tracker.notional)
+        self.assertEqual(1.5, order_book.asks.order_map['b']['size'])
+        self.assertEqual(3., order_book.bids.order_map['a']['size'])
+
+        # unknown message types are not processed
+        self.assertFalse(order_book.new_tick(_coinbase_message(7, type='foo', side='buy')))
+
+    def test_bitfinex_dispatch(self):
+        order_book = BitfinexOrderBook(sym='tBTCUSD')
+        messages = [
+            dict(type='load_book'),
+            dict(type='preload', order_id=1, price=99., size=1., side='buy'),
+            dict(type='preload', order_id=2, price=101., size=2., side='sell'),
+            dict(type='book_loaded'),
+            # upticks are buys matched on the asks book
+            dict(type='te', price=101., size=0.5, side='upticks', system_time='t'),
+            # order updates with a price of zero remove the order
+            dict(type='update', order_id=1, price=0., size=1., side='buy',
+                 system_time='u'),
+        ]
+        for message in messages:
+            self.assertTrue(order_book.new_tick(message))
+
+        self.assertTrue(order_book.done_warming_up)
+        self.assertEqual('u', order_book.last_tick_time)
+        self.assertEqual(50.5, order_book.buy_tracker.notional)
+        self.assertEqual(0., order_book.sell_tracker.notional)
+        self.assertNotIn(1, order_book.bids.order_map)
+        self.assertIn(2, order_book.asks.order_map)
+
+
+if __name__ == '__main__':
+    unittest.main()
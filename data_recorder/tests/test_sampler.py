@@ -0,0 +1,174 @@
+import unittest
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from configurations import REPEATS_COLUMN, TIMEZONE
+from data_recorder.database.sampler import (
+    MessageSampler, MidpointSampler, NotionalSampler, TimeSampler, expand_snapshots,
+    get_flow_feature_mask, get_snapshot_rate_label,
+)
+
+FEATURE_NAMES = ['midpoint', 'spread', 'buys', 'sells', 'bids_distance_0',
+                 'bids_notional_0', 'bids_cancel_notional_0', 'bids_limit_notional_0',
+                 'bids_market_notional_0']
+
+
+class TopOfBook(object):
+
+    def __init__(self, bid: float, ask: float):
+        """
+        Order book stand-in exposing only the inside market.
+        """
+        self.best_bid = (bid, None)
+        self.best_ask = (ask, None)
+
+
+class SamplerTestCases(unittest.TestCase):
+
+    def setUp(self):
+        # samplers use nanoseconds since the epoch
+        self.start_time = pd.Timestamp(dt(2019, 9, 26, tzinfo=TIMEZONE)).value
+        self.flow_mask = get_flow_feature_mask(feature_names=FEATURE_NAMES)
+
+    def _time(self, seconds: float) -> int:
+        """
+        Get the time `seconds` after the start of the replay.
+        """
+        return self.start_time + int(seconds * 1e9)
+
+    def test_flow_feature_mask(self):
+        self.assertEqual([False, False, True, True, False, False, True, True, True],
+                         self.flow_mask.tolist())
+
+    def test_snapshot_rate_label(self):
+        self.assertEqual('1s', get_snapshot_rate_label(snapshot_rate=1000000))
+        self.assertEqual('100ms', get_snapshot_rate_label(snapshot_rate=100000))
+        self.assertEqual('250us', get_snapshot_rate_label(snapshot_rate=250))
+
+    def test_time_sampler(self):
+        sampler = TimeSampler(snapshot_rate=1000000)
+        sampler.reset(start_time=self.start_time, flow_mask=self.flow_mask)
+
+        # no snapshot within the first second, or for out of sequence ticks
+        for tick_time in [self._time(seconds=0.999), self._time(seconds=-1.)]:
+            self.assertEqual(0, len(sampler.get_snapshot_times(
+                tick_time=tick_time, tick=dict(), order_book=None)))
+
+        # gaps between ticks are filled with one snapshot per second
+        snapshot_times = sampler.get_snapshot_times(
+            tick_time=self._time(seconds=3.5), tick=dict(), order_book=None)
+        self.assertEqual([self._time(seconds=i) for i in range(1, 4)],
+                         list(snapshot_times))
+        self.assertEqual(0, len(sampler.get_snapshot_times(
+            tick_time=self._time(seconds=3.9), tick=dict(), order_book=None)))
+
+        # gaps longer than a day are not truncated
+        snapshot_times = sampler.get_snapshot_times(
+            tick_time=self._time(seconds=86400 + 3.5), tick=dict(), order_book=None)
+        self.assertEqual(86400, len(snapshot_times))
+        self.assertEqual(self._time(seconds=86400 + 3), snapshot_times[-1])
+
+    def test_flow_accumulation(self):
+        sampler = TimeSampler(snapshot_rate=1000000)
+        sampler.reset(start_time=self.start_time, flow_mask=self.flow_mask)
+
+        # the order flow of every render since the last snapshot is accumulated,
+        # while the state of the book is taken from the latest render
+        first_render = np.arange(len(FEATURE_NAMES), dtype=np.float64)
+        second_render = first_render + 1.
+        sampler.add_flow(snapshot=first_render)
+        sampler.add_flow(snapshot=second_render)
+        sampler.add_snapshots(snapshot=second_render, snapshot_times=[self.start_time])
+
+        snapshot = sampler.snapshots[0]
+        self.assertEqual([self.start_time], sampler.snapshot_times)
+        self.assertEqual([1., 2.], snapshot[:2].tolist())
+        self.assertEqual([5., 7.], snapshot[2:4].tolist())
+        self.assertEqual([13., 15., 17.], snapshot[6:].tolist())
+
+        # the accumulators are cleared after each snapshot
+        sampler.add_flow(snapshot=first_render)
+        sampler.add_snapshots(snapshot=first_render, snapshot_times=[self.start_time])
+        self.assertEqual(first_render.tolist(), sampler.snapshots[1].tolist())
+
+    def test_run_length_encoding(self):
+        sampler = TimeSampler(snapshot_rate=1000000)
+        sampler.reset(start_time=self.start_time, flow_mask=self.flow_mask)
+
+        # snapshots from the same render are stored once with their number of repeats
+        for seconds, render in [(3.5, 1.), (4.2, 2.)]:
+            snapshot_times = sampler.get_snapshot_times(
+                tick_time=self._time(seconds=seconds), tick=dict(), order_book=None)
+            sampler.add_snapshots(snapshot=np.full(len(FEATURE_NAMES), render),
+                                  snapshot_times=snapshot_times)
+        self.assertEqual(2, len(sampler.snapshots))
+        self.assertEqual([3, 1], sampler.repeats)
+
+        self.assertEqual([self._time(seconds=1), self._time(seconds=4)],
+                         sampler.snapshot_times)
+
+        data = pd.DataFrame(data=sampler.snapshots, columns=FEATURE_NAMES)
+        data.insert(loc=0, column='system_time',
+                    value=pd.to_datetime(sampler.snapshot_times, utc=True))
+        data[REPEATS_COLUMN] = sampler.repeats
+        expanded = expand_snapshots(data=data, snapshot_rate=1000000)
+        self.assertNotIn(REPEATS_COLUMN, expanded.columns)
+        self.assertEqual([self._time(seconds=i) for i in range(1, 5)],
+                         [t.value for t in expanded['system_time']])
+        self.assertEqual([1., 1., 1., 2.], expanded['midpoint'].tolist())
+
+    def _replay(self, sampler, ticks: list, order_books: list or None = None) -> list:
+        """
+        Get the snapshot times of a sampler for ticks one second apart.
+        """
+        sampler.reset(start_time=self.start_time, flow_mask=self.flow_mask)
+        order_books = order_books or [None] * len(ticks)
+        snapshot_times = list()
+        for i, (tick, order_book) in enumerate(zip(ticks, order_books), start=1):
+            snapshot_times.extend(sampler.get_snapshot_times(
+                tick_time=self._time(seconds=i), tick=tick, order_book=order_book))
+        return [(t - self.start_time) // 1000000000 for t in snapshot_times]
+
+    def test_message_sampler(self):
+        sampler = MessageSampler(number_of_messages=3)
+        self.assertEqual('3_messages', sampler.label)
+
+        # snapshots are timestamped with the last tick processed by the order book,
+        # which includes the first tick used to start the replay
+        snapshot_times = self._replay(sampler=sampler, ticks=[dict(type='open')] * 8)
+        self.assertEqual([2, 5], snapshot_times)
+
+    def test_notional_sampler(self):
+        sampler = NotionalSampler(notional=1000.)
+        self.assertEqual('1000_notional', sampler.label)
+
+        ticks = [dict(type='open'),
+                 dict(type='match', price='100.', size='6.'),
+                 dict(type='te', price=100., size=-5.),
+                 dict(type='open'),
+                 dict(type='match', price='100.', size='25.'),
+                 dict(type='open'),
+                 dict(type='open')]
+        self.assertEqual([3, 5], self._replay(sampler=sampler, ticks=ticks))
+
+    def test_midpoint_sampler(self):
+        sampler = MidpointSampler(number_of_changes=2)
+        self.assertEqual('2_midpoint_changes', sampler.label)
+
+        order_books = [TopOfBook(bid=99., ask=101.),
+                       TopOfBook(bid=99., ask=101.),
+                       TopOfBook(bid=100., ask=101.),
+                       TopOfBook(bid=100., ask=101.),
+                       TopOfBook(bid=99., ask=101.),
+                       TopOfBook(bid=99., ask=102.),
+                       TopOfBook(bid=99., ask=102.)]
+        snapshot_times = self._replay(sampler=sampler,
+                                      ticks=[dict(type='open')] * len(order_books),
+                                      order_books=order_books)
+        self.assertEqual([4], snapshot_times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,5 @@
 import argparse
 
-from agent.dqn import Agent
 from configurations import LOGGER
 
 parser = argparse.ArgumentParser()
@@ -98,15 +97,32 @@ parser.add_argument('--double_dqn',
                     default=True,
                     help="If TRUE, use double DQN for Q-value estimation",
                     type=bool)
-args = vars(parser.parse_args())
+parser.add_argument('--number_of_actors',
+                    default=1,
+                    help="Number of actor processes stepping environments during "
+                         "training; if greater than 1, the agent trains with an "
+                         "actor-learner",
+                    type=int)
+parser.add_argument('--memory_limit',
+                    default=1000000,
+                    help="Maximum number of transitions in the replay memory",
+                    type=int)
+parser.add_argument('--output_directory',
+                    default=None,
+                    help="Directory of the weights, checkpoints and logs; defaults to "
+                         "agent/dqn_weights",
+                    type=str)
 
 
 def main(kwargs):
+    # imported here, so that the parser can be used without loading Keras
+    from agent.dqn import Agent
     LOGGER.info(f'Experiment creating agent with kwargs: {kwargs}')
     agent = Agent(**kwargs)
     LOGGER.info(f'Agent created. {agent}')
     agent.start()
+    return agent
 
 
 if __name__ == '__main__':
-    main(kwargs=args)
+    main(kwargs=vars(parser.parse_args()))
@@ -8,16 +8,19 @@ from gym import Env
 
 import gym_trading.utils.reward as reward_types
 from configurations import (
-    EMA_ALPHA, INDICATOR_WINDOW, INDICATOR_WINDOW_MAX, MARKET_ORDER_FEE,
+    EMA_ALPHA, INDICATOR_WINDOW, INDICATOR_WINDOW_MAX, MARKET_ORDER_FEE, MAX_BOOK_ROWS,
 )
 from gym_trading.utils.broker import Broker
 from gym_trading.utils.data_pipeline import DataPipeline
+from gym_trading.utils.day_source import Day, DaySource
 from gym_trading.utils.plot_history import Visualize
+from gym_trading.utils.profiler import Profiler
 from gym_trading.utils.render_env import TradingGraph
 from gym_trading.utils.statistic import ExperimentStatistics
 from indicators import IndicatorManager, RSI, TnS
 
 VALID_REWARD_TYPES = [f for f in dir(reward_types) if '__' not in f]
+VALID_FILL_MODELS = ['trades', 'price_levels']
 
 
 class BaseEnvironment(Env, ABC):
@@ -25,9 +28,11 @@ class BaseEnvironment(Env, ABC):
 
     def __init__(self,
                  symbol: str,
-                 fitting_file: str,
-                 testing_file: str,
+                 fitting_file: str or None = None,
+                 testing_file: str or None = None,
                  max_position: int = 10,
+                 max_orders: int = 1,
+                 fill_model: str = 'trades',
                  window_size: int = 100,
                  seed: int = 1,
                  action_repeats: int = 5,
@@ -35,14 +40,28 @@ class BaseEnvironment(Env, ABC):
                  format_3d: bool = False,
                  reward_type: str = 'default',
                  transaction_fee: bool = True,
-                 ema_alpha: list or float or None = EMA_ALPHA):
+                 ema_alpha: list or float or None = EMA_ALPHA,
+                 profile: bool = False,
+                 recording_mode: str = 'full',
+                 recording_length: int = 10000,
+                 recording_interval: int = 10,
+                 day_source: DaySource or None = None):
         """
         Base class for creating environments extending OpenAI's GYM framework.
 
         :param symbol: currency pair to trade / experiment
-        :param fitting_file: prior trading day (e.g., T-1)
-        :param testing_file: current trading day (e.g., T)
+        :param fitting_file: prior trading day (e.g., T-1); ignored if `day_source`
+            is provided
+        :param testing_file: current trading day (e.g., T); ignored if `day_source`
+            is provided
         :param max_position: maximum number of positions able to hold in inventory
+        :param max_orders: maximum number of limit orders per side resting in the book
+        :param fill_model: method for filling limit orders:
+            1) 'trades' --> an order's queue is depleted by the time step's trade
+                volume whenever the best bid/ask is at or through the order's price
+            2) 'price_levels' --> an order's queue is depleted by the market orders
+                and cancellations recorded at the order's price level (requires
+                data recorded with INCLUDE_ORDERFLOW)
         :param window_size: number of lags to include in observation space
         :param seed: random seed number
         :param action_repeats: number of steps to take in environment after a given action
@@ -63,17 +82,34 @@ class BaseEnvironment(Env, ABC):
 
         :param ema_alpha: decay factor for EMA, usually between 0.9 and 0.9999; if NONE,
             raw values are returned in place of smoothed values
+        :param profile: if TRUE, accumulate the wall time and call count of each phase
+            of `step()`; the summary is available from `get_profile()`
+        :param recording_mode: how much of the episode history (and observations) is
+            stored for plotting at the end of an episode:
+            1) 'full' --> every time step
+            2) 'ring' --> the last `recording_length` time steps
+            3) 'sampled' --> every `recording_interval`-th time step
+            4) 'off' --> nothing, which keeps memory use flat while training
+        :param recording_length: number of time steps kept in 'ring' mode
+        :param recording_interval: number of time steps between stored time steps in
+            'sampled' mode
+        :param day_source: (DaySource) stream of trading days, which switches the
+            environment to the next day every `day_source.episodes_per_day` episodes
+            while the following days are prepared in the background; if NONE, the
+            environment uses `testing_file` for its whole life
         """
         assert reward_type in VALID_REWARD_TYPES, \
             'Error: {} is not a valid reward type. Value must be in:\n{}'.format(
                 reward_type, VALID_REWARD_TYPES)
-
-        self.viz = Visualize(
-            columns=['midpoint', 'buys', 'sells', 'inventory', 'realized_pnl'],
-            store_historical_observations=True)
+        assert fill_model in VALID_FILL_MODELS, \
+            'Error: {} is not a valid fill model. Value must be in:\n{}'.format(
+                fill_model, VALID_FILL_MODELS)
+        assert day_source is not None or None not in (fitting_file, testing_file), \
+            'Error: either a fitting_file and testing_file, or a day_source is required'
 
         # get Broker class to keep track of PnL and orders
-        self.broker = Broker(max_position=max_position, transaction_fee=transaction_fee)
+        self.broker = Broker(max_position=max_position, transaction_fee=transaction_fee,
+                             max_orders=max_orders)
 
         # properties required for instantiation
         self.symbol = symbol
@@ -85,6 +121,7 @@ class BaseEnvironment(Env, ABC):
         self.window_size = window_size
         self.reward_type = reward_type
         self.format_3d = format_3d  # e.g., [window, features, *NEW_AXIS*]
+        self.fill_model = fill_model
         self.testing_file = testing_file
 
         # properties that get reset()
@@ -101,6 +138,7 @@ class BaseEnvironment(Env, ABC):
         self.A_t, self.B_t = 0., 0.  # variables for Differential Sharpe Ratio
         self.episode_stats = ExperimentStatistics()
         self.best_bid = self.best_ask = None
+        self._profiler = None
 
         # properties to override in sub-classes
         self.actions = None
@@ -109,24 +147,48 @@ class BaseEnvironment(Env, ABC):
 
         # get historical data for simulations
         self.data_pipeline = DataPipeline(alpha=ema_alpha)
+        self._day_source = day_source
+        self._day_episodes = 0  # number of episodes on the current day
+
+        # rendering class
+        self._render = TradingGraph(sym=self.symbol)
 
         # three different data sets, for different purposes:
         #   1) midpoint_prices - midpoint prices that have not been transformed
         #   2) raw_data - raw limit order book data, not including imbalances
         #   3) normalized_data - z-scored limit order book and order flow imbalance
         #       data, also midpoint price feature is replace by midpoint log price change
-        self._midpoint_prices, self._raw_data, self._normalized_data = \
-            self.data_pipeline.load_environment_data(
-                fitting_file=fitting_file,
-                testing_file=testing_file,
-                include_imbalances=True,
-                as_pandas=True,
-            )
-        # derive best bid and offer
-        self._best_bids = self._raw_data['midpoint'] - (self._raw_data['spread'] / 2)
-        self._best_asks = self._raw_data['midpoint'] + (self._raw_data['spread'] / 2)
-
-        self.max_steps = self._raw_data.shape[0] - self.action_repeats - 1
+        # run-length encoded snapshots are only repeated in the normalized data, so
+        # the midpoint prices and raw data are looked up through the row index
+        self._midpoint_prices = self._raw_data = self._normalized_data = None
+        self._row_index = self._best_bids = self._best_asks = None
+        self._bid_level_prices = self._ask_level_prices = None
+        self._bid_level_flows = self._ask_level_flows = None
+        if day_source is None:
+            day = Day(fitting_file, testing_file,
+                      *self.data_pipeline.load_environment_arrays(
+                          fitting_file=fitting_file,
+                          testing_file=testing_file,
+                          include_imbalances=True,
+                      ), ema_alpha=ema_alpha)
+        else:
+            day = day_source.next_day(wait=True)
+        self._set_day(day=day)
+
+        # storage for plotting the episode history; 'full' and 'sampled' recordings
+        # are preallocated for an entire episode
+        if recording_mode == 'ring':
+            history_length = recording_length
+        elif recording_mode == 'sampled':
+            history_length = self.max_steps // recording_interval + 2
+        else:
+            history_length = self.max_steps + 2
+        self.viz = Visualize(
+            columns=['midpoint', 'buys', 'sells', 'inventory', 'realized_pnl'],
+            store_historical_observations=True,
+            recording_mode=recording_mode,
+            recording_length=history_length,
+            recording_interval=recording_interval)
 
         # load indicators into the indicator manager
         self.tns = IndicatorManager()
@@ -138,8 +200,44 @@ class BaseEnvironment(Env, ABC):
         # buffer for appending lags
         self.data_buffer = deque(maxlen=self.window_size)
 
+        self.viz.observation_labels = list(day.labels['normalized_data'])
+        self.viz.observation_labels += self.tns.get_labels() + self.rsi.get_labels()
+        self.viz.observation_labels += ['Inventory Count', 'Realized PNL', 'Unrealized PNL']
+
+        if profile:
+            self.enable_profiling()
+
+    def _set_day(self, day: Day) -> None:
+        """
+        Use a trading day's data in the environment.
+
+        :param day: (Day) environment data
+        :return: (void)
+        """
+        if self._normalized_data is not None:
+            assert self._normalized_data.shape[1] == day.normalized_data.shape[1], \
+                "Error: {} has {} features instead of {}".format(
+                    day.testing_file, day.normalized_data.shape[1],
+                    self._normalized_data.shape[1])
+
+        self.day = day
+        self.testing_file = day.testing_file
+        self._midpoint_prices = day.midpoint_prices
+        self._raw_data = day.data
+        self._normalized_data = day.normalized_data
+        self._row_index = day.row_index
+        self.last_midpoint = None
+        self._day_episodes = 0
+
+        features = day.labels['data']
+        # derive best bid and offer
+        half_spreads = self._raw_data[:, features.index('spread')] / 2.
+        self._best_bids = (self._midpoint_prices - half_spreads).astype(np.float32)
+        self._best_asks = (self._midpoint_prices + half_spreads).astype(np.float32)
+
+        self.max_steps = self._row_index.shape[0] - self.action_repeats - 1
+
         # Index of specific data points used to generate the observation space
-        features = self._raw_data.columns.tolist()
         self.best_bid_index = features.index('bids_distance_0')
         self.best_ask_index = features.index('asks_distance_0')
         self.notional_bid_index = features.index('bids_notional_0')
@@ -147,23 +245,71 @@ class BaseEnvironment(Env, ABC):
         self.buy_trade_index = features.index('buys')
         self.sell_trade_index = features.index('sells')
 
-        self.viz.observation_labels = self._normalized_data.columns.tolist()
-        self.viz.observation_labels += self.tns.get_labels() + self.rsi.get_labels()
-        self.viz.observation_labels += ['Inventory Count', 'Realized PNL', 'Unrealized PNL']
-
-        # typecast all data sets to numpy
-        self._raw_data = self._raw_data.to_numpy(dtype=np.float32)
-        self._normalized_data = self._normalized_data.to_numpy(dtype=np.float32)
-        self._midpoint_prices = self._midpoint_prices.to_numpy(dtype=np.float64)
-        self._best_bids = self._best_bids.to_numpy(dtype=np.float32)
-        self._best_asks = self._best_asks.to_numpy(dtype=np.float32)
-
-        # rendering class
-        self._render = TradingGraph(sym=self.symbol)
+        # price levels used by the 'price_levels' fill model, where the prices of
+        # every level are computed once up front so orders can be matched to levels
+        if self.fill_model == 'price_levels':
+            if 'bids_market_notional_0' not in features:
+                raise ValueError("Error: the 'price_levels' fill model requires order "
+                                 "flow data (INCLUDE_ORDERFLOW)")
+            midpoints = self._midpoint_prices[:, None]
+            level_prices, level_flows = [], []
+            for side in ['bids', 'asks']:
+                distances = self._raw_data[:, [features.index(f'{side}_distance_{row}')
+                                               for row in range(MAX_BOOK_ROWS)]]
+                # same precision as the prices orders are placed at
+                distances = distances.astype(np.float64)
+                level_prices.append(np.round(midpoints * (distances + 1.), 2))
+                # [step, (market notional, cancel notional, notional), level]
+                level_flows.append(np.stack([self._raw_data[
+                    :, [features.index(f'{side}_{feature}_{row}')
+                        for row in range(MAX_BOOK_ROWS)]] for feature in
+                    ['market_notional', 'cancel_notional', 'notional']], axis=1))
+            self._bid_level_prices, self._ask_level_prices = level_prices
+            self._bid_level_flows, self._ask_level_flows = level_flows
 
         # graph midpoint prices
         self._render.reset_render_data(
-            y_vec=self._midpoint_prices[:np.shape(self._render.x_vec)[0]])
+            y_vec=self._midpoint_prices[
+                self._row_index[:np.shape(self._render.x_vec)[0]]])
+
+    def enable_profiling(self) -> None:
+        """
+        Time each phase of `step()` by wrapping the methods called by `step()` on
+        this instance (so there is no overhead when profiling is not enabled).
+
+        :return: (void)
+        """
+        if self._profiler is not None:
+            return
+        self._profiler = Profiler()
+        self.step = self._profiler.wrap('step', self.step)
+        self.broker.step_limit_order_pnl = self._profiler.wrap(
+            'step_limit_order_pnl', self.broker.step_limit_order_pnl)
+        self.map_action_to_broker = self._profiler.wrap(
+            'map_action_to_broker', self.map_action_to_broker)
+        self._get_step_reward = self._profiler.wrap(
+            'get_step_reward', self._get_step_reward)
+        self._update_indicators = self._profiler.wrap(
+            'update_indicators', self._update_indicators)
+        self._get_step_observation = self._profiler.wrap(
+            'get_step_observation', self._get_step_observation)
+        self.viz.add_observation = self._profiler.wrap(
+            'visualization', self.viz.add_observation)
+        self.viz.add = self._profiler.wrap('visualization', self.viz.add)
+        self._get_observation = self._profiler.wrap(
+            'get_observation', self._get_observation)
+
+    def get_profile(self) -> dict:
+        """
+        Get the wall time and call count of each phase of `step()` since the last
+        `reset()`.
+
+        :return: (dict) phase -> calls, total_ms, mean_us, and share of the step time;
+            empty if profiling is not enabled
+        """
+        if self._profiler is None:
+            return dict()
+        return self._profiler.get_summary(total_phase='step')
 
     @abstractmethod
     def map_action_to_broker(self, action: int) -> (float, float):
@@ -278,7 +424,7 @@ class BaseEnvironment(Env, ABC):
                 step_action = 0
 
             # Get current step's midpoint and change in midpoint price percentage
-            self.midpoint = self._midpoint_prices[self.local_step_number]
+            self.midpoint = self._midpoint_prices[self._row_index[self.local_step_number]]
             self.midpoint_change = (self.midpoint / self.last_midpoint) - 1.
 
             # Pass current time step bid/ask prices to broker to calculate PnL,
@@ -296,17 +442,19 @@ class BaseEnvironment(Env, ABC):
             sell_volume = self._get_book_data(index=self.sell_trade_index)
 
             # Update indicators
-            self.tns.step(buys=buy_volume, sells=sell_volume)
-            self.rsi.step(price=self.midpoint)
+            self._update_indicators(buy_volume=buy_volume, sell_volume=sell_volume)
 
             # Get PnL from any filled LIMIT orders, which is calculated by netting out
             # whatever open position the agent already has in FIFO order
+            bid_levels, ask_levels = self._get_price_levels()
             limit_pnl, long_filled, short_filled = self.broker.step_limit_order_pnl(
                 bid_price=self.best_bid,
                 ask_price=self.best_ask,
                 buy_volume=buy_volume,
                 sell_volume=sell_volume,
-                step=self.local_step_number
+                step=self.local_step_number,
+                bid_levels=bid_levels,
+                ask_levels=ask_levels
             )
 
             # Get PnL from any filled MARKET orders AND action penalties for invalid
@@ -359,7 +507,11 @@ class BaseEnvironment(Env, ABC):
         # save rewards to derive cumulative reward
         self.episode_stats.reward += self.reward
 
-        return self.observation, self.reward, self.done, {}
+        info = {}
+        if self.done and self._profiler is not None:
+            info['profile'] = self.get_profile()
+
+        return self.observation, self.reward, self.done, info
 
     def reset(self) -> np.ndarray:
         """
@@ -367,6 +519,16 @@ class BaseEnvironment(Env, ABC):
 
         :return: (np.array) Observation at first step
         """
+        # switch to the next trading day once enough episodes have been played on the
+        # current day (the day after it is prepared in the background, or cached)
+        if self._day_source is not None:
+            if self._day_episodes >= self._day_source.episodes_per_day:
+                day = self._day_source.next_day()
+                # keep the current day if the next day is not ready yet
+                if day is not None:
+                    self._set_day(day=day)
+            self._day_episodes += 1
+
         if self.training:
             self.local_step_number = self._random_state.randint(low=0,
                                                                 high=self.max_steps // 5)
@@ -393,6 +555,11 @@ class BaseEnvironment(Env, ABC):
             print('Resetting environment #{} on episode #{}.'.format(
                 self._seed, self.episode_stats.number_of_episodes))
 
+        # print out the time spent in each phase of the episode's steps
+        if self._profiler is not None and self._profiler.total_calls > 0:
+            print(self._profiler)
+            print(('=' * 75))
+
         self.A_t, self.B_t = 0., 0.
         self.reward = 0.0
         self.done = False
@@ -404,7 +571,7 @@ class BaseEnvironment(Env, ABC):
         self.viz.reset()
 
         for step in range(self.window_size + INDICATOR_WINDOW_MAX + 1):
-            self.midpoint = self._midpoint_prices[self.local_step_number]
+            self.midpoint = self._midpoint_prices[self._row_index[self.local_step_number]]
 
             if self.last_midpoint is None:
                 self.last_midpoint = self.midpoint
@@ -413,8 +580,8 @@ class BaseEnvironment(Env, ABC):
             self.best_bid, self.best_ask = self._get_nbbo()
             step_buy_volume = self._get_book_data(index=self.buy_trade_index)
             step_sell_volume = self._get_book_data(index=self.sell_trade_index)
-            self.tns.step(buys=step_buy_volume, sells=step_sell_volume)
-            self.rsi.step(price=self.midpoint)
+            self._update_indicators(buy_volume=step_buy_volume,
+                                    sell_volume=step_sell_volume)
 
             # Add current step's observation to the data buffer
             step_observation = self._get_step_observation(step_action=0)
@@ -425,6 +592,10 @@ class BaseEnvironment(Env, ABC):
 
         self.observation = self._get_observation()
 
+        # only profile the steps taken after the reset
+        if self._profiler is not None:
+            self._profiler.reset()
+
         return self.observation
 
     def render(self, mode: str = 'human') -> None:
@@ -448,6 +619,10 @@ class BaseEnvironment(Env, ABC):
         self._raw_data = None
         self._normalized_data = None
         self._midpoint_prices = None
+        self._row_index = None
+        self.day = None
+        if self._day_source is not None:
+            self._day_source.close()
         self.tns = None
         self.rsi = None
 
@@ -462,15 +637,42 @@ class BaseEnvironment(Env, ABC):
         self._seed = seed
         return [seed]
 
+    def _update_indicators(self, buy_volume: float, sell_volume: float) -> None:
+        """
+        Update indicators with the current time step's trade volumes and midpoint.
+
+        :param buy_volume: buy trade volume
+        :param sell_volume: sell trade volume
+        :return: (void)
+        """
+        self.tns.step(buys=buy_volume, sells=sell_volume)
+        self.rsi.step(price=self.midpoint)
+
+    def _get_price_levels(self) -> (tuple or None, tuple or None):
+        """
+        Get the current time step's price level data for the 'price_levels' fill
+        model.
+
+        :return: (prices, [market notional, cancel notional, notional]) of the bid and
+            ask price levels, or NONE if the 'trades' fill model is used (or there are
+            no open orders)
+        """
+        if self._bid_level_prices is None or not (
+                self.broker.long_inventory.orders or self.broker.short_inventory.orders):
+            return None, None
+
+        row = self._row_index[self.local_step_number]
+        return ((self._bid_level_prices[row], self._bid_level_flows[row]),
+                (self._ask_level_prices[row], self._ask_level_flows[row]))
+
     def _get_nbbo(self) -> (float, float):
         """
         Get best bid and offer.
 
         :return: (tuple) best bid and offer
         """
-        best_bid = self._best_bids[self.local_step_number]
-        best_ask = self._best_asks[self.local_step_number]
-        return best_bid, best_ask
+        row = self._row_index[self.local_step_number]
+        return self._best_bids[row], self._best_asks[row]
 
     def _get_book_data(self, index: int = 0) -> np.ndarray or float:
         """
@@ -479,7 +681,7 @@ class BaseEnvironment(Env, ABC):
         :param index: (int) step 'n' to look up in order book snapshot history
         :return: (np.array) order book snapshot vector
         """
-        return self._raw_data[self.local_step_number][index]
+        return self._raw_data[self._row_index[self.local_step_number], index]
 
     @staticmethod
     def _process_data(observation: np.ndarray) -> np.ndarray:
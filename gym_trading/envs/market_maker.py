@@ -2,25 +2,32 @@ import numpy as np
 from gym import spaces
 from typing import Tuple
 
-from configurations import ENCOURAGEMENT
+from configurations import ENCOURAGEMENT, MAX_BOOK_ROWS
 from gym_trading.envs.base_environment import BaseEnvironment
-from gym_trading.utils.order import LimitOrder
+
+# LOB levels that limit orders can be placed at
+ORDER_LEVELS = (0, 4, 9, 14)
 
 
 class MarketMaker(BaseEnvironment):
     id = 'market-maker-v0'
     description = "Environment where limit orders are tethered to LOB price levels"
 
-    def __init__(self, **kwargs):
+    def __init__(self, order_levels: tuple = ORDER_LEVELS, **kwargs):
         """
         Environment designed for automated market making.
 
+        :param order_levels: LOB levels (0 is the best bid/ask) that limit orders can
+            be placed at. The action space consists of doing nothing, placing a bid
+            and ask at every combination of levels (except both at the first level),
+            and flattening the inventory.
         :param kwargs: refer to BaseEnvironment.py
         """
         super().__init__(**kwargs)
 
         # Environment attributes to override in sub-class
-        self.actions = np.eye(17, dtype=np.float32)
+        self.action_table = self.get_action_table(order_levels=order_levels)
+        self.actions = np.eye(len(self.action_table), dtype=np.float32)
 
         self.action_space = spaces.Discrete(len(self.actions))
         self.observation = self.reset()  # Reset to load observation.shape
@@ -29,8 +36,14 @@ class MarketMaker(BaseEnvironment):
                                             dtype=np.float32)
 
         # Add the remaining labels for the observation space
-        self.viz.observation_labels += ['Long Dist', 'Short Dist',
-                                        'Bid Completion Ratio', 'Ask Completion Ratio']
+        self.viz.observation_labels += ['Long Dist', 'Short Dist']
+        if self.broker.max_orders == 1:
+            self.viz.observation_labels += ['Bid Completion Ratio',
+                                            'Ask Completion Ratio']
+        else:
+            for side in ['Bid', 'Ask']:
+                self.viz.observation_labels += [f'{side} Completion Ratio #{i}'
+                                                for i in range(self.broker.max_orders)]
         self.viz.observation_labels += [f'Action #{a}' for a in range(len(self.actions))]
         self.viz.observation_labels += ['Reward']
 
@@ -42,6 +55,30 @@ class MarketMaker(BaseEnvironment):
     def __str__(self):
         return '{} | {}-{}'.format(MarketMaker.id, self.symbol, self._seed)
 
+    @staticmethod
+    def get_action_table(order_levels: tuple = ORDER_LEVELS) -> tuple:
+        """
+        Create the table used to map actions to broker orders.
+
+        :param order_levels: LOB levels that limit orders can be placed at
+        :return: (tuple) (long level, short level, flatten) for each action, where a
+            level of -1 means no order is placed
+        """
+        order_levels = tuple(sorted(set(int(level) for level in order_levels)))
+        if len(order_levels) == 0 or order_levels[0] < 0 or \
+                order_levels[-1] >= MAX_BOOK_ROWS:
+            raise ValueError("order_levels must be between 0 and {}, not {}".format(
+                MAX_BOOK_ROWS - 1, order_levels))
+
+        action_table = [(-1, -1, False)]  # do nothing
+        for long_level in order_levels:
+            for short_level in order_levels:
+                if long_level == short_level == order_levels[0]:
+                    continue
+                action_table.append((long_level, short_level, False))
+        action_table.append((-1, -1, True))  # flatten inventory
+        return tuple(action_table)
+
     def map_action_to_broker(self, action: int) -> Tuple[float, float]:
         """
         Create or adjust orders per a specified action and adjust for penalties.
@@ -49,76 +86,21 @@ class MarketMaker(BaseEnvironment):
         :param action: (int) current step's action
         :return: (float) reward
         """
-        action_penalty = pnl = 0.0
-
-        if action == 0:  # do nothing
-            action_penalty += ENCOURAGEMENT
-
-        elif action == 1:
-            action_penalty += self._create_order_at_level(level=0, side='long')
-            action_penalty += self._create_order_at_level(level=4, side='short')
-
-        elif action == 2:
-            action_penalty += self._create_order_at_level(level=0, side='long')
-            action_penalty += self._create_order_at_level(level=9, side='short')
-
-        elif action == 3:
-            action_penalty += self._create_order_at_level(level=0, side='long')
-            action_penalty += self._create_order_at_level(level=14, side='short')
-
-        elif action == 4:
-            action_penalty += self._create_order_at_level(level=4, side='long')
-            action_penalty += self._create_order_at_level(level=0, side='short')
-
-        elif action == 5:
-            action_penalty += self._create_order_at_level(level=4, side='long')
-            action_penalty += self._create_order_at_level(level=4, side='short')
-
-        elif action == 6:
-            action_penalty += self._create_order_at_level(level=4, side='long')
-            action_penalty += self._create_order_at_level(level=9, side='short')
-
-        elif action == 7:
-            action_penalty += self._create_order_at_level(level=4, side='long')
-            action_penalty += self._create_order_at_level(level=14, side='short')
-
-        elif action == 8:
-            action_penalty += self._create_order_at_level(level=9, side='long')
-            action_penalty += self._create_order_at_level(level=0, side='short')
-
-        elif action == 9:
-            action_penalty += self._create_order_at_level(level=9, side='long')
-            action_penalty += self._create_order_at_level(level=4, side='short')
-
-        elif action == 10:
-            action_penalty += self._create_order_at_level(level=9, side='long')
-            action_penalty += self._create_order_at_level(level=9, side='short')
-
-        elif action == 11:
-            action_penalty += self._create_order_at_level(level=9, side='long')
-            action_penalty += self._create_order_at_level(level=14, side='short')
-
-        elif action == 12:
-            action_penalty += self._create_order_at_level(level=14, side='long')
-            action_penalty += self._create_order_at_level(level=0, side='short')
-
-        elif action == 13:
-            action_penalty += self._create_order_at_level(level=14, side='long')
-            action_penalty += self._create_order_at_level(level=4, side='short')
-
-        elif action == 14:
-            action_penalty += self._create_order_at_level(level=14, side='long')
-            action_penalty += self._create_order_at_level(level=9, side='short')
+        if not 0 <= action < len(self.action_table):
+            raise ValueError("L'action n'exist pas !!! Il faut faire attention !!!")
 
-        elif action == 15:
-            action_penalty += self._create_order_at_level(level=14, side='long')
-            action_penalty += self._create_order_at_level(level=14, side='short')
+        action_penalty = pnl = 0.0
+        long_level, short_level, flatten = self.action_table[action]
 
-        elif action == 16:
+        if flatten:
             pnl += self.broker.flatten_inventory(self.best_bid, self.best_ask)
 
+        elif long_level < 0:  # do nothing
+            action_penalty += ENCOURAGEMENT
+
         else:
-            raise ValueError("L'action n'exist pas !!! Il faut faire attention !!!")
+            action_penalty += self._create_order_at_level(level=long_level, side='long')
+            action_penalty += self._create_order_at_level(level=short_level, side='short')
 
         return action_penalty, pnl
 
@@ -140,7 +122,8 @@ class MarketMaker(BaseEnvironment):
 
     def _create_order_at_level(self, level: int, side: str) -> float:
         """
-        Create a new order at a specified LOB level.
+        Create a new order at a specified LOB level, or move the open order to
+        that level.
 
         :param level: (int) level in the limit order book
         :param side: (str) direction of trade e.g., 'long' or 'short'
@@ -155,19 +138,24 @@ class MarketMaker(BaseEnvironment):
             price_index = self.best_ask_index
         else:
             notional_index = price_index = None
-        # get price data from numpy array
-        price_level_price = self._get_book_data(index=price_index + level)
-        # transform percentage into a hard number
-        price_level_price = round(self.midpoint * (price_level_price + 1.), 2)
+        if self._bid_level_prices is not None:
+            # use the same prices as the fill model to match orders to price levels
+            level_prices = self._bid_level_prices if side == 'long' else \
+                self._ask_level_prices
+            price_level_price = float(
+                level_prices[self._row_index[self.local_step_number], level])
+        else:
+            # get price data from numpy array
+            price_level_price = self._get_book_data(index=price_index + level)
+            # transform percentage into a hard number
+            price_level_price = round(self.midpoint * (price_level_price + 1.), 2)
         price_level_queue = self._get_book_data(index=notional_index + level)
-        # create a new order
-        order = LimitOrder(ccy=self.symbol,
-                           side=side,
-                           price=price_level_price,
-                           step=self.local_step_number,
-                           queue_ahead=price_level_queue)
         # add a penalty or encouragement, depending if order is accepted
-        if self.broker.add(order=order) is False:
+        if self.broker.add_limit_order(ccy=self.symbol,
+                                       side=side,
+                                       price=price_level_price,
+                                       queue_ahead=price_level_queue,
+                                       step=self.local_step_number) is False:
             reward -= ENCOURAGEMENT
         else:
             reward += ENCOURAGEMENT
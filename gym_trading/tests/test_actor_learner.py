@@ -0,0 +1,148 @@
+import contextlib
+import functools
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.actor_learner import ActorLearner, SharedWeights
+
+WINDOW_SIZE = 10
+
+
+class LinearPolicy(object):
+
+    def __init__(self, number_of_features: int, number_of_actions: int):
+        """
+        Linear Q-function, implementing the Keras model methods used by actors.
+        """
+        self.weights = [np.zeros((number_of_features, number_of_actions),
+                                 dtype=np.float32)]
+
+    def get_weights(self) -> list:
+        return [w.copy() for w in self.weights]
+
+    def set_weights(self, weights: list) -> None:
+        self.weights = [w.copy() for w in weights]
+
+    def save_weights(self, filename: str) -> None:
+        np.save(filename, self.weights[0])
+
+    def predict_on_batch(self, states: np.ndarray) -> np.ndarray:
+        return states.reshape(states.shape[0], -1) @ self.weights[0]
+
+
+class LinearLearner(LinearPolicy):
+
+    def __init__(self, number_of_features: int, number_of_actions: int):
+        """
+        Q-learning with a linear Q-function.
+        """
+        super().__init__(number_of_features, number_of_actions)
+        self.batches = list()
+
+    def update(self, state0, actions, rewards, state1, terminals) -> None:
+        self.batches.append((state0, actions, rewards, state1, terminals))
+        features = state0.reshape(state0.shape[0], -1)
+        returns = rewards + 0.99 * self.predict_on_batch(state1).max(axis=1) * \
+            (1. - terminals)
+        errors = returns - self.predict_on_batch(state0)[np.arange(len(actions)),
+                                                        actions]
+        for action in np.unique(actions):
+            mask = actions == action
+            self.weights[0][:, action] += 1e-4 * features[mask].T @ errors[mask]
+
+
+class ActorLearnerTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.data_file = export_snapshot_day(path=self.path, number_of_snapshots=1500,
+                                             seed=1)
+        self.env_kwargs = dict(symbol='BTC-USD', fitting_file=self.data_file,
+                               testing_file=self.data_file, window_size=WINDOW_SIZE,
+                               training=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_shared_weights(self):
+        weights = [np.ones((2, 3), dtype=np.float32), np.zeros(4, dtype=np.float32)]
+        shared_weights = SharedWeights(weights=weights)
+        shared_weights.set(weights=[w + 1. for w in weights])
+        version, shared = shared_weights.get()
+        self.assertEqual(2, version)
+        for expected, w in zip(weights, shared):
+            np.testing.assert_array_equal(expected + 1., w)
+
+    def test_actor_learner(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(**self.env_kwargs)
+            number_of_features = int(np.prod(env.observation_space.shape))
+            number_of_actions = env.action_space.n
+            env.close()
+
+        learner = LinearLearner(number_of_features, number_of_actions)
+        actor_learner = ActorLearner(
+            learner=learner,
+            create_policy=functools.partial(LinearPolicy, number_of_features,
+                                            number_of_actions),
+            env_kwargs=self.env_kwargs, window_size=WINDOW_SIZE,
+            number_of_actors=2, make_env=MarketMaker, batch_size=16,
+            number_of_warmup_steps=100, weights_interval=10, sync_interval=10,
+            block_size=16)
+        log_filename = os.path.join(self.path, 'log.json')
+        try:
+            actor_learner.train(number_of_steps=1000,
+                                checkpoint_filename=os.path.join(
+                                    self.path, 'weights_{step}.npy'),
+                                checkpoint_interval=400, log_filename=log_filename,
+                                log_episode_interval=1)
+        finally:
+            actor_learner.close()
+
+        # both actors contributed transitions, and synced the published weights
+        self.assertGreaterEqual(actor_learner.number_of_steps, 1000)
+        self.assertTrue(all(len(memory) > 0 for memory in actor_learner.memories))
+        self.assertTrue(all(version > 0 for version in
+                            actor_learner.actor_weights_versions))
+        self.assertEqual(len(learner.batches), actor_learner.number_of_updates)
+        self.assertGreater(actor_learner.number_of_updates, 0)
+        # the learner maps the days saved by the actors, without preparing them
+        self.assertGreater(actor_learner.day_cache.hits, 0)
+        self.assertEqual(0, actor_learner.day_cache.misses)
+        self.assertFalse(os.path.exists(actor_learner.day_cache.memmap_path))
+
+        # the learner saved checkpoints, and logged the actors' episodes
+        self.assertEqual(2, len([f for f in os.listdir(self.path)
+                                 if f.startswith('weights_')]))
+        with open(log_filename, 'r') as f:
+            episode_logs = json.load(f)
+        self.assertEqual(actor_learner.episode_logs, episode_logs)
+        self.assertGreater(len(episode_logs['episode']), 0)
+        self.assertTrue(all(steps > 0 for steps in episode_logs['nb_episode_steps']))
+
+        # the observations sent by the actors are rebuilt from the day's data
+        state0, actions, rewards, state1, terminals = learner.batches[-1]
+        self.assertEqual((16, WINDOW_SIZE, number_of_features // WINDOW_SIZE),
+                         state0.shape)
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(**self.env_kwargs)
+            observations = [env.reset()] + [env.step(0)[0] for _ in range(3)]
+            number_of_day_features = env.day.normalized_data.shape[1]
+            env.close()
+        memory = actor_learner.memories[0]
+        np.testing.assert_array_equal(
+            np.stack(observations)[:, :, :number_of_day_features],
+            memory.get_observations(np.arange(4) * 5 + WINDOW_SIZE - 1)[
+                :, :, :number_of_day_features])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from backtest import get_day_pairs, run_backtest
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.numpy_policy import NumpyPolicy
+
+ENV_KWARGS = dict(symbol='BTC-USD', max_position=5, action_repeats=5,
+                  recording_mode='ring', recording_length=1)
+WINDOW_SIZE = 10
+
+
+class BacktestTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.days = [export_snapshot_day(path=self.path, filename=f'day_{i}',
+                                         number_of_snapshots=1500 + 100 * i, seed=i)
+                     for i in range(4)]
+
+        # random MLP policy sized to the environment's observations
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(fitting_file=self.days[0], testing_file=self.days[1],
+                              window_size=WINDOW_SIZE, **ENV_KWARGS)
+            number_of_features = env.reset().shape[-1]
+            number_of_actions = env.action_space.n
+            env.close()
+        random_state = np.random.RandomState(1)
+        shapes = [(number_of_features, 16), (WINDOW_SIZE * 16, number_of_actions)]
+        weights = list()
+        for shape in shapes:
+            weights.append(random_state.normal(size=shape).astype(np.float32))
+            weights.append(random_state.normal(size=shape[-1]).astype(np.float32))
+        self.policy = NumpyPolicy(
+            architecture=[dict(layer='dense', activation='relu'),
+                          dict(layer='flatten'),
+                          dict(layer='dense', activation='linear')],
+            weights=weights, input_shape=(1, WINDOW_SIZE, number_of_features))
+        self.policy_filename = os.path.join(self.path, 'policy.npz')
+        self.policy.save(filename=self.policy_filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _backtest_day(self, fitting_file: str, testing_file: str) -> dict:
+        """
+        Evaluate the policy on one day, one step at a time.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(fitting_file=fitting_file, testing_file=testing_file,
+                              window_size=WINDOW_SIZE, training=False, **ENV_KWARGS)
+            observation, done, number_of_steps = env.reset(), False, 0
+            while not done:
+                action = int(np.argmax(self.policy.predict(observation)))
+                observation, _, done, _ = env.step(action)
+                number_of_steps += 1
+            result = dict(testing_file=testing_file, number_of_steps=number_of_steps,
+                          realized_pnl=env.broker.realized_pnl / env.max_position * 100.,
+                          trade_count=env.broker.total_trade_count)
+            env.close()
+        return result
+
+    def test_backtest(self):
+        self.assertEqual([(self.days[0], self.days[1]), (self.days[1], self.days[2]),
+                          (self.days[2], self.days[3])], get_day_pairs(days=self.days))
+
+        expected = [self._backtest_day(fitting_file=fitting_file,
+                                       testing_file=testing_file)
+                    for fitting_file, testing_file in get_day_pairs(days=self.days)]
+        # one worker evaluating a batch of days, and two workers
+        for max_workers, max_days_per_batch in [(1, 3), (2, 2)]:
+            report = run_backtest(days=self.days, policy_filename=self.policy_filename,
+                                  env_kwargs=ENV_KWARGS, max_workers=max_workers,
+                                  max_days_per_batch=max_days_per_batch,
+                                  path=self.path)
+            self.assertEqual(self.days[1:], report['testing_file'].tolist())
+            for column in ['number_of_steps', 'trade_count']:
+                self.assertEqual([result[column] for result in expected],
+                                 report[column].tolist())
+            np.testing.assert_allclose([result['realized_pnl'] for result in expected],
+                                       report['realized_pnl'].values)
+
+            self.assertTrue(any(f.startswith('backtest_') and f.endswith('.csv')
+                                for f in os.listdir(self.path)))
+        self.assertTrue(sum(result['trade_count'] for result in expected) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from gym_trading.utils.broker import Broker
 from gym_trading.utils.decorator import debugging
 from gym_trading.utils.order import LimitOrder, MarketOrder
@@ -91,6 +93,24 @@ class MarketOrderTestCases(unittest.TestCase):
         self.assertEqual(0, test_position.long_inventory.position_count)
         self.assertEqual(0, test_position.short_inventory.position_count)
 
+    @debugging
+    def test_flatten_inventory(self):
+        test_position = Broker(5)
+
+        for price in [100., 102.]:
+            test_position.add(order=MarketOrder(ccy='BTC-USD', side='long',
+                                                price=price, step=0))
+        test_position.add(order=MarketOrder(ccy='BTC-USD', side='short',
+                                            price=110., step=0))
+
+        pnl = test_position.flatten_inventory(bid_price=101., ask_price=99.)
+        expected_pnl = (101. / 100. - 1.) + (101. / 102. - 1.) + (110. / 99. - 1.)
+        self.assertAlmostEqual(expected_pnl, pnl)
+        self.assertAlmostEqual(expected_pnl, test_position.realized_pnl)
+        self.assertEqual(0, test_position.long_inventory_count)
+        self.assertEqual(0, test_position.short_inventory_count)
+        self.assertEqual(0., test_position.long_inventory.total_exposure)
+
 
 class LimitOrderTestCases(unittest.TestCase):
 
@@ -349,5 +369,163 @@ class LimitOrderTestCases(unittest.TestCase):
         print("PnL: {}".format(pnl))
 
 
+    @debugging
+    def test_add_limit_order(self):
+        test_position = Broker()
+
+        # the first order is placed as a new order
+        is_added = test_position.add_limit_order(ccy='BTC-USD', side='long', price=100.,
+                                                 queue_ahead=500., step=0)
+        self.assertEqual(True, is_added)
+        order = test_position.long_inventory.order
+        self.assertEqual(1, test_position.long_inventory.statistics.orders_placed)
+
+        # later orders move the open order in place
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=99.,
+                                      queue_ahead=200., step=1)
+        self.assertIs(order, test_position.long_inventory.order)
+        self.assertEqual(99., order.price)
+        self.assertEqual(200., order.queue_ahead)
+        self.assertEqual(1, order.step)
+        self.assertEqual(1, test_position.long_inventory.statistics.orders_updated)
+
+        # orders at the same price are left alone
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=99.,
+                                      queue_ahead=100., step=2)
+        self.assertEqual(200., order.queue_ahead)
+        self.assertEqual(1, test_position.long_inventory.statistics.orders_updated)
+
+        # new orders are rejected when the inventory is full
+        test_position.add(order=MarketOrder(ccy='BTC-USD', side='short', price=101.,
+                                            step=2))
+        is_added = test_position.add_limit_order(ccy='BTC-USD', side='short',
+                                                 price=101., queue_ahead=0., step=2)
+        self.assertEqual(False, is_added)
+        self.assertIsNone(test_position.short_inventory.order)
+
+
+    @debugging
+    def test_order_metrics(self):
+        test_position = Broker(max_position=5)
+        prices = [100., 101., 99., 103., 98., 100., 104., 97., 100., 102.]
+        entry_steps = dict()
+
+        for step, price in enumerate(prices):
+            test_position.step_limit_order_pnl(bid_price=price, ask_price=price,
+                                               buy_volume=0., sell_volume=0., step=step)
+            if step % 3 == 0:
+                test_position.add(order=MarketOrder(ccy='BTC-USD', side='short',
+                                                    price=price, step=step))
+                entry_steps[test_position.short_inventory.positions[-1].id] = step
+
+        for position in test_position.short_inventory.positions:
+            metrics = test_position.short_inventory.get_order_metrics(order=position)
+            entry_step = entry_steps[position.id]
+            entry_price = position.average_execution_price
+            # market orders are first marked to market on the step after they are added
+            pnl = [(entry_price - price) / entry_price for price in
+                   prices[entry_step + 1:]]
+            self.assertAlmostEqual(min(pnl + [0.]), metrics.drawdown_max)
+            self.assertAlmostEqual(max(pnl + [0.]), metrics.upside_max)
+            self.assertEqual(len(prices) - 1 - entry_step, metrics.steps_in_position)
+
+
+    @debugging
+    def test_order_ladder(self):
+        test_position = Broker(max_position=10, max_orders=3)
+
+        for price, queue_ahead in [(100., 0.), (99., 500.), (98., 0.)]:
+            test_position.add_limit_order(ccy='BTC-USD', side='long', price=price,
+                                          queue_ahead=queue_ahead, step=0)
+        self.assertEqual(3, test_position.long_inventory.order_count)
+        self.assertEqual(100., test_position.long_inventory.order.price)
+
+        # the ladder is full, so the order farthest from the new price is moved
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=101.,
+                                      queue_ahead=0., step=1)
+        self.assertEqual([101., 100., 99.], [
+            order.price for order in test_position.long_inventory.get_orders()])
+
+        # the market trades through 100 and 101, but not 99
+        _, is_long_order_filled, _ = test_position.step_limit_order_pnl(
+            bid_price=99.5, ask_price=100., buy_volume=0., sell_volume=1000., step=2)
+        self.assertEqual(True, is_long_order_filled)
+        self.assertEqual(2, test_position.long_inventory_count)
+        self.assertEqual([99.], [
+            order.price for order in test_position.long_inventory.get_orders()])
+        self.assertEqual(101., test_position.long_inventory.positions[0].price)
+
+        # the order at 99 works through its queue before it is filled
+        test_position.step_limit_order_pnl(
+            bid_price=99., ask_price=99.5, buy_volume=0., sell_volume=750., step=3)
+        self.assertEqual(0., test_position.long_inventory.order.queue_ahead)
+        self.assertEqual(250., test_position.long_inventory.order.executed)
+
+        queues = test_position.get_queues_ahead_features()
+        self.assertEqual(6, len(queues))
+        self.assertEqual(0.25, queues[0])
+        self.assertEqual((0.,) * 5, queues[1:])
+
+
+    @debugging
+    def test_price_levels_fill_model(self):
+        test_position = Broker(max_position=10, max_orders=2)
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=99.,
+                                      queue_ahead=500., step=0)
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=98.5,
+                                      queue_ahead=0., step=0)
+
+        # (prices, [market notional, cancel notional, notional])
+        bid_levels = (np.array([100., 99., 98.]), np.array([[0., 300., 0.],
+                                                            [0., 400., 0.],
+                                                            [1000., 800., 500.]]))
+        ask_levels = (np.array([101., 102., 103.]), np.ones((3, 3)))
+        test_position.step_limit_order_pnl(bid_price=100., ask_price=101.,
+                                           buy_volume=0., sell_volume=2000., step=1,
+                                           bid_levels=bid_levels, ask_levels=ask_levels)
+        orders = test_position.long_inventory.orders
+
+        # half the cancellations are ahead of the order, then market orders fill it
+        self.assertEqual(0., orders[99.].queue_ahead)
+        self.assertEqual(50., orders[99.].executed)
+        # there is no price level at 98.5, so the order is untouched
+        self.assertEqual(0., orders[98.5].executed)
+
+        # the market trading through an order fills it with the trade volume
+        test_position.step_limit_order_pnl(bid_price=98., ask_price=98.5,
+                                           buy_volume=0., sell_volume=2000., step=2,
+                                           bid_levels=bid_levels, ask_levels=ask_levels)
+        self.assertEqual(2, test_position.long_inventory_count)
+
+    @debugging
+    def test_price_levels_fill_model_at_touch(self):
+        test_position = Broker(max_position=10, max_orders=1)
+        test_position.add_limit_order(ccy='BTC-USD', side='long', price=100.02,
+                                      queue_ahead=500., step=0)
+        test_position.add_limit_order(ccy='BTC-USD', side='short', price=100.04,
+                                      queue_ahead=500., step=0)
+
+        # the environments' best prices are float32, which round the touch below
+        # the bid level's price and above the ask level's price
+        bid_price, ask_price = np.float32(100.02), np.float32(100.04)
+        self.assertLess(bid_price, 100.02)
+        self.assertGreater(ask_price, 100.04)
+        bid_levels = (np.array([100.02, 100.01]), np.array([[100., 0.],
+                                                             [0., 0.],
+                                                             [1000., 0.]]))
+        ask_levels = (np.array([100.04, 100.05]), np.array([[200., 0.],
+                                                             [0., 0.],
+                                                             [1000., 0.]]))
+        test_position.step_limit_order_pnl(bid_price=bid_price, ask_price=ask_price,
+                                           buy_volume=5000., sell_volume=5000., step=1,
+                                           bid_levels=bid_levels, ask_levels=ask_levels)
+
+        # the orders are depleted by their level's market orders, not the trades
+        self.assertEqual(400., test_position.long_inventory.order.queue_ahead)
+        self.assertEqual(300., test_position.short_inventory.order.queue_ahead)
+        self.assertEqual(0, test_position.long_inventory_count)
+        self.assertEqual(0, test_position.short_inventory_count)
+
+
 if __name__ == '__main__':
     unittest.main()
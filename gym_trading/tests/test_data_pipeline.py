@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from configurations import REPEATS_COLUMN
+from gym_trading.utils.data_pipeline import (
+    DataPipeline, SCALER_STATISTICS_SUFFIX, precompute_scaler_statistics,
+)
+
+
+class DataPipelineTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.data_file = export_snapshot_day(path=self.path, number_of_snapshots=2000,
+                                             seed=1)
+        self.sidecar = self.data_file + SCALER_STATISTICS_SUFFIX
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _load(self, alpha: float or list or None, cache_scaler: bool) -> tuple:
+        return DataPipeline(alpha=alpha).load_environment_data(
+            fitting_file=self.data_file, testing_file=self.data_file,
+            cache_scaler=cache_scaler)
+
+    def test_scaler_statistics_sidecar(self):
+        for alpha in [0.99, [0.9, 0.99], None]:
+            expected = self._load(alpha=alpha, cache_scaler=False)
+            self.assertFalse(os.path.exists(self.sidecar))
+
+            # the first load saves the sidecar, and the second load reuses it
+            for _ in range(2):
+                for expected_data, data in zip(expected, self._load(alpha=alpha,
+                                                                    cache_scaler=True)):
+                    np.testing.assert_array_equal(expected_data, data)
+                self.assertTrue(os.path.exists(self.sidecar))
+
+            # statistics saved with another EMA configuration are refit
+            pipeline = DataPipeline(alpha=0.5)
+            pipeline.fit_scaler_from_file(fitting_file=self.data_file)
+            self.assertFalse(pipeline._load_scaler_statistics(
+                filename=self.data_file, file_hash='modified file'))
+            os.remove(self.sidecar)
+
+    def test_unusable_sidecar(self):
+        expected = self._load(alpha=0.99, cache_scaler=False)
+
+        # a truncated sidecar (e.g., read while it is saved) is fitted again
+        with open(self.sidecar, 'w') as f:
+            f.write('{"version": 1, "file_ha')
+        for expected_data, data in zip(expected, self._load(alpha=0.99,
+                                                            cache_scaler=True)):
+            np.testing.assert_array_equal(expected_data, data)
+        self._load(alpha=0.99, cache_scaler=True)
+        self.assertEqual([os.path.basename(self.sidecar)],
+                         [f for f in os.listdir(self.path) if 'scaler' in f])
+        os.remove(self.sidecar)
+
+        # a sidecar that cannot be read or written is not fatal
+        os.mkdir(self.sidecar)
+        for expected_data, data in zip(expected, self._load(alpha=0.99,
+                                                            cache_scaler=True)):
+            np.testing.assert_array_equal(expected_data, data)
+        self.assertTrue(os.path.isdir(self.sidecar))
+        self.assertEqual([], [f for f in os.listdir(self.path) if f.endswith('.tmp')])
+
+    def test_numpy_pipeline(self):
+        # repeat some of the snapshots, as run-length encoded snapshots are stored
+        data = pd.read_csv(self.data_file)
+        data[REPEATS_COLUMN] = np.random.RandomState(1).randint(1, 4, size=len(data))
+        testing_file = os.path.join(self.path, 'run_length_encoded.csv')
+        data.to_csv(testing_file, index=False)
+
+        for alpha in [0.99, [0.9, 0.99], None]:
+            for include_imbalances in [True, False]:
+                expected = DataPipeline(alpha=alpha).load_environment_data(
+                    fitting_file=self.data_file, testing_file=testing_file,
+                    include_imbalances=include_imbalances, as_pandas=True,
+                    cache_scaler=False)
+                arrays = DataPipeline(alpha=alpha).load_environment_arrays(
+                    fitting_file=self.data_file, testing_file=testing_file,
+                    include_imbalances=include_imbalances, cache_scaler=False)
+                midpoint_prices, data, normalized_data, row_index, labels = arrays
+
+                np.testing.assert_array_equal(expected[0].to_numpy(dtype=np.float64),
+                                              midpoint_prices)
+                np.testing.assert_array_equal(expected[1].to_numpy(dtype=np.float32),
+                                              data)
+                np.testing.assert_array_equal(expected[2].to_numpy(dtype=np.float32),
+                                              normalized_data)
+                np.testing.assert_array_equal(expected[3], row_index)
+                self.assertEqual(expected[1].columns.tolist(), labels['data'])
+                self.assertEqual(expected[2].columns.tolist(), labels['normalized_data'])
+                self.assertEqual(np.float32, normalized_data.dtype)
+
+    def test_precompute_scaler_statistics(self):
+        # relative paths are relative to the working directory, not DATA_PATH
+        self.assertEqual([os.path.basename(self.data_file)],
+                         precompute_scaler_statistics(path=os.path.relpath(self.path),
+                                                      alpha=0.99))
+        self.assertTrue(os.path.exists(self.sidecar))
+
+
+if __name__ == '__main__':
+    unittest.main()
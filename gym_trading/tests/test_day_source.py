@@ -0,0 +1,160 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future
+
+import numpy as np
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.day_source import DayCache, DaySource, get_archive_days, \
+    load_day
+
+
+class DaySourceTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.days = [export_snapshot_day(path=self.path, filename=f'day_{i}',
+                                         number_of_snapshots=1500 + 100 * i, seed=i)
+                     for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_ordered_days(self):
+        day_source = DaySource(days=self.days, max_days_in_memory=3)
+        try:
+            # the first day is only used to normalize the second day
+            for i in [1, 2, 1]:
+                day = day_source.next_day()
+                self.assertEqual(self.days[i - 1], day.fitting_file)
+                self.assertEqual(self.days[i], day.testing_file)
+                # the current day and the days prepared in the background are bounded
+                self.assertEqual(2, len(day_source._pending))
+
+            # days are normalized with the prior day's statistics
+            expected = load_day(fitting_file=self.days[0], testing_file=self.days[1])
+            np.testing.assert_array_equal(expected.normalized_data,
+                                          day.normalized_data)
+            self.assertEqual(expected.labels, day.labels)
+        finally:
+            day_source.close()
+
+    def test_sampled_days(self):
+        day_source = DaySource(days=self.days, sample=True, seed=1)
+        try:
+            testing_files = {day_source.next_day().testing_file for _ in range(6)}
+            self.assertNotIn(self.days[0], testing_files)
+        finally:
+            day_source.close()
+
+    def test_day_cache(self):
+        days = [load_day(fitting_file=self.days[i - 1], testing_file=self.days[i])
+                for i in [1, 2]]
+        keys = [DayCache.get_key(fitting_file=day.fitting_file,
+                                 testing_file=day.testing_file) for day in days]
+
+        for memmap_path in [None, os.path.join(self.path, 'memmap')]:
+            # the budget fits the second day, but not both days
+            cache = DayCache(max_bytes=days[1].nbytes + 1, memmap_path=memmap_path)
+            self.assertIsNone(cache.get(key=keys[0]))
+            cached_day = cache.put(key=keys[0], day=days[0])
+            np.testing.assert_array_equal(days[0].normalized_data,
+                                          cached_day.normalized_data)
+            self.assertIs(cached_day, cache.get(key=keys[0]))
+            self.assertEqual(memmap_path is not None,
+                             isinstance(cached_day.normalized_data, np.memmap))
+
+            # the least recently used day is evicted once the budget is exceeded
+            cache.put(key=keys[1], day=days[1])
+            self.assertNotIn(keys[0], cache)
+            self.assertIn(keys[1], cache)
+            statistics = cache.get_statistics()
+            self.assertEqual(1, statistics['days'])
+            self.assertEqual(days[1].nbytes, statistics['nbytes'])
+            self.assertEqual((1, 1, 1), (statistics['hits'], statistics['misses'],
+                                         statistics['evictions']))
+
+            # evicted days stay usable, even if they were memory-mapped
+            np.testing.assert_array_equal(days[0].normalized_data,
+                                          cached_day.normalized_data)
+            cache.clear()
+            self.assertEqual(0, cache.get_statistics()['nbytes'])
+
+    def test_shared_memmap_cache(self):
+        day = load_day(fitting_file=self.days[0], testing_file=self.days[1])
+        memmap_path = os.path.join(self.path, 'memmap')
+        DayCache(memmap_path=memmap_path).put(key=day.key, day=day)
+
+        # caches of other processes load the saved day instead of preparing it
+        shared_day = DayCache(memmap_path=memmap_path).get(key=day.key)
+        self.assertIsInstance(shared_day.normalized_data, np.memmap)
+        np.testing.assert_array_equal(day.normalized_data, shared_day.normalized_data)
+        self.assertEqual(day.labels, shared_day.labels)
+        self.assertEqual(day.key, shared_day.key)
+
+    def test_cached_days(self):
+        cache = DayCache()
+        day_source = DaySource(days=self.days, cache=cache, wait_for_days=False)
+        try:
+            first_days = [day_source.next_day(wait=True) for _ in range(2)]
+            # the days of the second pass (and the day prefetched after them) are
+            # taken from the cache instead of being imported again
+            for day in first_days:
+                self.assertIs(day, day_source.next_day(wait=True))
+            self.assertEqual(3, cache.get_statistics()['hits'])
+
+            # the current day is kept if the next day is not ready yet
+            day_source._pending.appendleft(('not ready', Future()))
+            self.assertIsNone(day_source.next_day())
+            self.assertIs(first_days[1], day_source.current_day)
+        finally:
+            day_source.close()
+
+    def test_archive_days(self):
+        path = os.path.join(self.path, 'archive')
+        os.mkdir(path)
+        names = ['BTC-USD_2019-01-02.csv.xz', 'BTC-USD_2019-01-01.csv.xz',
+                 'BTC-USD_2019-01-01_100ms.csv.xz', 'BTC-USD_2019-01-02_100ms.csv.xz',
+                 'BTC-USD_2019-01-01_1000_messages.csv.xz', 'ETH-USD_2019-01-01.csv',
+                 'BTC-USD_2019-01-03.csv', 'BTC-USD_notes.txt']
+        for name in names:
+            open(os.path.join(path, name), 'w').close()
+
+        def get_names(**kwargs) -> list:
+            return [os.path.basename(day) for day in get_archive_days(path=path,
+                                                                      **kwargs)]
+
+        # exports of the same day at other rates or by other samplers are excluded
+        self.assertEqual(['BTC-USD_2019-01-01.csv.xz', 'BTC-USD_2019-01-02.csv.xz',
+                          'BTC-USD_2019-01-03.csv'], get_names(symbol='BTC-USD'))
+        self.assertEqual(['BTC-USD_2019-01-01_100ms.csv.xz',
+                          'BTC-USD_2019-01-02_100ms.csv.xz'],
+                         get_names(symbol='BTC-USD', suffix='100ms'))
+        self.assertEqual(['BTC-USD_2019-01-01_1000_messages.csv.xz'],
+                         get_names(symbol='BTC-USD', suffix='1000_messages'))
+        self.assertEqual(4, len(get_names()))
+        self.assertEqual([], get_names(symbol='LTC-USD'))
+
+    def test_environment_switches_days(self):
+        day_source = DaySource(days=self.days, episodes_per_day=2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(symbol='BTC-USD', day_source=day_source, window_size=10,
+                              training=False)
+            testing_files = [env.testing_file]
+            for _ in range(4):
+                env.reset()
+                testing_files.append(env.testing_file)
+            env.close()
+
+        # the constructor's reset() is the first episode on the first day
+        self.assertEqual([self.days[1], self.days[1], self.days[2], self.days[2],
+                          self.days[1]], testing_files)
+
+
+if __name__ == '__main__':
+    unittest.main()
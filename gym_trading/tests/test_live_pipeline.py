@@ -0,0 +1,131 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from configurations import INDICATOR_WINDOW_MAX
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.data_pipeline import DataPipeline
+from gym_trading.utils.live_pipeline import (
+    LiveAgent, LivePipeline, get_flat_agent_features,
+)
+from gym_trading.utils.numpy_policy import NumpyPolicy
+
+WINDOW_SIZE = 10
+
+
+class ReplayBook(object):
+    """
+    Order book rendering the snapshots of an exported day.
+    """
+
+    def __init__(self, snapshots: np.ndarray):
+        self.snapshots = iter(snapshots)
+
+    def render_book(self) -> np.ndarray:
+        return next(self.snapshots)
+
+
+class LivePipelineTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fitting_file = export_snapshot_day(path=self.path, filename='day_0',
+                                                number_of_snapshots=1500, seed=0)
+        self.testing_file = export_snapshot_day(path=self.path, filename='day_1',
+                                                number_of_snapshots=1500, seed=1)
+        values, self.feature_names, row_index = DataPipeline.import_arrays(
+            filename=self.testing_file)
+        self.snapshots = values[row_index]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_environment_parity(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(symbol='BTC-USD', fitting_file=self.fitting_file,
+                              testing_file=self.testing_file, window_size=WINDOW_SIZE,
+                              training=False, recording_mode='off')
+            # the environment resets when it is created (the indicators' EMA
+            # carries on over the following resets)
+            observations = [env.observation]
+            for _ in range(3):
+                observations.append(env.step(0)[0])
+            labels = env.viz.observation_labels
+            env.close()
+
+        pipeline = LivePipeline(fitting_file=self.fitting_file,
+                                feature_names=self.feature_names,
+                                window_size=WINDOW_SIZE)
+        number_of_market_features = pipeline.number_of_market_features
+        self.assertEqual(labels[:number_of_market_features], pipeline.labels)
+        # a flat agent's features
+        agent_features = get_flat_agent_features(
+            number_of_agent_features=len(labels) - number_of_market_features,
+            number_of_actions=env.action_space.n)
+        np.testing.assert_array_equal(
+            agent_features, observations[0][-1, number_of_market_features:])
+        pipeline.set_agent_features(agent_features=agent_features)
+
+        # the environment's reset takes as many steps as the pipeline's warm-up
+        number_of_snapshots = WINDOW_SIZE + INDICATOR_WINDOW_MAX + 1
+        ready = [pipeline.step(snapshot)
+                 for snapshot in self.snapshots[:number_of_snapshots]]
+        self.assertEqual([False] * (number_of_snapshots - 1) + [True], ready)
+        for observation in observations:
+            live_observation = pipeline.observation
+            np.testing.assert_allclose(observation[:, :number_of_market_features],
+                                       live_observation[:, :number_of_market_features],
+                                       rtol=1e-4, atol=1e-5)
+            # besides the encouragement rewarded for no action
+            np.testing.assert_allclose(observation[:, number_of_market_features:],
+                                       live_observation[:, number_of_market_features:],
+                                       atol=1e-9)
+            for snapshot in self.snapshots[number_of_snapshots:
+                                           number_of_snapshots + env.action_repeats]:
+                self.assertTrue(pipeline.step(snapshot))
+            number_of_snapshots += env.action_repeats
+
+    def test_live_agent(self):
+        pipeline = LivePipeline(fitting_file=self.fitting_file,
+                                feature_names=self.feature_names,
+                                window_size=WINDOW_SIZE)
+        # 7 position features, 4 actions, and the reward
+        number_of_features = pipeline.number_of_market_features + 12
+        random_state = np.random.RandomState(1)
+        policy = NumpyPolicy(
+            architecture=[dict(layer='flatten'),
+                          dict(layer='dense', activation='linear')],
+            weights=[random_state.normal(size=(WINDOW_SIZE * number_of_features, 4)),
+                     random_state.normal(size=4)],
+            input_shape=(1, WINDOW_SIZE, number_of_features))
+        policy_filename = os.path.join(self.path, 'policy.npz')
+        policy.save(filename=policy_filename)
+
+        agent = LiveAgent(policy_filename=policy_filename,
+                          fitting_file=self.fitting_file,
+                          feature_names=self.feature_names, log_interval=50)
+        book = ReplayBook(snapshots=self.snapshots)
+        warm_up = WINDOW_SIZE + INDICATOR_WINDOW_MAX + 1
+        actions = [agent.act(book=book) for _ in range(warm_up + 100)]
+        self.assertEqual([None] * (warm_up - 1), actions[:warm_up - 1])
+        self.assertTrue(all(action in range(4) for action in actions[warm_up - 1:]))
+        self.assertEqual(101, agent.number_of_actions)
+        self.assertTrue(0 < agent.max_latency)
+        self.assertIn('snapshot_to_action', agent.get_latency_report())
+
+        # same action as the policy on the observation with a flat agent
+        expected = np.argmax(policy.predict(agent.pipeline.observation))
+        self.assertEqual(expected, actions[-1])
+        np.testing.assert_array_equal(
+            get_flat_agent_features(number_of_agent_features=12, number_of_actions=4),
+            agent.pipeline.observation[-1, -12:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,5 +32,22 @@ class MarketMakerTestCases(unittest.TestCase):
         self.assertEqual(True, done)
 
 
+    def test_action_table(self):
+        action_table = gym_trading.envs.MarketMaker.get_action_table(
+            order_levels=(0, 4, 9, 14))
+        self.assertEqual(17, len(action_table))
+        self.assertEqual((-1, -1, False), action_table[0])
+        self.assertEqual((0, 4, False), action_table[1])
+        self.assertEqual((4, 0, False), action_table[4])
+        self.assertEqual((14, 14, False), action_table[15])
+        self.assertEqual((-1, -1, True), action_table[16])
+
+        action_table = gym_trading.envs.MarketMaker.get_action_table(order_levels=(0, 2))
+        self.assertEqual(5, len(action_table))
+
+        with self.assertRaises(ValueError):
+            gym_trading.envs.MarketMaker.get_action_table(order_levels=(0, 15))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,137 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from gym_trading.utils.numpy_policy import NumpyPolicy, export_keras_model
+
+INPUT_SHAPE = (1, 20, 7)
+NUMBER_OF_ACTIONS = 4
+KERAS_INSTALLED = importlib.util.find_spec('keras') is not None and \
+    importlib.util.find_spec('rl') is not None
+
+# architectures of `agent.dqn.create_model()`, and the dueling model of `DQNAgent`
+MLP = [dict(layer='dense', activation='relu'), dict(layer='dense', activation='relu'),
+       dict(layer='flatten'), dict(layer='dense', activation='softmax')]
+CNN = [dict(layer='conv2d', strides=[5, 1], padding='same', activation='relu'),
+       dict(layer='conv2d', strides=[2, 1], padding='same', activation='relu'),
+       dict(layer='conv2d', strides=[2, 1], padding='same', activation='relu'),
+       dict(layer='flatten'), dict(layer='dense', activation='relu'),
+       dict(layer='dense', activation='softmax')]
+DUELING_CNN = CNN[:-1] + [dict(layer='dense', activation='linear'),
+                          dict(layer='dueling')]
+
+
+def _get_weights(architecture: list, random_state: np.random.RandomState) -> list:
+    """
+    Create random weights for the layers of the test architectures.
+    """
+    shapes = {id(MLP): [(7, 8), (8, 8), (20 * 8, NUMBER_OF_ACTIONS)],
+              id(CNN): [(10, 1, 1, 5), (5, 1, 5, 5), (4, 1, 5, 5), (5 * 1 * 7, 8),
+                        (8, NUMBER_OF_ACTIONS)],
+              id(DUELING_CNN): [(10, 1, 1, 5), (5, 1, 5, 5), (4, 1, 5, 5),
+                                (5 * 1 * 7, 8), (8, NUMBER_OF_ACTIONS + 1)]}
+    weights = list()
+    for shape in shapes[id(architecture)]:
+        weights.append(random_state.normal(size=shape).astype(np.float32))
+        weights.append(random_state.normal(size=shape[-1]).astype(np.float32))
+    return weights
+
+
+def _reference_forward(architecture: list, weights: list,
+                       states: np.ndarray) -> np.ndarray:
+    """
+    Straightforward forward pass, following the definitions of the Keras layers.
+    """
+    x = states.astype(np.float64)
+    weights = iter(weights)
+    for layer in architecture:
+        if layer['layer'] == 'conv2d':
+            kernel, bias = next(weights), next(weights)
+            kernel_height, stride = kernel.shape[0], layer['strides'][0]
+            out_height = -(-x.shape[2] // stride)
+            pad = max((out_height - 1) * stride + kernel_height - x.shape[2], 0)
+            padded = np.pad(x, ((0, 0), (0, 0), (pad // 2, pad - pad // 2), (0, 0)))
+            out = np.zeros((x.shape[0], kernel.shape[3], out_height, x.shape[3]))
+            for row in range(out_height):
+                window = padded[:, :, row * stride:row * stride + kernel_height]
+                for f in range(kernel.shape[3]):
+                    out[:, f, row] = bias[f] + np.einsum('nchw,hc->nw', window,
+                                                         kernel[:, 0, :, f])
+            x = out
+        elif layer['layer'] == 'dense':
+            x = np.tensordot(x, next(weights), axes=1) + next(weights)
+        elif layer['layer'] == 'flatten':
+            x = x.reshape(x.shape[0], -1)
+        elif layer['layer'] == 'dueling':
+            x = x[:, :1] + x[:, 1:] - x[:, 1:].mean(axis=1, keepdims=True)
+
+        activation = layer.get('activation', 'linear')
+        if activation == 'relu':
+            x = np.maximum(x, 0.)
+        elif activation == 'softmax':
+            x = np.exp(x - x.max(axis=-1, keepdims=True))
+            x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+class NumpyPolicyTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.random_state = np.random.RandomState(1)
+        self.states = self.random_state.normal(size=(9, *INPUT_SHAPE)).astype(
+            np.float32)
+
+    def test_forward_pass(self):
+        for architecture in [MLP, CNN, DUELING_CNN]:
+            weights = _get_weights(architecture=architecture,
+                                   random_state=self.random_state)
+            policy = NumpyPolicy(architecture=architecture, weights=weights,
+                                 input_shape=INPUT_SHAPE)
+            expected = _reference_forward(architecture=architecture, weights=weights,
+                                          states=self.states)
+            self.assertEqual((NUMBER_OF_ACTIONS,), policy.output_shape)
+
+            # batched and single-step predictions, with or without the frame stack
+            np.testing.assert_allclose(expected, policy.predict_on_batch(self.states),
+                                       rtol=1e-4, atol=1e-5)
+            for i in range(2):
+                np.testing.assert_allclose(expected[i],
+                                           policy.predict(self.states[i, 0]),
+                                           rtol=1e-4, atol=1e-5)
+
+    def test_save_and_load(self):
+        path = tempfile.mkdtemp()
+        try:
+            weights = _get_weights(architecture=CNN, random_state=self.random_state)
+            policy = NumpyPolicy(architecture=CNN, weights=weights,
+                                 input_shape=INPUT_SHAPE)
+            filename = os.path.join(path, 'policy.npz')
+            policy.save(filename=filename)
+            loaded_policy = NumpyPolicy.load(filename=filename)
+            self.assertEqual(CNN, loaded_policy.architecture)
+            np.testing.assert_array_equal(policy.predict_on_batch(self.states),
+                                          loaded_policy.predict_on_batch(self.states))
+        finally:
+            shutil.rmtree(path)
+
+    @unittest.skipUnless(KERAS_INSTALLED, 'keras and keras-rl are not installed')
+    def test_keras_parity(self):
+        from agent.dqn import create_dqn_model, create_model
+        for name in ['mlp', 'cnn']:
+            models = [create_model(name=name, features_shape=INPUT_SHAPE,
+                                   number_of_actions=NUMBER_OF_ACTIONS),
+                      create_dqn_model(name=name, features_shape=INPUT_SHAPE,
+                                       number_of_actions=NUMBER_OF_ACTIONS)]
+            for model in models:
+                policy = export_keras_model(model=model)
+                np.testing.assert_allclose(model.predict_on_batch(self.states),
+                                           policy.predict_on_batch(self.states),
+                                           rtol=1e-4, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+from gym_trading.utils.plot_history import HistoryBuffer, Visualize
+
+
+class HistoryBufferTestCases(unittest.TestCase):
+
+    def test_full(self):
+        buffer = HistoryBuffer(mode='full', length=4)
+        for i in range(10):
+            buffer.append(np.full(3, i))
+        self.assertEqual(10, len(buffer))
+        np.testing.assert_array_equal(np.arange(10), buffer.to_array()[:, 0])
+
+    def test_ring(self):
+        buffer = HistoryBuffer(mode='ring', length=4)
+        for i in range(3):
+            buffer.append((i, -i))
+        np.testing.assert_array_equal([0, 1, 2], buffer.to_array()[:, 0])
+        for i in range(3, 10):
+            buffer.append((i, -i))
+        self.assertEqual(4, len(buffer))
+        np.testing.assert_array_equal([6, 7, 8, 9], buffer.to_array()[:, 0])
+
+    def test_sampled(self):
+        buffer = HistoryBuffer(mode='sampled', length=2, interval=3)
+        for i in range(10):
+            buffer.append((i,))
+        np.testing.assert_array_equal([0, 3, 6, 9], buffer.to_array()[:, 0])
+
+        buffer.clear()
+        self.assertEqual(0, len(buffer))
+        buffer.append((10,))
+        np.testing.assert_array_equal([10], buffer.to_array()[:, 0])
+
+    def test_off(self):
+        viz = Visualize(columns=['midpoint', 'buys'], recording_mode='off')
+        for i in range(10):
+            viz.add(float(i), 0)
+            viz.add_observation(np.ones(5))
+        self.assertEqual(0, viz.to_df().shape[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from gym_trading.utils.profiler import Profiler
+
+
+class ProfilerTestCases(unittest.TestCase):
+
+    def test_wrapped_phases(self):
+        profiler = Profiler()
+        step = profiler.wrap('step', lambda x: x + 1)
+        observation = profiler.wrap('observation', lambda: None)
+        reward = profiler.wrap('observation', lambda: None)
+
+        for i in range(10):
+            self.assertEqual(i + 1, step(i))
+            observation()
+            reward()
+
+        summary = profiler.get_summary(total_phase='step')
+        self.assertEqual(10, summary['step']['calls'])
+        self.assertEqual(20, summary['observation']['calls'])
+        self.assertEqual(1., summary['step']['share'])
+        self.assertEqual(30, profiler.total_calls)
+
+        profiler.reset()
+        summary = profiler.get_summary(total_phase='step')
+        self.assertEqual(0, summary['step']['calls'])
+        self.assertEqual(0., summary['observation']['share'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.replay_memory import ReplayMemory
+
+WINDOW_SIZE = 10
+
+
+class ReplayMemoryTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.data_file = export_snapshot_day(path=self.path, number_of_snapshots=1500,
+                                             seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _run_episode(self, memory: ReplayMemory, format_3d: bool = False) -> list:
+        """
+        Add the transitions of an episode to the memory.
+
+        :return: (list) observation ID and observation of each step
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = MarketMaker(symbol='BTC-USD', fitting_file=self.data_file,
+                              testing_file=self.data_file, window_size=WINDOW_SIZE,
+                              format_3d=format_3d, training=False)
+            random_state = np.random.RandomState(1)
+            observation = env.reset()
+            state = memory.observe(env=env, observation=observation, new_episode=True)
+            observations = [(state, observation)]
+            done = False
+            while not done:
+                action = random_state.randint(env.action_space.n)
+                observation, reward, done, _ = env.step(action)
+                next_state = memory.observe(env=env, observation=observation)
+                memory.append(state=state, action=action, reward=reward,
+                              next_state=next_state, terminal=done)
+                observations.append((next_state, observation))
+                state = next_state
+            env.close()
+        return observations
+
+    def test_rebuilt_observations(self):
+        for format_3d in [False, True]:
+            memory = ReplayMemory(limit=1000, window_size=WINDOW_SIZE,
+                                  format_3d=format_3d)
+            observations = self._run_episode(memory=memory, format_3d=format_3d)
+            self.assertEqual(len(observations) - 1, len(memory))
+
+            states = np.array([state for state, _ in observations])
+            np.testing.assert_array_equal(
+                np.stack([observation for _, observation in observations]),
+                memory.get_observations(states))
+
+            state0, actions, rewards, state1, terminals = memory.sample(batch_size=16)
+            self.assertEqual(state0.shape, state1.shape)
+            self.assertEqual((16,) + observations[0][1].shape, state0.shape)
+
+            # only the time steps and agent features of each row are stored
+            observation_nbytes = observations[0][1].nbytes * 2 * memory.limit
+            self.assertLess(memory.nbytes * 5, observation_nbytes)
+
+    def test_sample_empty(self):
+        memory = ReplayMemory(limit=50, window_size=WINDOW_SIZE)
+        with self.assertRaisesRegex(ValueError, 'empty'):
+            memory.sample(batch_size=16)
+
+    def test_eviction(self):
+        memory = ReplayMemory(limit=50, window_size=WINDOW_SIZE)
+        observations = self._run_episode(memory=memory)
+        self.assertEqual(50, len(memory))
+
+        # the latest transitions can still be rebuilt
+        states = np.array([state for state, _ in observations[-51:]])
+        np.testing.assert_array_equal(
+            np.stack([observation for _, observation in observations[-51:]]),
+            memory.get_observations(states))
+        self.assertEqual(1, len(memory._days))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import contextlib
+import functools
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.synthetic_snapshots import export_snapshot_day
+from gym_trading.envs import MarketMaker
+from gym_trading.utils.actor_learner import ActorLearner
+from sweep import expand_grid, get_runs, run_sweep, sample_runs
+from test_actor_learner import LinearLearner, LinearPolicy
+
+
+def run_random_policy(kwargs: dict) -> dict:
+    """
+    Run target stepping an environment with random actions.
+    """
+    if kwargs['window_size'] < 0:
+        raise ValueError('window_size must be positive')
+    with contextlib.redirect_stdout(io.StringIO()):
+        env = MarketMaker(symbol='BTC-USD', fitting_file=kwargs['fitting_file'],
+                          testing_file=kwargs['testing_file'],
+                          window_size=kwargs['window_size'], seed=kwargs['seed'],
+                          training=False, day_source=kwargs.get('day_source'))
+        random_state = np.random.RandomState(kwargs['seed'])
+        env.reset()
+        start_time = perf_counter()
+        number_of_steps = 0
+        done = False
+        while not done and number_of_steps < kwargs['number_of_training_steps']:
+            _, _, done, _ = env.step(random_state.randint(env.action_space.n))
+            number_of_steps += 1
+        run_seconds = perf_counter() - start_time
+        shared_day = isinstance(env.day.normalized_data, np.memmap)
+        env.close()
+    return dict(number_of_steps=number_of_steps, run_seconds=run_seconds,
+                shared_day=shared_day, threads=os.environ.get('OMP_NUM_THREADS'),
+                output_directory=kwargs['output_directory'])
+
+
+def run_actor_learner(kwargs: dict) -> dict:
+    """
+    Run target training a linear policy with an actor-learner, as `agent.dqn.Agent`
+    does with more than one actor.
+    """
+    env_kwargs = dict(symbol='BTC-USD', fitting_file=kwargs['fitting_file'],
+                      testing_file=kwargs['testing_file'],
+                      window_size=kwargs['window_size'], training=False,
+                      day_source=kwargs.get('day_source'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        env = MarketMaker(**env_kwargs)
+        number_of_features = int(np.prod(env.observation_space.shape))
+        number_of_actions = env.action_space.n
+        env.close()
+    actor_learner = ActorLearner(
+        learner=LinearLearner(number_of_features, number_of_actions),
+        create_policy=functools.partial(LinearPolicy, number_of_features,
+                                        number_of_actions),
+        env_kwargs=env_kwargs, window_size=kwargs['window_size'],
+        number_of_actors=kwargs['number_of_actors'], make_env=MarketMaker,
+        batch_size=16, number_of_warmup_steps=50, block_size=16)
+    start_time = perf_counter()
+    try:
+        actor_learner.train(number_of_steps=kwargs['number_of_training_steps'])
+    finally:
+        actor_learner.close()
+    return dict(number_of_steps=actor_learner.number_of_steps,
+                run_seconds=perf_counter() - start_time,
+                day_misses=actor_learner.day_cache.misses)
+
+
+class SweepTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.data_file = export_snapshot_day(path=self.path, number_of_snapshots=1500,
+                                             seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_search_spec(self):
+        runs = expand_grid(spec=dict(window_size=[5, 10], seed=[1, 2],
+                                     reward_type='default'))
+        self.assertEqual(4, len(runs))
+        self.assertIn(dict(window_size=10, seed=1, reward_type='default'), runs)
+
+        runs = sample_runs(spec=dict(window_size=[5, 10], seed=dict(low=1, high=3),
+                                     gamma=dict(low=0.9, high=0.99)),
+                           number_of_runs=20, seed=1)
+        self.assertEqual(20, len(runs))
+        self.assertTrue(all(run['seed'] in (1, 2, 3) for run in runs))
+        self.assertTrue(all(0.9 <= run['gamma'] <= 0.99 for run in runs))
+
+        # runs start from the arguments of experiment.py
+        runs = get_runs(spec=dict(window_size=[5, 10]))
+        self.assertEqual('trend-following-v0', runs[0]['id'])
+        self.assertEqual([5, 10], [run['window_size'] for run in runs])
+
+    def test_sweep(self):
+        base = dict(fitting_file=self.data_file, testing_file=self.data_file,
+                    number_of_training_steps=20)
+        runs = get_runs(spec=dict(window_size=[5, 10, -1], seed=1), base=base)
+        table = run_sweep(runs=runs, target=run_random_policy, max_workers=2,
+                          threads_per_run=1, path=self.path)
+
+        self.assertEqual([0, 1, 2], table['run'].tolist())
+        self.assertEqual(['ok', 'ok', 'error'], table['status'].tolist())
+        self.assertEqual([5, 10, -1], table['window_size'].tolist())
+        self.assertNotIn('seed', table.columns)
+        # runs use the days prepared for the sweep, with limited threads
+        self.assertEqual([True, True], table['shared_day'][:2].tolist())
+        self.assertEqual(['1', '1'], table['threads'][:2].tolist())
+        self.assertEqual([20, 20], table['number_of_steps'][:2].tolist())
+        self.assertTrue(np.allclose(table['number_of_steps'][:2] /
+                                    table['run_seconds'][:2],
+                                    table['steps_per_second'][:2]))
+        # each run has its own output directory
+        name = [f for f in os.listdir(self.path)
+                if f.startswith('sweep_') and f.endswith('.csv')]
+        self.assertEqual(1, len(name))
+        name = name[0][:-len('.csv')]
+        self.assertEqual([os.path.join(self.path, name, 'run_{}'.format(i))
+                          for i in range(2)],
+                         table['output_directory'][:2].tolist())
+        # the shared days are deleted after the sweep
+        self.assertFalse(os.path.exists(os.path.join(self.path, name + '_days')))
+
+    def test_sweep_actor_learner(self):
+        base = dict(fitting_file=self.data_file, testing_file=self.data_file,
+                    window_size=5, number_of_training_steps=200)
+        runs = get_runs(spec=dict(number_of_actors=2, seed=[1, 2]), base=base)
+        table = run_sweep(runs=runs, target=run_actor_learner, max_workers=1,
+                          path=self.path)
+
+        # actors rebuild the run's day source from the days shared by the sweep
+        self.assertEqual(['ok', 'ok'], table['status'].tolist())
+        self.assertTrue((table['number_of_steps'] >= 200).all())
+        self.assertEqual([0, 0], table['day_misses'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,16 @@
+from gym_trading.utils.actor_learner import ActorLearner, SharedWeights
 from gym_trading.utils.broker import Broker
 from gym_trading.utils.data_pipeline import DataPipeline
+from gym_trading.utils.day_source import (
+    DAY_CACHE, Day, DayCache, DaySource, get_archive_days, load_day,
+)
+from gym_trading.utils.live_pipeline import (
+    LiveAgent, LivePipeline, get_flat_agent_features,
+)
+from gym_trading.utils.numpy_policy import NumpyPolicy, export_keras_model
 from gym_trading.utils.order import LimitOrder, MarketOrder
 from gym_trading.utils.plot_history import Visualize
+from gym_trading.utils.replay_memory import ReplayMemory
 from gym_trading.utils.reward import (
     asymmetrical, default, default_with_fills,
     differential_sharpe_ratio, realized_pnl, trade_completion,
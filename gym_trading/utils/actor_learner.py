@@ -0,0 +1,520 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from queue import Empty, Full
+from time import perf_counter
+
+import gym
+import numpy as np
+
+from configurations import EMA_ALPHA, LOGGER
+from gym_trading.utils.day_source import DayCache, DaySource, load_day
+from gym_trading.utils.replay_memory import ReplayMemory
+
+# transitions sent by actors, referencing the observations by row ID
+TRANSITION_DTYPE = np.dtype([('state', np.int64), ('action', np.int64),
+                             ('reward', np.float32), ('next_state', np.int64),
+                             ('terminal', np.bool_)])
+# episodes completed by actors, which the learner logs
+EPISODE_DTYPE = np.dtype([('episode_reward', np.float64), ('nb_episode_steps', np.int64),
+                          ('duration', np.float64)])
+
+
+class SharedWeights(object):
+
+    def __init__(self, weights: list, context=multiprocessing):
+        """
+        Policy weights shared by the learner with the actors, through a flat float32
+        array in shared memory.
+
+        :param weights: (list of np.array) initial weights, which define the shapes
+        :param context: multiprocessing context used to allocate the shared memory
+        """
+        self.shapes = [w.shape for w in weights]
+        self._splits = np.cumsum([int(np.prod(shape)) for shape in self.shapes])[:-1]
+        self._array = context.RawArray('f', int(sum(w.size for w in weights)))
+        self._version = context.Value('l', 0)
+        self.set(weights=weights)
+
+    @property
+    def version(self) -> int:
+        return self._version.value
+
+    def set(self, weights: list) -> None:
+        """
+        Publish new weights.
+
+        :param weights: (list of np.array) policy weights
+        :return: (void)
+        """
+        flat_weights = np.concatenate([np.ravel(w) for w in weights])
+        with self._version.get_lock():
+            np.frombuffer(self._array, dtype=np.float32)[:] = flat_weights
+            self._version.value += 1
+
+    def get(self) -> (int, list):
+        """
+        Copy the latest weights.
+
+        :return: (int) version of the weights, and (list of np.array) weights
+        """
+        with self._version.get_lock():
+            flat_weights = np.frombuffer(self._array, dtype=np.float32).copy()
+            version = self._version.value
+        return version, [w.reshape(shape) for w, shape in
+                         zip(np.split(flat_weights, self._splits), self.shapes)]
+
+
+class TransitionBlock(object):
+
+    def __init__(self, actor_id: int, day):
+        """
+        Transitions collected by an actor on one trading day, which are sent to the
+        learner together.
+
+        :param actor_id: actor which collected the transitions
+        :param day: (Day) trading day of the transitions
+        """
+        self.actor_id = actor_id
+        self.day = TransitionBlock.get_day(day=day)
+        self.steps = list()
+        self.features = list()
+        self.transitions = list()
+        self.episodes = list()
+
+    def __len__(self):
+        return len(self.transitions)
+
+    @staticmethod
+    def get_day(day) -> tuple:
+        """
+        Get the arguments to prepare a trading day again (see `load_day()`).
+
+        :param day: (Day) trading day
+        :return: (tuple) fitting file, testing file, and EMA alpha
+        """
+        return day.fitting_file, day.testing_file, day.ema_alpha
+
+    def add_rows(self, steps: np.ndarray, features: np.ndarray) -> None:
+        self.steps.append(steps)
+        self.features.append(features)
+
+    def to_message(self, weights_version: int) -> tuple:
+        """
+        Pack the block into arrays.
+
+        :param weights_version: version of the weights used by the actor's policy
+        :return: (tuple) message for the learner
+        """
+        return (self.actor_id, self.day, weights_version,
+                np.concatenate(self.steps),
+                np.concatenate(self.features).astype(np.float32),
+                np.array(self.transitions, dtype=TRANSITION_DTYPE),
+                np.array(self.episodes, dtype=EPISODE_DTYPE))
+
+
+def run_actor(actor_id: int, make_env, env_kwargs: dict, days: list or None,
+              ema_alpha: list or float or None, memmap_path: str, create_policy,
+              weights: SharedWeights, queue, stop_event, epsilon: float, seed: int,
+              sync_interval: int, block_size: int) -> None:
+    """
+    Actor process: step an environment with an epsilon-greedy policy, and send the
+    transitions to the learner.
+
+    Observations are sent as their new rows (see `ReplayMemory.get_rows()`), and
+    transitions reference them by row ID, counting the rows sent by the actor. The
+    actor saves its days to a memory-mapped cache before sending their transitions,
+    so the learner maps the prepared days instead of preparing them again.
+
+    :param actor_id: actor number
+    :param make_env: callable creating the environment from `env_kwargs`
+    :param env_kwargs: environment arguments
+    :param days: if provided, the actor samples episodes from these days
+    :param ema_alpha: decay factor for EMA used to prepare `days`
+    :param memmap_path: directory of the day cache shared with the learner
+    :param create_policy: callable creating the policy, which implements
+        `predict_on_batch()` and `set_weights()`
+    :param weights: weights published by the learner
+    :param queue: queue of transition blocks to the learner
+    :param stop_event: event set by the learner to stop the actor
+    :param epsilon: probability of taking a random action
+    :param seed: random seed number
+    :param sync_interval: number of steps between checks for new weights
+    :param block_size: number of transitions sent to the learner at once
+    :return: (void)
+    """
+    # actors share the cores, so inference libraries use one thread each
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ.setdefault(variable, '1')
+
+    random_state = np.random.RandomState(seed=seed)
+    env_kwargs = dict(env_kwargs, seed=seed)
+    day_cache = DayCache(memmap_path=memmap_path)
+    if days is not None:
+        env_kwargs['day_source'] = DaySource(days=days, ema_alpha=ema_alpha,
+                                             sample=True, seed=seed, cache=day_cache)
+    env = make_env(**env_kwargs)
+    policy = create_policy()
+    number_of_actions = env.action_space.n
+    weights_version = 0
+    row_count = 0
+    block = None
+
+    def send(message: tuple) -> None:
+        while not stop_event.is_set():
+            try:
+                queue.put(message, timeout=1.)
+                return
+            except Full:
+                continue
+
+    def add_rows(last_step: int or None) -> int:
+        nonlocal row_count
+        steps, features = ReplayMemory.get_rows(env=env, observation=observation,
+                                                last_step=last_step)
+        block.add_rows(steps=steps, features=features)
+        row_count += steps.shape[0]
+        return row_count - 1
+
+    number_of_steps = 0
+    while not stop_event.is_set():
+        observation = env.reset()
+        if block is None or block.day != TransitionBlock.get_day(day=env.day):
+            if block is not None and len(block.steps) > 0:
+                send(block.to_message(weights_version=weights_version))
+            day_cache.put(key=env.day.key, day=env.day)
+            block = TransitionBlock(actor_id=actor_id, day=env.day)
+        state = add_rows(last_step=None)
+        episode_reward, episode_steps, episode_start_time = 0., 0, perf_counter()
+
+        done = False
+        while not done and not stop_event.is_set():
+            if number_of_steps % sync_interval == 0 and \
+                    weights.version != weights_version:
+                weights_version, policy_weights = weights.get()
+                policy.set_weights(policy_weights)
+
+            if random_state.rand() < epsilon:
+                action = random_state.randint(number_of_actions)
+            else:
+                # policies take a frame stack axis, as in Keras-RL
+                q_values = policy.predict_on_batch(observation[np.newaxis, np.newaxis])
+                action = int(np.argmax(q_values[0]))
+
+            last_step = env.local_step_number - 1
+            observation, reward, done, _ = env.step(action)
+            next_state = add_rows(last_step=last_step)
+            block.transitions.append((state, action, reward, next_state, done))
+            state = next_state
+            number_of_steps += 1
+            episode_reward += reward
+            episode_steps += 1
+            if done:
+                block.episodes.append((episode_reward, episode_steps,
+                                       perf_counter() - episode_start_time))
+
+            if len(block) >= block_size:
+                send(block.to_message(weights_version=weights_version))
+                block = TransitionBlock(actor_id=actor_id, day=env.day)
+
+    env.close()
+
+
+class ActorLearner(object):
+
+    def __init__(self, learner, create_policy, env_kwargs: dict,
+                 window_size: int, action_repeats: int = 5, format_3d: bool = False,
+                 number_of_actors: int = 2, make_env=gym.make,
+                 days: list or None = None, memmap_path: str or None = None,
+                 memory_limit: int = 1000000,
+                 batch_size: int = 32, number_of_warmup_steps: int = 500,
+                 epsilon: float = 0.4, epsilon_alpha: float = 7.,
+                 sync_interval: int = 400, weights_interval: int = 100,
+                 block_size: int = 64, seed: int = 1, start_method: str = 'spawn'):
+        """
+        Distributed actor-learner training: actor processes step their own
+        environment with a periodically synced copy of the policy, and send their
+        transitions to the learner, which trains the policy from a replay memory.
+
+        Environment stepping and gradient updates run in parallel, so the number of
+        transitions collected scales with the number of actor cores. Actor `i`
+        explores with `epsilon ** (1 + epsilon_alpha * i / (number_of_actors - 1))`,
+        as in Ape-X (Horgan et al., 2018).
+
+        :param learner: trains the policy; implements `update(state0, actions,
+            rewards, state1, terminals)`, `get_weights()`, and `save_weights(filename)`
+            if checkpoints are saved (see `train()`)
+        :param create_policy: picklable callable creating an actor's copy of the
+            policy, which implements `predict_on_batch()` and `set_weights()`
+        :param env_kwargs: environment arguments (e.g., for `gym.make()`); a
+            'day_source' is not sent to the actors, which rebuild it from its days
+            and the directory of its memory-mapped cache
+        :param window_size: number of lags in the observation space
+        :param action_repeats: number of steps taken in the environment per action
+        :param format_3d: if TRUE, observations are tensors
+        :param number_of_actors: number of actor processes
+        :param make_env: picklable callable creating an environment from `env_kwargs`
+        :param days: if provided, actors sample episodes from these days (see
+            `DaySource`)
+        :param memmap_path: directory of the day cache shared by the actors and the
+            learner; defaults to a temporary directory, which is deleted by
+            `close()`
+        :param memory_limit: maximum number of transitions in the replay memories
+        :param batch_size: number of transitions per update
+        :param number_of_warmup_steps: number of transitions to collect before the
+            first update
+        :param epsilon: base exploration rate of the actors
+        :param epsilon_alpha: exponent spreading the actors' exploration rates
+        :param sync_interval: number of actor steps between checks for new weights
+        :param weights_interval: number of updates between publishing the weights
+        :param block_size: number of transitions an actor sends at once
+        :param seed: random seed number
+        :param start_method: multiprocessing start method ('spawn' is required by
+            most deep learning frameworks)
+        """
+        self.learner = learner
+        self.create_policy = create_policy
+        self.env_kwargs = dict(env_kwargs)
+        self.number_of_actors = number_of_actors
+        self.make_env = make_env
+        self.days = days
+        self.ema_alpha = self.env_kwargs.get('ema_alpha', EMA_ALPHA)
+        # a day source holds locks and an executor, which cannot be sent to actors
+        day_source = self.env_kwargs.pop('day_source', None)
+        if day_source is not None:
+            self.days = day_source.days if days is None else days
+            self.ema_alpha = day_source.ema_alpha
+            if memmap_path is None and day_source.cache is not None:
+                memmap_path = day_source.cache.memmap_path
+        self.batch_size = batch_size
+        self.number_of_warmup_steps = number_of_warmup_steps
+        self.sync_interval = sync_interval
+        self.weights_interval = weights_interval
+        self.block_size = block_size
+        self.seed = seed
+        self.epsilons = [epsilon ** (1. + epsilon_alpha * i / max(number_of_actors - 1,
+                                                                  1))
+                         for i in range(number_of_actors)]
+
+        # each actor's rows are stored in its own memory, so that the rows of every
+        # observation are consecutive
+        self.memories = [ReplayMemory(limit=max(memory_limit // number_of_actors, 1),
+                                      window_size=window_size,
+                                      action_repeats=action_repeats,
+                                      format_3d=format_3d, seed=seed + i)
+                         for i in range(number_of_actors)]
+        self._random_state = np.random.RandomState(seed=seed)
+
+        self._context = multiprocessing.get_context(start_method)
+        self.weights = SharedWeights(weights=learner.get_weights(),
+                                     context=self._context)
+        self._queue = self._context.Queue(maxsize=4 * number_of_actors)
+        self._stop_event = self._context.Event()
+        self._processes = list()
+        # days prepared by the actors, which the learner memory-maps
+        self._delete_days = memmap_path is None
+        self.day_cache = DayCache(memmap_path=memmap_path or tempfile.mkdtemp(
+            prefix='actor_days_'))
+
+        self.number_of_steps = 0
+        self.number_of_updates = 0
+        self.actor_weights_versions = [0] * number_of_actors
+        # statistics of the episodes completed by the actors, as Keras-RL's FileLogger
+        self.episode_logs = dict(episode=list(), actor=list(), episode_reward=list(),
+                                 nb_episode_steps=list(), nb_steps=list(),
+                                 duration=list())
+        self._start_time = None
+
+    def __str__(self):
+        return 'ActorLearner: [actors={} | steps={} | updates={} | weights={}]'.format(
+            self.number_of_actors, self.number_of_steps, self.number_of_updates,
+            self.weights.version)
+
+    def __len__(self):
+        return sum(len(memory) for memory in self.memories)
+
+    def start(self) -> None:
+        """
+        Start the actor processes.
+
+        :return: (void)
+        """
+        for i in range(self.number_of_actors):
+            process = self._context.Process(
+                target=run_actor, name='actor_{}'.format(i), daemon=True,
+                kwargs=dict(actor_id=i, make_env=self.make_env,
+                            env_kwargs=self.env_kwargs, days=self.days,
+                            ema_alpha=self.ema_alpha,
+                            memmap_path=self.day_cache.memmap_path,
+                            create_policy=self.create_policy, weights=self.weights,
+                            queue=self._queue, stop_event=self._stop_event,
+                            epsilon=self.epsilons[i], seed=self.seed + i,
+                            sync_interval=self.sync_interval,
+                            block_size=self.block_size))
+            process.start()
+            self._processes.append(process)
+        self._start_time = perf_counter()
+        LOGGER.info('Started {} actors with epsilons {}'.format(
+            self.number_of_actors, ['{:.4f}'.format(e) for e in self.epsilons]))
+
+    def close(self) -> None:
+        """
+        Stop the actor processes, and delete the days they saved to a temporary
+        directory.
+
+        :return: (void)
+        """
+        self._stop_event.set()
+        # drain the queue, so that actors blocked on sending can exit
+        while any(process.is_alive() for process in self._processes):
+            try:
+                self._queue.get(timeout=0.1)
+            except Empty:
+                pass
+            for process in self._processes:
+                process.join(timeout=0.1)
+        self._processes.clear()
+        if self._delete_days:
+            # the replay memories keep their mapping of the deleted files
+            shutil.rmtree(self.day_cache.memmap_path, ignore_errors=True)
+        LOGGER.info('Stopped actors. {}'.format(self))
+
+    def _get_normalized_data(self, key: str, day: tuple) -> np.ndarray:
+        """
+        Get the normalized data of an actor's day, memory-mapping the arrays saved
+        by the actor.
+
+        :param key: key of the day in `self.day_cache`
+        :param day: (tuple) fitting file, testing file, and EMA alpha
+        :return: (np.array) normalized data
+        """
+        cached_day = self.day_cache.get(key=key)
+        if cached_day is None:
+            # the day was not saved (e.g., it is larger than the cache) or evicted
+            LOGGER.warning('Preparing {} on the learner'.format(day))
+            fitting_file, testing_file, ema_alpha = day
+            cached_day = self.day_cache.put(key=key, day=load_day(
+                fitting_file=fitting_file, testing_file=testing_file,
+                ema_alpha=ema_alpha))
+        return cached_day.normalized_data
+
+    def _add_message(self, message: tuple) -> None:
+        actor_id, day, weights_version, steps, features, transitions, episodes = \
+            message
+        memory = self.memories[actor_id]
+        key = DayCache.get_key(*day)
+        day_id = memory.add_day(key=key, normalized_data=self._get_normalized_data(
+            key=key, day=day))
+        memory.add_rows(day_id=day_id, steps=steps, features=features)
+        for state, action, reward, next_state, terminal in transitions.tolist():
+            memory.append(state=state, action=action, reward=reward,
+                          next_state=next_state, terminal=terminal)
+        self.actor_weights_versions[actor_id] = weights_version
+        self.number_of_steps += transitions.shape[0]
+        for episode_reward, nb_episode_steps, duration in episodes.tolist():
+            self.episode_logs['episode'].append(len(self.episode_logs['episode']))
+            self.episode_logs['actor'].append(actor_id)
+            self.episode_logs['episode_reward'].append(episode_reward)
+            self.episode_logs['nb_episode_steps'].append(nb_episode_steps)
+            self.episode_logs['nb_steps'].append(self.number_of_steps)
+            self.episode_logs['duration'].append(duration)
+
+    def receive(self, block: bool = False) -> int:
+        """
+        Add the transitions sent by the actors to the replay memories.
+
+        :param block: if TRUE, wait for at least one block of transitions
+        :return: (int) number of blocks received
+        """
+        number_of_blocks = 0
+        while True:
+            try:
+                message = self._queue.get(timeout=1.) if block and \
+                    number_of_blocks == 0 else self._queue.get_nowait()
+            except Empty:
+                if block and number_of_blocks == 0:
+                    for process in self._processes:
+                        if process.exitcode not in (None, 0):
+                            raise RuntimeError('{} exited with code {}'.format(
+                                process.name, process.exitcode))
+                    continue
+                return number_of_blocks
+            self._add_message(message=message)
+            number_of_blocks += 1
+
+    def sample(self) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+        """
+        Sample transitions uniformly across the actors' memories.
+
+        :return: (np.array) observations, actions, rewards, next observations, and
+            terminal flags
+        """
+        sizes = np.array([len(memory) for memory in self.memories], dtype=np.float64)
+        counts = self._random_state.multinomial(self.batch_size, sizes / sizes.sum())
+        batches = [memory.sample(batch_size=count)
+                   for memory, count in zip(self.memories, counts) if count > 0]
+        return tuple(np.concatenate(arrays) for arrays in zip(*batches))
+
+    def save_episode_logs(self, log_filename: str) -> None:
+        """
+        Save the statistics of the episodes completed by the actors to a JSON file.
+
+        :param log_filename: path of the JSON file
+        :return: (void)
+        """
+        with open(log_filename, 'w') as f:
+            json.dump(self.episode_logs, f)
+
+    def train(self, number_of_steps: int, log_interval: int = 10000,
+              checkpoint_filename: str or None = None,
+              checkpoint_interval: int = 250000, log_filename: str or None = None,
+              log_episode_interval: int = 100) -> None:
+        """
+        Train the learner until the actors collected a number of transitions.
+
+        :param number_of_steps: number of transitions to collect
+        :param log_interval: number of updates between progress logs
+        :param checkpoint_filename: if provided, the learner's weights are saved
+            to this path every `checkpoint_interval` transitions, formatted with
+            the number of transitions (e.g., 'weights_{step}.h5f')
+        :param checkpoint_interval: number of transitions between checkpoints
+        :param log_filename: if provided, the statistics of the actors' episodes
+            are saved to this JSON file every `log_episode_interval` episodes and
+            once training is over
+        :param log_episode_interval: number of episodes between saving the logs
+        :return: (void)
+        """
+        if not self._processes:
+            self.start()
+
+        next_checkpoint = (self.number_of_steps // checkpoint_interval + 1) * \
+            checkpoint_interval
+        logged_episodes = len(self.episode_logs['episode'])
+        while self.number_of_steps < number_of_steps:
+            self.receive(block=self.number_of_steps < self.number_of_warmup_steps)
+            if checkpoint_filename is not None and \
+                    self.number_of_steps >= next_checkpoint:
+                self.learner.save_weights(checkpoint_filename.format(
+                    step=self.number_of_steps))
+                next_checkpoint = (self.number_of_steps // checkpoint_interval + 1) * \
+                    checkpoint_interval
+            if log_filename is not None and \
+                    len(self.episode_logs['episode']) - logged_episodes >= \
+                    log_episode_interval:
+                self.save_episode_logs(log_filename=log_filename)
+                logged_episodes = len(self.episode_logs['episode'])
+            if self.number_of_steps < self.number_of_warmup_steps:
+                continue
+
+            self.learner.update(*self.sample())
+            self.number_of_updates += 1
+            if self.number_of_updates % self.weights_interval == 0:
+                self.weights.set(weights=self.learner.get_weights())
+            if self.number_of_updates % log_interval == 0:
+                LOGGER.info('{} | {:.1f} steps/second'.format(
+                    self, self.number_of_steps / (perf_counter() - self._start_time)))
+
+        if log_filename is not None:
+            self.save_episode_logs(log_filename=log_filename)
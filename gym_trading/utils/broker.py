@@ -13,7 +13,8 @@ class Broker(object):
 
     def __init__(self,
                  max_position: int = 1,
-                 transaction_fee: bool = False):
+                 transaction_fee: bool = False,
+                 max_orders: int = 1):
         """
         Broker class is a wrapper for the PositionI class
         and is implemented in `gym_trading.py`
@@ -22,14 +23,19 @@ class Broker(object):
             at a given time.
         :param transaction_fee: (bool) if TRUE, transaction fees are applied to
             executions, else No fees
+        :param max_orders: (int) maximum number of LIMIT orders per side resting in
+            the book at a given time.
         """
         self.transaction_fee = transaction_fee
+        self.max_orders = max_orders
         self.long_inventory = Position(side='long',
                                        max_position=max_position,
-                                       transaction_fee=self.transaction_fee)
+                                       transaction_fee=self.transaction_fee,
+                                       max_orders=max_orders)
         self.short_inventory = Position(side='short',
                                         max_position=max_position,
-                                        transaction_fee=self.transaction_fee)
+                                        transaction_fee=self.transaction_fee,
+                                        max_orders=max_orders)
 
     def __str__(self):
         return self.long_inventory.__str__() + "\n" + self.short_inventory.__str__()
@@ -60,6 +66,33 @@ class Broker(object):
             raise ValueError('Broker.add() unknown order.side = %s' % order)
         return is_added
 
+    def add_limit_order(self, ccy: str, side: str, price: float, queue_ahead: float,
+                        step: int) -> bool:
+        """
+        Place a new LIMIT order, or move an open LIMIT order in place if the order
+        ladder is full (which avoids creating a new order on every step).
+
+        :param ccy: (str) currency pair
+        :param side: (str) direction of trade e.g., 'long' or 'short'
+        :param price: (float) price of the order
+        :param queue_ahead: (float) notional value resting ahead of the order
+        :param step: (int) current time step
+        :return: (bool) TRUE if order add action successfully completed,
+            FALSE if already at position_max
+        """
+        if side == 'long':
+            inventory = self.long_inventory
+        elif side == 'short':
+            inventory = self.short_inventory
+        else:
+            raise ValueError('Broker.add_limit_order() unknown side = %s' % side)
+
+        if price not in inventory.orders and inventory.order_count < self.max_orders:
+            return inventory.add(order=LimitOrder(ccy=ccy, side=side, price=price,
+                                                  step=step, queue_ahead=queue_ahead))
+        return inventory.update_limit_order(price=price, queue_ahead=queue_ahead,
+                                            step=step)
+
     def remove(self, order: MarketOrder or LimitOrder) -> float:
         """
         Remove position from inventory and return position PnL.
@@ -177,7 +210,9 @@ class Broker(object):
         return self.net_inventory_count * MarketOrder.DEFAULT_SIZE
 
     def step_limit_order_pnl(self, bid_price: float, ask_price: float, buy_volume: float,
-                             sell_volume: float, step: int) -> (float, bool, bool):
+                             sell_volume: float, step: int,
+                             bid_levels: tuple or None = None,
+                             ask_levels: tuple or None = None) -> (float, bool, bool):
         """
         Update PnL & positions every time step in the environment.
 
@@ -186,21 +221,27 @@ class Broker(object):
         :param buy_volume: (float) current time step buy volume
         :param sell_volume: (float) current time step sell volume
         :param step: (int) current time step number
+        :param bid_levels: (tuple) current time step (prices, [market notional, cancel
+            notional, notional]) of the bid price levels; if NONE, limit orders are
+            filled with the trade volume only (see `Position._step_limit_order()`)
+        :param ask_levels: (tuple) same as `bid_levels`, for the ask price levels
         :return: (float) PnL for current time step due to limit order fill and netting
         """
         pnl = 0.
-        is_long_order_filled = self.long_inventory.step(bid_price=bid_price,
-                                                        ask_price=ask_price,
-                                                        buy_volume=buy_volume,
-                                                        sell_volume=sell_volume,
-                                                        step=step)
-        is_short_order_filled = self.short_inventory.step(bid_price=bid_price,
-                                                          ask_price=ask_price,
-                                                          buy_volume=buy_volume,
-                                                          sell_volume=sell_volume,
-                                                          step=step)
-
-        if is_long_order_filled and is_short_order_filled:
+        long_fills = self.long_inventory.step(bid_price=bid_price,
+                                              ask_price=ask_price,
+                                              buy_volume=buy_volume,
+                                              sell_volume=sell_volume,
+                                              step=step,
+                                              levels=bid_levels)
+        short_fills = self.short_inventory.step(bid_price=bid_price,
+                                                ask_price=ask_price,
+                                                buy_volume=buy_volume,
+                                                sell_volume=sell_volume,
+                                                step=step,
+                                                levels=ask_levels)
+
+        if long_fills and short_fills:
             # protection in case Long and Short orders get filled in the same time step.
             # Although this shouldn't happen, it prevents an error from occurring if it
             # does happen.
@@ -209,22 +250,23 @@ class Broker(object):
                 'bid={} | ask={} | buy_vol={} | sell_vol={} | step={}'.format(
                     bid_price, ask_price, buy_volume, sell_volume, step)
             )
-            is_short_order_filled = False
-
-        if is_long_order_filled:
-            # check if we can net the inventory
-            if self.short_inventory_count > 0:
-                # net out the inventory
-                new_position = self.long_inventory.pop_position()
-                pnl += self.short_inventory.remove(netting_order=new_position)
-
-        if is_short_order_filled:
-            # check if we can net the inventory
-            if self.long_inventory_count > 0:
-                # net out the inventory
-                new_position = self.short_inventory.pop_position()
-                pnl += self.long_inventory.remove(netting_order=new_position)
-
+            short_fills = 0
+
+        # net out the inventory for every filled order, if possible
+        for _ in range(long_fills):
+            if self.short_inventory_count == 0:
+                break
+            new_position = self.long_inventory.pop_position()
+            pnl += self.short_inventory.remove(netting_order=new_position)
+
+        for _ in range(short_fills):
+            if self.long_inventory_count == 0:
+                break
+            new_position = self.short_inventory.pop_position()
+            pnl += self.long_inventory.remove(netting_order=new_position)
+
+        is_long_order_filled = long_fills > 0
+        is_short_order_filled = short_fills > 0
         return pnl, is_long_order_filled, is_short_order_filled
 
     def get_short_order_distance_to_midpoint(self, midpoint=100.) -> float:
@@ -254,23 +296,12 @@ class Broker(object):
             2. Partial fills in the open order
             3. Open order's quantity/size
 
-        :return: (float) Scaled open order completion ratio [-1, 1]
+        :return: (tuple) Scaled open order completion ratios [-1, 1] for each of the
+            `max_orders` long orders, followed by the short orders (sorted from the
+            top of the book, and zero for empty slots)
         """
-        buy_queue = short_queue = 0.
-
-        if self.long_inventory.order:
-            queue = self.long_inventory.order.queue_ahead
-            executions = self.long_inventory.order.executed
-            trade_size = self.long_inventory.order.DEFAULT_SIZE
-            buy_queue = (executions - queue) / (queue + trade_size)
-
-        if self.short_inventory.order:
-            queue = self.short_inventory.order.queue_ahead
-            executions = self.short_inventory.order.executed
-            trade_size = self.short_inventory.order.DEFAULT_SIZE
-            short_queue = (executions - queue) / (queue + trade_size)
-
-        return buy_queue, short_queue
+        return (*self.long_inventory.get_queues_ahead_features(),
+                *self.short_inventory.get_queues_ahead_features())
 
     @property
     def average_trade_pnl(self) -> float:
@@ -1,12 +1,43 @@
+import argparse
+import hashlib
+import json
 import os
+import tempfile
 from datetime import datetime as dt
 
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
-from configurations import DATA_PATH, EMA_ALPHA, LOGGER, MAX_BOOK_ROWS, TIMEZONE
-from indicators import apply_ema_all_data, load_ema, reset_ema
+from configurations import (
+    DATA_PATH, EMA_ALPHA, LOGGER, MAX_BOOK_ROWS, REPEATS_COLUMN, TIMEZONE,
+)
+from indicators import (
+    ExponentialMovingAverage, apply_ema_all_data, apply_ema_to_array, load_ema, reset_ema,
+)
+
+# fitted scaler statistics are saved next to each day's data in a JSON sidecar
+SCALER_STATISTICS_SUFFIX = '.scaler.json'
+# increment when the features used to fit the scaler change, to invalidate sidecars
+SCALER_STATISTICS_VERSION = 1
+# order flow notional values combined into OFI = LIMIT - MARKET - CANCEL
+ORDER_FLOW_EVENT_TYPES = ('market_notional', 'limit_notional', 'cancel_notional')
+# number of snapshots transformed at a time by the NumPy pipeline
+CHUNK_SIZE = 65536
+
+
+def get_file_hash(filename: str) -> str:
+    """
+    Get the SHA-256 hash of a file's contents.
+
+    :param filename: full file path including filename
+    :return: (str) hex digest
+    """
+    file_hash = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
 
 
 class DataPipeline(object):
@@ -19,6 +50,15 @@ class DataPipeline(object):
         self.ema = load_ema(alpha=alpha)
         self._scaler = StandardScaler()
 
+    @property
+    def scaler(self) -> StandardScaler:
+        """
+        Scaler fitted to the fitting day (see `fit_scaler_from_file()`).
+
+        :return: (StandardScaler) scaler
+        """
+        return self._scaler
+
     def reset(self) -> None:
         """
         Reset data pipeline.
@@ -49,6 +89,167 @@ class DataPipeline(object):
         LOGGER.info('Imported %s from a csv in %i seconds' % (filename[-25:], elapsed))
         return data
 
+    @staticmethod
+    def pop_row_index(data: pd.DataFrame) -> np.ndarray:
+        """
+        Remove the REPEATS_COLUMN from run-length encoded LOB snapshots, and map every
+        snapshot to the row it is stored in.
+
+        :param data: LOB snapshots imported from `self.import_csv`
+        :return: (np.array) row of each snapshot (i.e., the identity if the data set
+            is not run-length encoded)
+        """
+        if REPEATS_COLUMN not in data.columns:
+            return np.arange(data.shape[0])
+        repeats = data.pop(REPEATS_COLUMN).to_numpy(dtype=np.int64)
+        return np.repeat(np.arange(data.shape[0]), repeats)
+
+    def _get_ema_state(self) -> list or None:
+        """
+        Get the values of the EMA smoother(s), which carry over to the next day.
+
+        :return: (list) EMA values for each alpha, or NONE if there is no EMA
+        """
+        if self.ema is None:
+            return None
+        emas = [self.ema] if isinstance(self.ema, ExponentialMovingAverage) else self.ema
+        return [None if e.value is None else np.asarray(e.value).tolist() for e in emas]
+
+    def _set_ema_state(self, ema_state: list or None) -> None:
+        """
+        Set the values of the EMA smoother(s).
+
+        :param ema_state: output of `self._get_ema_state()`
+        :return: (void)
+        """
+        if self.ema is None:
+            return
+        emas = [self.ema] if isinstance(self.ema, ExponentialMovingAverage) else self.ema
+        for e, value in zip(emas, ema_state):
+            e.value = None if value is None else np.asarray(value, dtype=np.float64)
+
+    def _get_fitting_data(self, filename: str) -> pd.DataFrame:
+        """
+        Import the data used to fit the scaler, with the same transformations as the
+        environment data.
+
+        :param filename: full file path including filename
+        :return: (pd.DataFrame) features to fit the scaler with
+        """
+        values, columns, row_index = self.import_arrays(filename=filename)
+        index_maps = self.get_feature_index_maps(columns=columns)
+        labels = self.get_ema_labels(index_maps['features'])
+        # the EMA casts features to float32
+        fitting_data = np.empty((row_index.shape[0], len(labels)),
+                                dtype=np.float64 if self.ema is None else np.float32)
+        self._transform_features(values=values, index_maps=index_maps,
+                                 row_index=row_index, out=fitting_data, scale=False)
+        return pd.DataFrame(fitting_data, columns=labels)
+
+    def _load_scaler_statistics(self, filename: str, file_hash: str) -> bool:
+        """
+        Restore the fitted scaler and EMA state from a day's sidecar, if it was created
+        from the same file contents with the same EMA configuration.
+
+        :param filename: full file path of the day's data
+        :param file_hash: SHA-256 hash of the day's data
+        :return: (bool) TRUE if the statistics were restored
+        """
+        sidecar = filename + SCALER_STATISTICS_SUFFIX
+        if not os.path.exists(sidecar):
+            return False
+
+        # an unreadable sidecar is a cache miss, and the scaler is fitted again
+        try:
+            with open(sidecar, 'r') as f:
+                statistics = json.load(f)
+
+            if statistics.get('version') != SCALER_STATISTICS_VERSION or \
+                    statistics.get('file_hash') != file_hash or \
+                    statistics.get('ema_alpha') != self.alpha:
+                LOGGER.info('Ignoring stale scaler statistics in {}'.format(sidecar))
+                return False
+
+            scaler = StandardScaler()
+            scaler.mean_ = np.asarray(statistics['mean'], dtype=np.float64)
+            scaler.var_ = np.asarray(statistics['var'], dtype=np.float64)
+            scaler.scale_ = np.asarray(statistics['scale'], dtype=np.float64)
+            scaler.n_samples_seen_ = statistics['n_samples']
+            scaler.n_features_in_ = len(statistics['columns'])
+            scaler.feature_names_in_ = np.asarray(statistics['columns'], dtype=object)
+            ema_state = statistics['ema_state']
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            LOGGER.warning('Ignoring unreadable scaler statistics in {}: {}'.format(
+                sidecar, error))
+            return False
+
+        self._scaler = scaler
+        self._set_ema_state(ema_state=ema_state)
+        LOGGER.info('Loaded scaler statistics from {}'.format(sidecar))
+        return True
+
+    def _save_scaler_statistics(self, filename: str, file_hash: str) -> None:
+        """
+        Save the fitted scaler and EMA state to a sidecar next to the day's data.
+
+        :param filename: full file path of the day's data
+        :param file_hash: SHA-256 hash of the day's data
+        :return: (void)
+        """
+        statistics = dict(version=SCALER_STATISTICS_VERSION,
+                          file_hash=file_hash,
+                          ema_alpha=self.alpha,
+                          columns=self._scaler.feature_names_in_.tolist(),
+                          mean=self._scaler.mean_.tolist(),
+                          var=self._scaler.var_.tolist(),
+                          scale=self._scaler.scale_.tolist(),
+                          n_samples=int(self._scaler.n_samples_seen_),
+                          ema_state=self._get_ema_state())
+        sidecar = filename + SCALER_STATISTICS_SUFFIX
+        # the sidecar is written to a temporary file first, so that other threads and
+        # processes never load a partially saved sidecar
+        temporary_file = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                    mode='w', dir=os.path.dirname(sidecar),
+                    prefix=os.path.basename(sidecar) + '.', suffix='.tmp',
+                    delete=False) as f:
+                temporary_file = f.name
+                json.dump(statistics, f)
+            os.replace(temporary_file, sidecar)
+        except OSError as error:
+            # e.g., a read-only data directory; the scaler is fitted again next time
+            LOGGER.warning('Could not save scaler statistics to {}: {}'.format(
+                sidecar, error))
+            if temporary_file is not None and os.path.exists(temporary_file):
+                os.remove(temporary_file)
+            return
+        LOGGER.info('Saved scaler statistics to {}'.format(sidecar))
+
+    def fit_scaler_from_file(self, fitting_file: str, use_cache: bool = True) -> None:
+        """
+        Fit the scaler (and EMA state) with a day's data, reusing the statistics saved
+        next to the day's data when they are valid, so the day does not need to be
+        imported.
+
+        :param fitting_file: prior trading day
+        :param use_cache: if TRUE, load and save the fitted statistics in a sidecar
+        :return: (void)
+        """
+        filename = os.path.join(DATA_PATH, fitting_file)
+        file_hash = get_file_hash(filename=filename) if use_cache else None
+        if use_cache and self._load_scaler_statistics(filename=filename,
+                                                      file_hash=file_hash):
+            return
+
+        fitting_data = self._get_fitting_data(filename=filename)
+        self.fit_scaler(fitting_data)
+        # Delete data from memory
+        del fitting_data
+
+        if use_cache:
+            self._save_scaler_statistics(filename=filename, file_hash=file_hash)
+
     def fit_scaler(self, orderbook_snapshot_history: pd.DataFrame) -> None:
         """
         Scale limit order book data for the neural network.
@@ -165,53 +366,279 @@ class DataPipeline(object):
         imbalances['notional_imbalance_mean'] = imbalances[imbalance_columns].mean(axis=1)
         return imbalances
 
+    @staticmethod
+    def import_arrays(filename: str) -> (np.ndarray, list, np.ndarray):
+        """
+        Import an historical tick file as a single matrix.
+
+        :param filename: Full file path including filename
+        :return: (np.array) LOB snapshots, (list) column labels, and (np.array) the
+            row of each snapshot (see `self.pop_row_index()`)
+        """
+        data = DataPipeline.import_csv(filename=filename)
+        row_index = DataPipeline.pop_row_index(data=data)
+        return data.to_numpy(dtype=np.float64), data.columns.tolist(), row_index
+
+    @staticmethod
+    def get_feature_index_maps(columns: list) -> dict:
+        """
+        Get the column indices used to derive the environment data from LOB snapshots,
+        so the snapshots do not need to be relabeled after every transformation.
+
+        :param columns: column labels of the LOB snapshots
+        :return: (dict) column indices of the raw data, features and OFI inputs, the
+            notional values used for imbalances, and the labels of the raw data and
+            features
+        """
+        event_columns = dict()
+        for event_type in ORDER_FLOW_EVENT_TYPES:
+            event_columns[event_type] = [i for i, col in enumerate(columns) if
+                                         event_type in col]
+        event_indices = {i for indices in event_columns.values() for i in indices}
+
+        # Derive the number of rows that have been rendered in the LOB
+        number_of_levels = len(event_columns['market_notional']) // 2
+
+        raw = [i for i, col in enumerate(columns)
+               if col not in ['market', 'limit', 'cancel']]
+        kept = [i for i in range(len(columns)) if i not in event_indices]
+        features = [columns[i] for i in kept] + \
+                   [f'ofi_bid_{i}' for i in range(number_of_levels)] + \
+                   [f'ofi_ask_{i}' for i in range(number_of_levels)]
+        return dict(
+            raw=np.asarray(raw, dtype=np.int64),
+            kept=np.asarray(kept, dtype=np.int64),
+            limit_notional=np.asarray(event_columns['limit_notional'], dtype=np.int64),
+            market_notional=np.asarray(event_columns['market_notional'],
+                                       dtype=np.int64),
+            cancel_notional=np.asarray(event_columns['cancel_notional'],
+                                       dtype=np.int64),
+            bids_notional=np.asarray([columns.index(f'bids_notional_{i}')
+                                      for i in range(MAX_BOOK_ROWS)], dtype=np.int64),
+            asks_notional=np.asarray([columns.index(f'asks_notional_{i}')
+                                      for i in range(MAX_BOOK_ROWS)], dtype=np.int64),
+            midpoint=columns.index('midpoint'),
+            feature_midpoint=features.index('midpoint'),
+            raw_labels=[columns[i] for i in raw],
+            features=features,
+        )
+
+    def get_ema_labels(self, labels: list) -> list:
+        """
+        Get the column labels of features after they are smoothed with EMA(s).
+
+        :param labels: feature labels
+        :return: (list) smoothed feature labels
+        """
+        if isinstance(self.ema, list):
+            return [f'{label}_{e.alpha}' for e in self.ema for label in labels]
+        return list(labels)
+
+    def _transform_features(self, values: np.ndarray, index_maps: dict,
+                            row_index: np.ndarray, out: np.ndarray,
+                            scale: bool) -> np.ndarray:
+        """
+        Derive OFI and the midpoint log price change of every snapshot, smooth them
+        with EMA(s), and optionally z-score and clip them, writing the results into a
+        preallocated array.
+
+        The features are derived once per stored snapshot, and expanded to one row
+        per snapshot a chunk at a time, so only the output has one row per snapshot.
+
+        :param values: (np.array) LOB snapshots from `self.import_arrays()`
+        :param index_maps: output of `self.get_feature_index_maps()`
+        :param row_index: row of each snapshot
+        :param out: (np.array) features for each snapshot
+        :param scale: if TRUE, standardize features with the fitted scaler and clip
+            outliers
+        :return: (np.array) out
+        """
+        number_of_kept = index_maps['kept'].shape[0]
+        features = np.empty((values.shape[0], len(index_maps['features'])),
+                            dtype=np.float64)
+        features[:, :number_of_kept] = values[:, index_maps['kept']]
+        # Calculate OFI = LIMIT - MARKET - CANCEL
+        features[:, number_of_kept:] = values[:, index_maps['limit_notional']] - \
+                                       values[:, index_maps['market_notional']] - \
+                                       values[:, index_maps['cancel_notional']]
+
+        # Take the log difference of midpoint prices, which are repeated by
+        # run-length encoded snapshots
+        log_midpoints = np.log(values[:, index_maps['midpoint']])[row_index]
+        midpoint_diff = np.empty_like(log_midpoints)
+        midpoint_diff[1:] = log_midpoints[1:] - log_midpoints[:-1]
+        midpoint_diff[0] = midpoint_diff[1] if midpoint_diff.shape[0] > 1 else np.nan
+
+        labels = self.get_ema_labels(index_maps['features'])
+        for start in range(0, row_index.shape[0], CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            chunk = features[row_index[start:stop]]
+            chunk[:, index_maps['feature_midpoint']] = midpoint_diff[start:stop]
+            # If applicable, smooth data set with EMA(s)
+            if self.ema is not None:
+                chunk = apply_ema_to_array(
+                    ema=self.ema, data=chunk,
+                    out=np.empty((chunk.shape[0], len(labels)), dtype=np.float32))
+            if scale:
+                # Scale data with fitting data set and remove outliers
+                chunk = np.clip(self.scale_data(pd.DataFrame(chunk, columns=labels,
+                                                             copy=False)), -10., 10.)
+            out[start:stop] = chunk
+        return out
+
+    @staticmethod
+    def _get_notional_imbalance_array(values: np.ndarray, index_maps: dict) \
+            -> np.ndarray:
+        """
+        Calculate order imbalances per price level and their mean, as
+        `self._get_notional_imbalance()` does.
+
+        :param values: (np.array) LOB snapshots from `self.import_arrays()`
+        :param index_maps: output of `self.get_feature_index_maps()`
+        :return: (np.array) order imbalances at N-levels and the mean imbalance
+        """
+        bid_notional = np.cumsum(values[:, index_maps['bids_notional']].astype(
+            np.float32), axis=1)
+        ask_notional = np.cumsum(values[:, index_maps['asks_notional']].astype(
+            np.float32), axis=1)
+
+        imbalances = np.empty((values.shape[0], MAX_BOOK_ROWS + 1), dtype=np.float32)
+        levels = imbalances[:, :MAX_BOOK_ROWS]
+        np.divide((bid_notional - ask_notional) + np.float32(1e-5),
+                  (bid_notional + ask_notional) + np.float32(1e-5), out=levels)
+        levels[np.isnan(levels)] = 0.
+
+        # Add meta data to features (mean), summing the levels in order
+        imbalance_mean = imbalances[:, MAX_BOOK_ROWS]
+        imbalance_mean[:] = levels[:, 0]
+        for i in range(1, MAX_BOOK_ROWS):
+            imbalance_mean += levels[:, i]
+        imbalance_mean /= np.float32(MAX_BOOK_ROWS)
+        return imbalances
+
+    def load_environment_arrays(self, fitting_file: str, testing_file: str,
+                                include_imbalances: bool = True,
+                                cache_scaler: bool = True) \
+            -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict):
+        """
+        Import and scale environment data set with prior day's data, in a single pass
+        over NumPy arrays (same values as `self.load_environment_data()`).
+
+        The snapshots are imported into one matrix and transformed through column
+        indices, rather than relabeled DataFrames, and the features of each snapshot
+        are written into one preallocated float32 array.
+
+        :param fitting_file: prior trading day
+        :param testing_file: current trading day
+        :param include_imbalances: if TRUE, include LOB imbalances
+        :param cache_scaler: if TRUE, reuse the scaler statistics saved next to the
+            fitting file instead of importing it (see `self.fit_scaler_from_file()`)
+        :return: (np.array) midpoint prices, raw data, scaled environment data, the
+            row of the midpoint prices and raw data for each snapshot, and (dict) the
+            column labels of the raw data ('data') and environment data
+            ('normalized_data')
+        """
+        # Fit the scaler with the prior day's data
+        self.fit_scaler_from_file(fitting_file=fitting_file, use_cache=cache_scaler)
+
+        # Import data to normalize and use in environment
+        values, columns, row_index = self.import_arrays(
+            filename=os.path.join(DATA_PATH, testing_file))
+        index_maps = self.get_feature_index_maps(columns=columns)
+
+        # Raw midpoint prices for back-testing environment and raw data, which are
+        # not repeated by run-length encoded snapshots
+        midpoint_prices = values[:, index_maps['midpoint']].copy()
+        data = values[:, index_maps['raw']].astype(np.float32)
+
+        feature_labels = self.get_ema_labels(index_maps['features'])
+        imbalance_labels = self.get_ema_labels(self.get_imbalance_labels()) \
+            if include_imbalances else []
+        number_of_features = len(feature_labels)
+        normalized_data = np.empty(
+            (row_index.shape[0], number_of_features + len(imbalance_labels)),
+            dtype=np.float32)
+
+        self._transform_features(values=values, index_maps=index_maps,
+                                 row_index=row_index,
+                                 out=normalized_data[:, :number_of_features],
+                                 scale=True)
+
+        if include_imbalances:
+            LOGGER.info('Adding order imbalances...')
+            # Note: since order imbalance data is scaled [-1, 1], we do not apply
+            # z-score to the imbalance data
+            imbalances = self._get_notional_imbalance_array(values=values,
+                                                            index_maps=index_maps)
+            out = normalized_data[:, number_of_features:]
+            if self.ema is None:
+                np.take(imbalances, row_index, axis=0, out=out)
+            else:
+                self.ema = reset_ema(self.ema)
+                for start in range(0, row_index.shape[0], CHUNK_SIZE):
+                    stop = start + CHUNK_SIZE
+                    apply_ema_to_array(ema=self.ema,
+                                       data=imbalances[row_index[start:stop]],
+                                       out=out[start:stop])
+
+        labels = dict(data=index_maps['raw_labels'],
+                      normalized_data=feature_labels + imbalance_labels)
+        return midpoint_prices, data, normalized_data, row_index, labels
+
     def load_environment_data(self, fitting_file: str, testing_file: str,
-                              include_imbalances: bool = True, as_pandas: bool = False) \
-            -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
+                              include_imbalances: bool = True, as_pandas: bool = False,
+                              cache_scaler: bool = True) \
+            -> (pd.DataFrame, pd.DataFrame, pd.DataFrame, np.ndarray):
         """
         Import and scale environment data set with prior day's data.
 
         Midpoint gets log-normalized:
             log(price t) - log(price t-1)
 
+        Run-length encoded snapshots (see `Simulator.replay_tick_history()`) are not
+        duplicated in the midpoint prices and raw data, which are looked up through the
+        returned row index instead. The normalized data has one row per snapshot, since
+        the midpoint log price change and EMA differ between repeated snapshots.
+
         :param fitting_file: prior trading day
         :param testing_file: current trading day
         :param include_imbalances: if TRUE, include LOB imbalances
-        :param as_pandas: if TRUE, return data as DataFrame, otherwise np.array
-        :return: (pd.DataFrame or np.array) scaled environment data
-        """
-        # Import data used to fit scaler
-        fitting_data_filepath = os.path.join(DATA_PATH, fitting_file)
-        fitting_data = self.import_csv(filename=fitting_data_filepath)
-
-        # Derive OFI statistics
-        fitting_data = self._decompose_order_flow_information(data=fitting_data)
-        # Take the log difference of midpoint prices
-        fitting_data = self._midpoint_diff(data=fitting_data)  # normalize midpoint
-        # If applicable, smooth data set with EMA(s)
-        fitting_data = apply_ema_all_data(ema=self.ema, data=fitting_data)
-        # Fit the scaler
-        self.fit_scaler(fitting_data)
-        # Delete data from memory
-        del fitting_data
+        :param as_pandas: if TRUE, return data as DataFrame, otherwise np.array (see
+            `self.load_environment_arrays()`)
+        :param cache_scaler: if TRUE, reuse the scaler statistics saved next to the
+            fitting file instead of importing it (see `self.fit_scaler_from_file()`)
+        :return: (pd.DataFrame or np.array) midpoint prices, raw data, and scaled
+            environment data, and (np.array) the row of the midpoint prices and raw
+            data for each snapshot
+        """
+        if as_pandas is False:
+            return self.load_environment_arrays(fitting_file=fitting_file,
+                                                testing_file=testing_file,
+                                                include_imbalances=include_imbalances,
+                                                cache_scaler=cache_scaler)[:4]
+
+        # Fit the scaler with the prior day's data
+        self.fit_scaler_from_file(fitting_file=fitting_file, use_cache=cache_scaler)
 
         # Import data to normalize and use in environment
         data_used_in_environment = os.path.join(DATA_PATH, testing_file)
         data = self.import_csv(filename=data_used_in_environment)
+        row_index = self.pop_row_index(data=data)
 
         # Raw midpoint prices for back-testing environment
         midpoint_prices = data['midpoint']
 
-        # Copy of raw LOB snapshots for normalization
-        normalized_data = self._midpoint_diff(data.copy(deep=True))
+        # Derive OFI statistics from the raw LOB snapshots for normalization, then
+        # repeat the snapshots for the transformations that depend on the previous
+        # snapshot
+        normalized_data = self._decompose_order_flow_information(data=data)
+        normalized_data = normalized_data.iloc[row_index]
+        normalized_data = self._midpoint_diff(normalized_data)
 
         # Preserve the raw data and drop unnecessary columns
         data = data.drop([col for col in data.columns.tolist()
                           if col in ['market', 'limit', 'cancel']], axis=1)
 
-        # Derive OFI statistics
-        normalized_data = self._decompose_order_flow_information(data=normalized_data)
-
         normalized_data = apply_ema_all_data(ema=self.ema, data=normalized_data)
 
         # Get column names for putting the numpy values into a data frame
@@ -223,20 +650,56 @@ class DataPipeline(object):
         # Put data in a data frame
         normalized_data = pd.DataFrame(normalized_data,
                                        columns=column_names,
-                                       index=midpoint_prices.index)
+                                       index=midpoint_prices.index[row_index])
 
         if include_imbalances:
             LOGGER.info('Adding order imbalances...')
             # Note: since order imbalance data is scaled [-1, 1], we do not apply
             # z-score to the imbalance data
-            imbalance_data = self._get_notional_imbalance(data=data)
+            imbalance_data = self._get_notional_imbalance(data=data).iloc[row_index]
             self.ema = reset_ema(self.ema)
             imbalance_data = apply_ema_all_data(ema=self.ema, data=imbalance_data)
             normalized_data = pd.concat((normalized_data, imbalance_data), axis=1)
 
-        if as_pandas is False:
-            midpoint_prices = midpoint_prices.to_numpy(dtype=np.float64)
-            data = data.to_numpy(dtype=np.float32)
-            normalized_data = normalized_data.to_numpy(dtype=np.float32)
-
-        return midpoint_prices, data, normalized_data
+        return midpoint_prices, data, normalized_data, row_index
+
+
+def precompute_scaler_statistics(path: str = DATA_PATH,
+                                 alpha: float or list or None = EMA_ALPHA) -> list:
+    """
+    Save the scaler statistics of every day in an archive, so environments do not
+    need to import their fitting day. Days with valid statistics are skipped.
+
+    :param path: directory of the exported days (e.g., 'BTC-USD_2019-01-01.csv.xz')
+    :param alpha: EMA decay factor(s) used by the environments
+    :return: (list) file names of the days
+    """
+    filenames = sorted(name for name in os.listdir(path)
+                       if name.endswith('.csv') or name.endswith('.csv.xz'))
+    for filename in filenames:
+        # an absolute path, since `fit_scaler_from_file()` joins it to DATA_PATH
+        DataPipeline(alpha=alpha).fit_scaler_from_file(
+            fitting_file=os.path.abspath(os.path.join(path, filename)), use_cache=True)
+    return filenames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Precompute the scaler statistics of every exported day.')
+    parser.add_argument('--path',
+                        default=DATA_PATH,
+                        help="Directory of the exported days",
+                        type=str)
+    parser.add_argument('--alpha',
+                        default=[EMA_ALPHA],
+                        nargs='*',
+                        help="EMA decay factor(s); no value disables the EMA",
+                        type=float)
+    args = parser.parse_args()
+
+    alpha = args.alpha[0] if len(args.alpha) == 1 else (args.alpha or None)
+    precompute_scaler_statistics(path=args.path, alpha=alpha)
+
+
+if __name__ == '__main__':
+    main()
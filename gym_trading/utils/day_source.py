@@ -0,0 +1,489 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+import numpy as np
+
+from configurations import DATA_PATH, DAY_CACHE_MAX_BYTES, EMA_ALPHA, LOGGER
+from gym_trading.utils.data_pipeline import DataPipeline
+
+# arrays of a Day, which are saved to disk by memory-mapped caches
+DAY_ARRAYS = ('midpoint_prices', 'data', 'normalized_data', 'row_index')
+
+
+class Day(object):
+
+    def __init__(self, fitting_file: str, testing_file: str,
+                 midpoint_prices: np.ndarray, data: np.ndarray,
+                 normalized_data: np.ndarray, row_index: np.ndarray, labels: dict,
+                 ema_alpha: list or float or None = EMA_ALPHA):
+        """
+        Environment data for one trading day, as returned by
+        `DataPipeline.load_environment_arrays()`.
+
+        :param fitting_file: prior trading day, used to normalize the day
+        :param testing_file: trading day
+        :param midpoint_prices: midpoint prices
+        :param data: raw LOB data
+        :param normalized_data: scaled environment data
+        :param row_index: row of the midpoint prices and raw data for each snapshot
+        :param labels: column labels of the raw data and environment data
+        :param ema_alpha: decay factor for EMA used to prepare the day
+        """
+        self.fitting_file = fitting_file
+        self.testing_file = testing_file
+        self.midpoint_prices = midpoint_prices
+        self.data = data
+        self.normalized_data = normalized_data
+        self.row_index = row_index
+        self.labels = labels
+        self.ema_alpha = ema_alpha
+
+    def __str__(self):
+        return 'Day: [testing_file={} | fitting_file={} | snapshots={}]'.format(
+            self.testing_file, self.fitting_file, self.row_index.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the day's arrays.
+
+        :return: (int) number of bytes
+        """
+        return self.midpoint_prices.nbytes + self.data.nbytes + \
+            self.normalized_data.nbytes + self.row_index.nbytes
+
+    @property
+    def key(self) -> str:
+        """
+        Key of the day in a `DayCache`, which identifies how the day was prepared.
+
+        :return: (str) key
+        """
+        return DayCache.get_key(fitting_file=self.fitting_file,
+                                testing_file=self.testing_file,
+                                ema_alpha=self.ema_alpha)
+
+
+def load_day(fitting_file: str, testing_file: str,
+             ema_alpha: list or float or None = EMA_ALPHA,
+             include_imbalances: bool = True) -> Day:
+    """
+    Import and normalize a trading day with the prior day's statistics.
+
+    :param fitting_file: prior trading day (e.g., T-1)
+    :param testing_file: trading day (e.g., T)
+    :param ema_alpha: decay factor for EMA
+    :param include_imbalances: if TRUE, include LOB imbalances
+    :return: (Day) environment data
+    """
+    arrays = DataPipeline(alpha=ema_alpha).load_environment_arrays(
+        fitting_file=fitting_file,
+        testing_file=testing_file,
+        include_imbalances=include_imbalances,
+    )
+    return Day(fitting_file, testing_file, *arrays, ema_alpha=ema_alpha)
+
+
+def get_archive_days(path: str = DATA_PATH, symbol: str or None = None,
+                     suffix: str = '') -> list:
+    """
+    Get the trading days exported to an archive (see `Simulator.extract_features()`),
+    in chronological order.
+
+    Days exported at other snapshot rates or by other samplers are excluded, so a
+    day is never paired with another export of the same day.
+
+    :param path: directory of the exported days (e.g., 'BTC-USD_2019-01-01.csv.xz')
+    :param symbol: if provided, only include the days of this instrument
+    :param suffix: label of the export series (e.g., '100ms' or '1000_messages'
+        for 'BTC-USD_2019-01-01_100ms.csv.xz'); by default, the days exported
+        without a suffix
+    :return: (list) full paths of the days
+    """
+    pattern = re.compile(r'^{}_\d{{4}}-\d{{2}}-\d{{2}}{}\.csv(\.xz)?$'.format(
+        '.+' if symbol is None else re.escape(symbol),
+        '_' + re.escape(suffix) if suffix else ''))
+    return [os.path.join(path, name) for name in sorted(os.listdir(path))
+            if pattern.match(name) is not None]
+
+
+class DayCache(object):
+
+    def __init__(self, max_bytes: int = DAY_CACHE_MAX_BYTES,
+                 memmap_path: str or None = None):
+        """
+        Least-recently-used cache of prepared trading days, bounded by the number of
+        bytes used by the days' arrays. The cache is thread-safe, so one cache can be
+        shared by every environment in a process (see `DAY_CACHE`).
+
+        :param max_bytes: memory budget; the least recently used days are evicted
+            once it is exceeded
+        :param memmap_path: if provided, the arrays of cached days are saved to this
+            directory and memory-mapped, so the operating system pages them in from
+            disk on demand (and shares them between processes); the budget then bounds
+            the disk space used by the cache. Caches of other processes using the same
+            directory load the days saved there instead of preparing them again.
+        """
+        assert max_bytes > 0, "Error: max_bytes must be positive, not {}".format(
+            max_bytes)
+        self.max_bytes = max_bytes
+        self.memmap_path = memmap_path
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._days = OrderedDict()
+        self._lock = Lock()
+
+    def __str__(self):
+        return 'DayCache: [days={} | nbytes={:,} | hits={} | misses={} | ' \
+               'evictions={}]'.format(len(self), self.nbytes, self.hits, self.misses,
+                                      self.evictions)
+
+    def __len__(self):
+        return len(self._days)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._days
+
+    @staticmethod
+    def get_key(fitting_file: str, testing_file: str,
+                ema_alpha: list or float or None = EMA_ALPHA,
+                include_imbalances: bool = True) -> str:
+        """
+        Get the key of a prepared trading day.
+
+        :param fitting_file: prior trading day
+        :param testing_file: trading day
+        :param ema_alpha: decay factor for EMA
+        :param include_imbalances: if TRUE, the day includes LOB imbalances
+        :return: (str) key
+        """
+        return json.dumps([fitting_file, testing_file, ema_alpha, include_imbalances])
+
+    def get(self, key: str) -> Day or None:
+        """
+        Get a cached trading day, and mark it as the most recently used day.
+
+        :param key: output of `self.get_key()`
+        :return: (Day) environment data, or NONE if the day is not cached
+        """
+        with self._lock:
+            day = self._days.get(key)
+            if day is None and self.memmap_path is not None:
+                day = self._load_memmap(key=key)
+                if day is not None:
+                    self._add(key=key, day=day)
+            if day is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._days.move_to_end(key)
+            return day
+
+    def put(self, key: str, day: Day) -> Day:
+        """
+        Add a trading day to the cache, evicting the least recently used days if the
+        memory budget is exceeded.
+
+        :param key: output of `self.get_key()`
+        :param day: (Day) environment data
+        :return: (Day) the cached day (memory-mapped if `memmap_path` is provided),
+            or `day` if it is larger than the memory budget
+        """
+        if day.nbytes > self.max_bytes:
+            LOGGER.warning('{} is larger than the day cache ({:,} bytes)'.format(
+                day, self.max_bytes))
+            return day
+
+        with self._lock:
+            if key in self._days:
+                self._days.move_to_end(key)
+                return self._days[key]
+
+            if self.memmap_path is not None:
+                day = self._load_memmap(key=key) or self._memmap(key=key, day=day)
+            self._add(key=key, day=day)
+            return day
+
+    def _add(self, key: str, day: Day) -> None:
+        """
+        Add a trading day, and evict the least recently used days if the memory
+        budget is exceeded. The caller holds the lock.
+
+        :param key: output of `self.get_key()`
+        :param day: (Day) environment data
+        :return: (void)
+        """
+        self._days[key] = day
+        self.nbytes += day.nbytes
+
+        while self.nbytes > self.max_bytes:
+            evicted_key, evicted_day = self._days.popitem(last=False)
+            self.nbytes -= evicted_day.nbytes
+            self.evictions += 1
+            if self.memmap_path is not None:
+                # environments using the day keep their mapping of the files
+                shutil.rmtree(self._get_memmap_directory(key=evicted_key),
+                              ignore_errors=True)
+            LOGGER.info('Evicted {} from the day cache'.format(evicted_day))
+
+    def _get_memmap_directory(self, key: str) -> str:
+        """
+        Get the directory of a memory-mapped day's arrays.
+
+        :param key: output of `self.get_key()`
+        :return: (str) directory path
+        """
+        return os.path.join(self.memmap_path,
+                            hashlib.sha256(key.encode('utf-8')).hexdigest()[:16])
+
+    def _memmap(self, key: str, day: Day) -> Day:
+        """
+        Save a day's arrays to disk and memory-map them.
+
+        :param key: output of `self.get_key()`
+        :param day: (Day) environment data
+        :return: (Day) environment data with read-only memory-mapped arrays
+        """
+        directory = self._get_memmap_directory(key=key)
+        # days are written to a temporary directory first, so that other processes
+        # never load a partially saved day
+        temporary_directory = '{}.{}.tmp'.format(directory, os.getpid())
+        os.makedirs(temporary_directory, exist_ok=True)
+        for name in DAY_ARRAYS:
+            np.save(os.path.join(temporary_directory, '{}.npy'.format(name)),
+                    getattr(day, name))
+        with open(os.path.join(temporary_directory, 'labels.json'), 'w') as f:
+            json.dump(day.labels, f)
+        try:
+            os.rename(temporary_directory, directory)
+        except OSError:
+            # another process saved the day first
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+        return self._load_memmap(key=key)
+
+    def _load_memmap(self, key: str) -> Day or None:
+        """
+        Memory-map a day saved to disk by this or another cache.
+
+        :param key: output of `self.get_key()`
+        :return: (Day) environment data with read-only memory-mapped arrays, or NONE
+            if the day is not saved
+        """
+        directory = self._get_memmap_directory(key=key)
+        if not os.path.isdir(directory):
+            return None
+        arrays = [np.load(os.path.join(directory, '{}.npy'.format(name)),
+                          mmap_mode='r') for name in DAY_ARRAYS]
+        with open(os.path.join(directory, 'labels.json'), 'r') as f:
+            labels = json.load(f)
+        fitting_file, testing_file, ema_alpha, _ = json.loads(key)
+        return Day(fitting_file, testing_file, *arrays, labels, ema_alpha=ema_alpha)
+
+    def get_statistics(self) -> dict:
+        """
+        Get the cache's hit and miss statistics.
+
+        :return: (dict) statistics
+        """
+        lookups = self.hits + self.misses
+        return dict(days=len(self), nbytes=self.nbytes, max_bytes=self.max_bytes,
+                    hits=self.hits, misses=self.misses,
+                    hit_rate=self.hits / lookups if lookups > 0 else 0.,
+                    evictions=self.evictions)
+
+    def clear(self) -> None:
+        """
+        Remove every day from the cache, and reset the statistics.
+
+        :return: (void)
+        """
+        with self._lock:
+            if self.memmap_path is not None:
+                for key in self._days:
+                    shutil.rmtree(self._get_memmap_directory(key=key),
+                                  ignore_errors=True)
+            self._days.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# cache shared by the environments of a process
+DAY_CACHE = DayCache()
+
+
+class DaySource(object):
+
+    def __init__(self,
+                 days: list,
+                 ema_alpha: list or float or None = EMA_ALPHA,
+                 sample: bool = False,
+                 seed: int = 1,
+                 episodes_per_day: int = 1,
+                 max_days_in_memory: int = 2,
+                 use_processes: bool = False,
+                 cache: DayCache or None = None,
+                 wait_for_days: bool = True):
+        """
+        Stream trading days to an environment, preparing the next day in the
+        background while the agent trains on the current day.
+
+        Every day is normalized with the statistics of the day before it in `days`, so
+        the first day is only used for fitting.
+
+        :param days: trading days in chronological order (e.g.,
+            ['BTC-USD_2019-01-01.csv.xz', 'BTC-USD_2019-01-02.csv.xz', ...])
+        :param ema_alpha: decay factor for EMA
+        :param sample: if TRUE, days are drawn at random; otherwise, days are used in
+            order and the sequence starts over after the last day
+        :param seed: random seed number used to draw days
+        :param episodes_per_day: number of episodes before the environment switches
+            to the next day
+        :param max_days_in_memory: number of days held by the source, i.e., the
+            current day and `max_days_in_memory - 1` days prepared in the background
+        :param use_processes: if TRUE, prepare days in a separate process (avoids
+            competing with the agent for the GIL, but the arrays are copied back);
+            otherwise, prepare days on a background thread
+        :param cache: (DayCache) cache of prepared days (e.g., `DAY_CACHE`), which
+            makes switching to a previously used day cheap; cached days are not
+            counted by `max_days_in_memory`
+        :param wait_for_days: if FALSE, `next_day()` does not wait for a day that is
+            still being prepared, so the environment keeps the current day until the
+            next day is ready
+        """
+        assert len(days) > 1, \
+            "Error: at least two days are required, not {}".format(len(days))
+        assert episodes_per_day > 0, \
+            "Error: episodes_per_day must be positive, not {}".format(episodes_per_day)
+        assert max_days_in_memory > 1, \
+            "Error: max_days_in_memory must be greater than one, not {}".format(
+                max_days_in_memory)
+        self.days = list(days)
+        self.ema_alpha = ema_alpha
+        self.sample = sample
+        self.episodes_per_day = episodes_per_day
+        self.max_days_in_memory = max_days_in_memory
+        self.use_processes = use_processes
+        self.cache = cache
+        self.wait_for_days = wait_for_days
+        self.current_day = None
+        self.wait_seconds = 0.  # time spent waiting for days that were not ready
+        self._random_state = np.random.RandomState(seed=seed)
+        self._position = 0
+        self._executor = None
+        self._pending = deque()
+
+    def __str__(self):
+        return 'DaySource: [days={} | sample={} | pending={} | wait_seconds={:.2f}]' \
+            .format(len(self.days), self.sample, len(self._pending), self.wait_seconds)
+
+    def _get_next_index(self) -> int:
+        """
+        Get the position of the next trading day in `self.days`.
+
+        :return: (int) index of the trading day (never the first day)
+        """
+        if self.sample:
+            return self._random_state.randint(low=1, high=len(self.days))
+        index = 1 + self._position % (len(self.days) - 1)
+        self._position += 1
+        return index
+
+    def _get_executor(self) -> Executor:
+        """
+        Get the executor used to prepare days in the background.
+
+        :return: (Executor) single worker thread or process
+        """
+        if self._executor is None:
+            executor = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = executor(max_workers=1)
+        return self._executor
+
+    def _submit(self) -> (str, Future):
+        """
+        Start preparing the next trading day in the background, unless it is cached.
+
+        :return: (str) cache key, and (Future) day being prepared
+        """
+        index = self._get_next_index()
+        fitting_file, testing_file = self.days[index - 1], self.days[index]
+        key = DayCache.get_key(fitting_file=fitting_file, testing_file=testing_file,
+                               ema_alpha=self.ema_alpha)
+
+        day = self.cache.get(key=key) if self.cache is not None else None
+        if day is not None:
+            future = Future()
+            future.set_result(day)
+            return key, future
+
+        LOGGER.info('Preparing {} in the background'.format(testing_file))
+        return key, self._get_executor().submit(load_day,
+                                                fitting_file=fitting_file,
+                                                testing_file=testing_file,
+                                                ema_alpha=self.ema_alpha)
+
+    def _prefetch(self) -> None:
+        """
+        Start preparing days until `max_days_in_memory` days are held.
+
+        :return: (void)
+        """
+        while len(self._pending) + (self.current_day is not None) < \
+                self.max_days_in_memory:
+            self._pending.append(self._submit())
+
+    def next_day(self, wait: bool or None = None) -> Day or None:
+        """
+        Get the next trading day, and start preparing the days after it.
+
+        :param wait: if TRUE, wait for the next day if it is still being prepared; if
+            NONE, `self.wait_for_days` is used
+        :return: (Day) environment data, or NONE if the next day is not ready yet
+            and `wait` is FALSE
+        """
+        wait = self.wait_for_days if wait is None else wait
+        if len(self._pending) == 0:
+            self._pending.append(self._submit())
+
+        key, future = self._pending[0]
+        if not wait and not future.done():
+            LOGGER.info('The next day is not ready yet, keeping {}'.format(
+                self.current_day))
+            return None
+
+        # release the current day before more days are prepared
+        self._pending.popleft()
+        self.current_day = None
+        start_time = perf_counter()
+        day = future.result()
+        self.wait_seconds += perf_counter() - start_time
+        if self.cache is not None:
+            day = self.cache.put(key=key, day=day)
+        self.current_day = day
+
+        self._prefetch()
+        LOGGER.info('Switched to {}'.format(self.current_day))
+        return self.current_day
+
+    def close(self) -> None:
+        """
+        Stop preparing days and release them.
+
+        :return: (void)
+        """
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self.current_day = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
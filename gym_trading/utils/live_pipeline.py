@@ -0,0 +1,370 @@
+from time import perf_counter_ns
+
+import numpy as np
+
+from configurations import (
+    EMA_ALPHA, INDICATOR_WINDOW, INDICATOR_WINDOW_MAX, LATENCY_BUDGET_IN_MICROSECONDS,
+    LOGGER, MAX_BOOK_ROWS,
+)
+from gym_trading.utils.data_pipeline import DataPipeline
+from gym_trading.utils.numpy_policy import NumpyPolicy
+from gym_trading.utils.profiler import Profiler
+from indicators import IndicatorManager, RSI, TnS, load_ema
+
+
+def get_flat_agent_features(number_of_agent_features: int,
+                            number_of_actions: int) -> np.ndarray:
+    """
+    Get the agent features of an environment's observation rows when the agent has
+    no positions or open orders, and takes no action (i.e., position features of
+    zero, action #0, and no reward).
+
+    :param number_of_agent_features: number of features after the market features
+    :param number_of_actions: number of actions in the environment's action space
+    :return: (np.array) agent features
+    """
+    agent_features = np.zeros(number_of_agent_features, dtype=np.float32)
+    # the one-hot action is followed by the step reward
+    agent_features[number_of_agent_features - number_of_actions - 1] = 1.
+    return agent_features
+
+
+class LivePipeline(object):
+
+    def __init__(self, fitting_file: str, feature_names: list, window_size: int = 100,
+                 ema_alpha: list or float or None = EMA_ALPHA, format_3d: bool = False,
+                 agent_features: np.ndarray or None = None):
+        """
+        Incremental version of the environments' observation pipeline, which turns
+        LOB snapshots rendered by `OrderBook.render_book()` into the same observation
+        that an environment derives from the exported snapshots.
+
+        Every snapshot is transformed once, in O(number of features) time: OFI
+        decomposition, midpoint log price change, EMA smoothing (continued from the
+        fitting day, as in `DataPipeline.load_environment_arrays()`), z-score with the
+        fitting day's scaler statistics, notional imbalances, and the TnS and RSI
+        indicators. Rows are written twice into a ring buffer of twice the window
+        size, so the observation window is a view and is not copied.
+
+        :param fitting_file: prior trading day, whose scaler statistics are loaded
+            from its sidecar (or fitted and saved, see
+            `DataPipeline.fit_scaler_from_file()`)
+        :param feature_names: names of the snapshot's values (e.g.,
+            `OrderBook.render_lob_feature_names()`)
+        :param window_size: number of lags in the observation
+        :param ema_alpha: decay factor(s) for EMA; must match the environment's
+        :param format_3d: if TRUE, observations are tensors
+        :param agent_features: (np.array) features of the agent's state appended to
+            each row (positions, action, and reward), as the environment appends them;
+            can be updated with `set_agent_features()`
+        """
+        self.window_size = window_size
+        self.format_3d = format_3d
+
+        data_pipeline = DataPipeline(alpha=ema_alpha)
+        data_pipeline.fit_scaler_from_file(fitting_file=fitting_file)
+        self._index_maps = DataPipeline.get_feature_index_maps(columns=feature_names)
+        feature_labels = data_pipeline.get_ema_labels(self._index_maps['features'])
+        assert data_pipeline.scaler.feature_names_in_.tolist() == feature_labels, \
+            "Error: {} was exported with different features".format(fitting_file)
+        self._mean = data_pipeline.scaler.mean_
+        self._scale = data_pipeline.scaler.scale_
+
+        # the features' EMA continues from the fitting day, whereas the imbalances'
+        # EMA starts from scratch
+        self._feature_ema = data_pipeline.ema
+        self._imbalance_ema = load_ema(alpha=ema_alpha)
+        self._number_of_kept = self._index_maps['kept'].shape[0]
+        self._number_of_features = len(self._index_maps['features'])
+        self._buys_index = feature_names.index('buys')
+        self._sells_index = feature_names.index('sells')
+
+        self.tns = IndicatorManager()
+        self.rsi = IndicatorManager()
+        for window in INDICATOR_WINDOW:
+            self.tns.add(('tns_{}'.format(window), TnS(window=window, alpha=ema_alpha)))
+            self.rsi.add(('rsi_{}'.format(window), RSI(window=window, alpha=ema_alpha)))
+
+        self.labels = feature_labels + data_pipeline.get_ema_labels(
+            DataPipeline.get_imbalance_labels())
+        self._number_of_normalized_features = len(self.labels)
+        self.labels += self.tns.get_labels() + self.rsi.get_labels()
+        self.number_of_market_features = len(self.labels)
+
+        # the first snapshot waits for the second, since its midpoint log price change
+        # is back-filled (as `DataPipeline` does)
+        self._first_snapshot = None
+        self._last_log_midpoint = None
+        self.count = 0  # number of rows added
+
+        self._agent_features = self._buffer = None
+        self.set_agent_features(agent_features=agent_features)
+
+    def __str__(self):
+        return 'LivePipeline: [window_size={} | features={} | rows={}]'.format(
+            self.window_size, self.number_of_features, self.count)
+
+    @property
+    def number_of_features(self) -> int:
+        return self.number_of_market_features + self._agent_features.shape[0]
+
+    @property
+    def ready(self) -> bool:
+        """
+        TRUE once the pipeline has added as many rows as an environment does when it
+        resets, so that the indicators have warmed up.
+        """
+        return self.count >= self.window_size + INDICATOR_WINDOW_MAX + 1
+
+    def set_agent_features(self, agent_features: np.ndarray or None) -> None:
+        """
+        Set the agent features appended to the following rows.
+
+        :param agent_features: (np.array) features of the agent's state, or NONE for
+            no agent features
+        :return: (void)
+        """
+        if agent_features is None:
+            agent_features = np.zeros(0, dtype=np.float32)
+        agent_features = np.asarray(agent_features, dtype=np.float32).ravel()
+        if self._agent_features is not None and \
+                agent_features.shape == self._agent_features.shape:
+            self._agent_features = agent_features
+            return
+
+        # the number of agent features can only change before the first row
+        assert self.count == 0, "Error: expected {} agent features, not {}".format(
+            self._agent_features.shape[0], agent_features.shape[0])
+        self._agent_features = agent_features
+        self._buffer = np.zeros((2 * self.window_size, self.number_of_features),
+                                dtype=np.float32)
+
+    def reset(self) -> None:
+        """
+        Clear the observation window and indicators; the EMA and scaler statistics
+        carry on.
+
+        :return: (void)
+        """
+        self.tns.reset()
+        self.rsi.reset()
+        self._buffer[:] = 0.
+        self._first_snapshot = None
+        self._last_log_midpoint = None
+        self.count = 0
+
+    def step(self, snapshot: np.ndarray) -> bool:
+        """
+        Add a LOB snapshot to the observation.
+
+        :param snapshot: (np.array) output of `OrderBook.render_book()`
+        :return: (bool) TRUE if the observation is ready
+        """
+        snapshot = np.asarray(snapshot, dtype=np.float64)
+        log_midpoint = np.log(snapshot[self._index_maps['midpoint']])
+
+        if self._last_log_midpoint is None:
+            self._first_snapshot = snapshot
+            self._last_log_midpoint = log_midpoint
+            return False
+
+        midpoint_diff = log_midpoint - self._last_log_midpoint
+        self._last_log_midpoint = log_midpoint
+        if self._first_snapshot is not None:
+            self._add_row(snapshot=self._first_snapshot, midpoint_diff=midpoint_diff)
+            self._first_snapshot = None
+        self._add_row(snapshot=snapshot, midpoint_diff=midpoint_diff)
+        return self.ready
+
+    def _add_row(self, snapshot: np.ndarray, midpoint_diff: float) -> None:
+        """
+        Transform a snapshot into an observation row, and write it into the ring
+        buffer.
+
+        :param snapshot: (np.array) LOB snapshot
+        :param midpoint_diff: midpoint log price change since the previous snapshot
+        :return: (void)
+        """
+        index_maps = self._index_maps
+        position = self.count % self.window_size
+        row = self._buffer[position]
+        normalized = row[:self._number_of_normalized_features]
+
+        # Calculate OFI = LIMIT - MARKET - CANCEL
+        features = np.empty(self._number_of_features, dtype=np.float64)
+        features[:self._number_of_kept] = snapshot[index_maps['kept']]
+        features[self._number_of_kept:] = snapshot[index_maps['limit_notional']] - \
+            snapshot[index_maps['market_notional']] - \
+            snapshot[index_maps['cancel_notional']]
+        features[index_maps['feature_midpoint']] = midpoint_diff
+
+        # smooth, scale, and clip the features (same operations as the scaler)
+        number_of_features = self._mean.shape[0]
+        scaled = normalized[:number_of_features]
+        _step_ema(ema=self._feature_ema, data=features, out=scaled)
+        scaled -= self._mean
+        scaled /= self._scale
+        np.clip(scaled, -10., 10., out=scaled)
+
+        # order imbalances are not z-scored, since they are in [-1, 1]
+        bid_notional = np.cumsum(snapshot[index_maps['bids_notional']].astype(
+            np.float32))
+        ask_notional = np.cumsum(snapshot[index_maps['asks_notional']].astype(
+            np.float32))
+        imbalances = np.empty(MAX_BOOK_ROWS + 1, dtype=np.float32)
+        levels = imbalances[:MAX_BOOK_ROWS]
+        np.divide((bid_notional - ask_notional) + np.float32(1e-5),
+                  (bid_notional + ask_notional) + np.float32(1e-5), out=levels)
+        levels[np.isnan(levels)] = 0.
+        imbalance_mean = levels[0]
+        for i in range(1, MAX_BOOK_ROWS):
+            imbalance_mean += levels[i]
+        imbalances[MAX_BOOK_ROWS] = imbalance_mean / np.float32(MAX_BOOK_ROWS)
+        _step_ema(ema=self._imbalance_ema, data=imbalances,
+                  out=normalized[number_of_features:])
+
+        # the environments step the indicators with the raw data's float32 values
+        self.tns.step(buys=np.float32(snapshot[self._buys_index]),
+                      sells=np.float32(snapshot[self._sells_index]))
+        self.rsi.step(price=snapshot[index_maps['midpoint']])
+        row[self._number_of_normalized_features:self.number_of_market_features] = (
+            *self.tns.get_value(), *self.rsi.get_value())
+        row[self.number_of_market_features:] = self._agent_features
+        np.clip(row, -10., 10., out=row)
+
+        self._buffer[position + self.window_size] = row
+        self.count += 1
+
+    @property
+    def observation(self) -> np.ndarray:
+        """
+        Current observation, with the last `window_size` rows in chronological order.
+
+        :return: (np.array) observation; a view of the ring buffer, which is
+            overwritten by the following snapshots
+        """
+        position = self.count % self.window_size
+        observation = self._buffer[position:position + self.window_size]
+        if self.format_3d:
+            observation = observation[..., np.newaxis]
+        return observation
+
+
+def _step_ema(ema, data: np.ndarray, out: np.ndarray) -> None:
+    """
+    Smooth one row with EMA(s), as `apply_ema_to_array()` does.
+
+    :param ema: EMA handler, or NONE to copy the row
+    :param data: (np.array) row, which must not be reused by the caller
+    :param out: (np.array) smoothed row, side by side for a list of EMAs
+    :return: (void)
+    """
+    if ema is None:
+        out[:] = data
+    elif isinstance(ema, list):
+        width = data.shape[0]
+        for j, e in enumerate(ema):
+            e.step(value=data)
+            out[j * width:(j + 1) * width] = e.value
+    else:
+        ema.step(value=data)
+        out[:] = ema.value
+
+
+class LiveAgent(object):
+
+    def __init__(self, policy_filename: str, fitting_file: str, feature_names: list,
+                 ema_alpha: list or float or None = EMA_ALPHA, format_3d: bool = False,
+                 latency_budget: int = LATENCY_BUDGET_IN_MICROSECONDS,
+                 log_interval: int = 600):
+        """
+        Run a trained policy on a live limit order book, and measure the latency from
+        the LOB snapshot to the agent's action.
+
+        The agent is assumed to be flat (see `get_flat_agent_features()`) until
+        `set_agent_features()` is called with the features of its positions.
+
+        :param policy_filename: policy saved with `NumpyPolicy.save()`
+        :param fitting_file: prior trading day (see `LivePipeline`)
+        :param feature_names: names of the snapshot's values
+        :param ema_alpha: decay factor(s) for EMA used when training the policy
+        :param format_3d: if TRUE, the policy was trained on tensor observations
+        :param latency_budget: microseconds allowed from the snapshot to the action;
+            slower actions are logged
+        :param log_interval: number of actions between latency summaries
+        """
+        self.policy = NumpyPolicy.load(filename=policy_filename)
+        self.pipeline = LivePipeline(fitting_file=fitting_file,
+                                     feature_names=feature_names,
+                                     window_size=self.policy.input_shape[1],
+                                     ema_alpha=ema_alpha, format_3d=format_3d)
+        number_of_agent_features = self.policy.input_shape[2] - \
+            self.pipeline.number_of_market_features
+        assert number_of_agent_features > self.policy.output_shape[0], \
+            "Error: {} does not match the live features".format(self.policy)
+        self.pipeline.set_agent_features(agent_features=get_flat_agent_features(
+            number_of_agent_features=number_of_agent_features,
+            number_of_actions=self.policy.output_shape[0]))
+
+        self.latency_budget = latency_budget
+        self.log_interval = log_interval
+        self.number_of_actions = 0
+        self.number_over_budget = 0
+        self.max_latency = 0  # nanoseconds
+        self._profiler = Profiler(total_phase='snapshot_to_action')
+        LOGGER.info('Live agent: {} on {}'.format(self.policy, self.pipeline))
+
+    def set_agent_features(self, agent_features: np.ndarray) -> None:
+        """
+        Set the features of the agent's positions, action, and reward (e.g., after an
+        order is filled).
+
+        :param agent_features: (np.array) agent features
+        :return: (void)
+        """
+        self.pipeline.set_agent_features(agent_features=agent_features)
+
+    def act(self, book) -> int or None:
+        """
+        Render a LOB snapshot, update the observation, and choose an action.
+
+        :param book: (OrderBook) live limit order book
+        :return: (int) greedy action, or NONE while the pipeline is warming up
+        """
+        start_time = perf_counter_ns()
+        snapshot = book.render_book()
+        render_time = perf_counter_ns()
+        ready = self.pipeline.step(snapshot)
+        features_time = perf_counter_ns()
+        if not ready:
+            return None
+        action = int(np.argmax(self.policy.predict(self.pipeline.observation)))
+        end_time = perf_counter_ns()
+
+        # only the snapshots that lead to an action are timed
+        latency = end_time - start_time
+        self._profiler.add('render_book', render_time - start_time)
+        self._profiler.add('features', features_time - render_time)
+        self._profiler.add('inference', end_time - features_time)
+        self._profiler.add('snapshot_to_action', latency)
+        self.max_latency = max(self.max_latency, latency)
+        self.number_of_actions += 1
+        if latency > self.latency_budget * 1000:
+            self.number_over_budget += 1
+            LOGGER.warning('Live agent: action took {:,.0f} us, over the budget of '
+                           '{:,} us'.format(latency / 1e3, self.latency_budget))
+        if self.number_of_actions % self.log_interval == 0:
+            LOGGER.info(self.get_latency_report())
+        return action
+
+    def get_latency_report(self) -> str:
+        """
+        Summarize the latency of each phase from the snapshot to the action.
+
+        :return: (str) latency table
+        """
+        return 'Live agent latency over {:,} actions ({:,} over the budget of {:,} us;' \
+               ' max {:,.0f} us):\n{}'.format(
+                   self.number_of_actions, self.number_over_budget,
+                   self.latency_budget, self.max_latency / 1e3,
+                   self._profiler)
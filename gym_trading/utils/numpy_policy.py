@@ -0,0 +1,283 @@
+import json
+
+import numpy as np
+
+from configurations import LOGGER
+
+# layers supported by `NumpyPolicy`, in the order of their weights in `get_weights()`
+LAYERS_WITH_WEIGHTS = ('conv2d', 'dense')
+
+
+class NumpyPolicy(object):
+
+    def __init__(self, architecture: list, weights: list, input_shape: tuple,
+                 batch_size: int = 1):
+        """
+        Forward pass of a trained Q-network in plain NumPy, so that agents can be run
+        (e.g., by the `Recorder` or in back-tests) without loading Keras.
+
+        The architecture is a list of layers, each a dict with a 'layer' key:
+            1) 'conv2d' --> channels-first convolution with a kernel one feature
+                wide, and 'strides', 'padding' ('same' or 'valid'), and 'activation'
+            2) 'dense' --> dense layer applied to the last axis, and 'activation'
+            3) 'flatten' --> flatten all axes but the batch axis
+            4) 'dueling' --> Keras-RL's dueling aggregation with `dueling_type='avg'`
+        Activations are 'relu', 'softmax', or 'linear'.
+
+        The outputs of the layers are written into buffers preallocated per batch
+        size, so repeated predictions avoid most memory allocations.
+
+        :param architecture: (list of dict) layers
+        :param weights: (list of np.array) weights of the layers, as returned by
+            Keras' `model.get_weights()`
+        :param input_shape: shape of one input, including the frame stack
+            (e.g., (1, window_size, number_of_features))
+        :param batch_size: batch size to preallocate buffers for
+        """
+        self.architecture = architecture
+        self.input_shape = tuple(input_shape)
+        self._weights = list()
+        self.set_weights(weights=weights)
+        self.output_shape = self._get_shapes()[-1]
+        self._buffers = dict()
+        self._get_buffers(batch_size=batch_size)
+
+    def __str__(self):
+        return 'NumpyPolicy: [layers={} | input_shape={} | output_shape={}]'.format(
+            [layer['layer'] for layer in self.architecture], self.input_shape,
+            self.output_shape)
+
+    def get_weights(self) -> list:
+        return [w.copy() for w in self._weights]
+
+    def set_weights(self, weights: list) -> None:
+        """
+        Load new weights into the policy (e.g., synced from a learner).
+
+        :param weights: (list of np.array) weights of the layers
+        :return: (void)
+        """
+        number_of_weights = 2 * sum(layer['layer'] in LAYERS_WITH_WEIGHTS
+                                    for layer in self.architecture)
+        assert len(weights) == number_of_weights, \
+            "Error: expected {} weights, not {}".format(number_of_weights, len(weights))
+        self._weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+
+    def _get_shapes(self) -> list:
+        """
+        Get the output shape of each layer, not including the batch axis.
+
+        :return: (list of tuple) shapes
+        """
+        shapes = list()
+        shape = self.input_shape
+        weights = iter(self._weights)
+        for layer in self.architecture:
+            if layer['layer'] == 'conv2d':
+                kernel, _ = next(weights), next(weights)
+                kernel_height, kernel_width, _, filters = kernel.shape
+                assert kernel_width == 1 and layer['strides'][1] == 1, \
+                    "Error: only kernels one feature wide are supported"
+                height = _get_conv_height(height=shape[1], kernel_height=kernel_height,
+                                          stride=layer['strides'][0],
+                                          padding=layer['padding'])
+                shape = (filters, height, shape[2])
+            elif layer['layer'] == 'dense':
+                kernel, _ = next(weights), next(weights)
+                shape = (*shape[:-1], kernel.shape[1])
+            elif layer['layer'] == 'flatten':
+                shape = (int(np.prod(shape)),)
+            elif layer['layer'] == 'dueling':
+                shape = (shape[0] - 1,)
+            else:
+                raise ValueError('Unknown layer: {}'.format(layer['layer']))
+            shapes.append(shape)
+        return shapes
+
+    def _get_buffers(self, batch_size: int) -> list:
+        """
+        Get the buffers for a batch size, allocating them on the first call.
+
+        :param batch_size: number of inputs
+        :return: (list of np.array) output buffer of each layer
+        """
+        buffers = self._buffers.get(batch_size)
+        if buffers is None:
+            buffers = [np.zeros((batch_size, *shape), dtype=np.float32)
+                       for shape in self._get_shapes()]
+            self._buffers[batch_size] = buffers
+        return buffers
+
+    def predict_on_batch(self, states: np.ndarray) -> np.ndarray:
+        """
+        Predict the Q-values of a batch of observations.
+
+        :param states: (np.array) observations, with or without the frame stack axis
+        :return: (np.array) Q-values with shape (batch_size, number_of_actions); the
+            array is reused by the next prediction with the same batch size
+        """
+        x = np.asarray(states, dtype=np.float32)
+        x = x.reshape(x.shape[0], *self.input_shape)
+        buffers = self._get_buffers(batch_size=x.shape[0])
+        weights = iter(self._weights)
+
+        for layer, out in zip(self.architecture, buffers):
+            if layer['layer'] == 'conv2d':
+                _conv2d(x=x, kernel=next(weights), bias=next(weights),
+                        stride=layer['strides'][0], padding=layer['padding'], out=out)
+                _activate(out=out, activation=layer['activation'])
+            elif layer['layer'] == 'dense':
+                kernel, bias = next(weights), next(weights)
+                np.matmul(x.reshape(-1, kernel.shape[0]), kernel,
+                          out=out.reshape(-1, kernel.shape[1]))
+                out += bias
+                _activate(out=out, activation=layer['activation'])
+            elif layer['layer'] == 'flatten':
+                out[:] = x.reshape(out.shape)
+            elif layer['layer'] == 'dueling':
+                advantages = x[:, 1:]
+                np.subtract(advantages, advantages.mean(axis=1, keepdims=True),
+                            out=out)
+                out += x[:, :1]
+            x = out
+        return x
+
+    def predict(self, observation: np.ndarray) -> np.ndarray:
+        """
+        Predict the Q-values of a single observation.
+
+        :param observation: (np.array) observation returned by the environment
+        :return: (np.array) Q-values with shape (number_of_actions,); the array is
+            reused by the next prediction
+        """
+        return self.predict_on_batch(observation[np.newaxis])[0]
+
+    def save(self, filename: str) -> None:
+        """
+        Save the policy to a NumPy archive.
+
+        :param filename: path of the archive (e.g., 'dqn_weights.npz')
+        :return: (void)
+        """
+        np.savez(filename,
+                 architecture=json.dumps(self.architecture),
+                 input_shape=np.array(self.input_shape),
+                 **{'weights_{}'.format(i): w for i, w in enumerate(self._weights)})
+        LOGGER.info('Saved {} to {}'.format(self, filename))
+
+    @staticmethod
+    def load(filename: str, batch_size: int = 1):
+        """
+        Load a policy saved with `NumpyPolicy.save()`.
+
+        :param filename: path of the archive
+        :param batch_size: batch size to preallocate buffers for
+        :return: (NumpyPolicy) policy
+        """
+        with np.load(filename) as archive:
+            number_of_weights = len([k for k in archive.files
+                                     if k.startswith('weights_')])
+            return NumpyPolicy(
+                architecture=json.loads(str(archive['architecture'])),
+                weights=[archive['weights_{}'.format(i)]
+                         for i in range(number_of_weights)],
+                input_shape=tuple(archive['input_shape'].tolist()),
+                batch_size=batch_size)
+
+
+def export_keras_model(model, batch_size: int = 1) -> NumpyPolicy:
+    """
+    Convert a Keras model created by `agent.dqn.create_model()` (or the dueling model
+    built from it by Keras-RL's `DQNAgent`) into a `NumpyPolicy`.
+
+    :param model: Keras model
+    :param batch_size: batch size to preallocate buffers for
+    :return: (NumpyPolicy) policy
+    """
+    architecture = list()
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        config = layer.get_config()
+        if layer_type == 'InputLayer':
+            continue
+        elif layer_type == 'Conv2D':
+            assert config['data_format'] == 'channels_first', \
+                "Error: only channels-first convolutions are supported"
+            architecture.append(dict(layer='conv2d', strides=list(config['strides']),
+                                     padding=config['padding'],
+                                     activation=config['activation']))
+        elif layer_type == 'Dense':
+            architecture.append(dict(layer='dense', activation=config['activation']))
+        elif layer_type == 'Flatten':
+            architecture.append(dict(layer='flatten'))
+        elif layer_type == 'Lambda':
+            # Keras-RL's dueling layer; the agent uses `dueling_type='avg'`
+            architecture.append(dict(layer='dueling'))
+        else:
+            raise ValueError('Layer {} ({}) is not supported'.format(layer.name,
+                                                                     layer_type))
+    return NumpyPolicy(architecture=architecture, weights=model.get_weights(),
+                       input_shape=tuple(model.input_shape[1:]), batch_size=batch_size)
+
+
+def _get_conv_height(height: int, kernel_height: int, stride: int,
+                     padding: str) -> int:
+    """
+    Get the output height of a convolution, as computed by Keras.
+
+    :return: (int) number of rows
+    """
+    if padding == 'same':
+        return -(-height // stride)
+    return (height - kernel_height) // stride + 1
+
+
+def _conv2d(x: np.ndarray, kernel: np.ndarray, bias: np.ndarray, stride: int,
+            padding: str, out: np.ndarray) -> None:
+    """
+    Channels-first convolution with a kernel one feature wide, as computed by Keras.
+
+    :param x: (np.array) inputs with shape (batch_size, channels, height, features)
+    :param kernel: (np.array) kernel with shape (kernel_height, 1, channels, filters)
+    :param bias: (np.array) bias with shape (filters,)
+    :param stride: stride along the height
+    :param padding: 'same' or 'valid'
+    :param out: (np.array) outputs with shape (batch_size, filters, out_height,
+        features)
+    :return: (void)
+    """
+    kernel_height = kernel.shape[0]
+    height, out_height = x.shape[2], out.shape[2]
+    # 'same' padding puts the extra row at the bottom, as TensorFlow does
+    pad_top = 0
+    if padding == 'same':
+        pad_top = max((out_height - 1) * stride + kernel_height - height, 0) // 2
+
+    out[:] = bias[np.newaxis, :, np.newaxis, np.newaxis]
+    for i in range(kernel_height):
+        # output rows whose receptive field includes input row `first + k * stride`
+        first = i - pad_top
+        lo = max(-(first // stride) if first < 0 else 0, 0)
+        hi = min(out_height, (height - 1 - first) // stride + 1)
+        if hi <= lo:
+            continue
+        rows = x[:, :, first + lo * stride:first + (hi - 1) * stride + 1:stride]
+        out[:, :, lo:hi] += np.einsum('nchw,cf->nfhw', rows, kernel[i, 0])
+
+
+def _activate(out: np.ndarray, activation: str) -> None:
+    """
+    Apply an activation function in place.
+
+    :param out: (np.array) layer outputs
+    :param activation: 'relu', 'softmax', or 'linear'
+    :return: (void)
+    """
+    if activation == 'relu':
+        np.maximum(out, 0., out=out)
+    elif activation == 'softmax':
+        out -= out.max(axis=-1, keepdims=True)
+        np.exp(out, out=out)
+        out /= out.sum(axis=-1, keepdims=True)
+    elif activation != 'linear':
+        raise ValueError('Unknown activation: {}'.format(activation))
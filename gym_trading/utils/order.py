@@ -5,18 +5,24 @@
 #
 from abc import ABC
 
-from configurations import LIMIT_ORDER_FEE, LOGGER, MARKET_ORDER_FEE
+from configurations import LIMIT_ORDER_FEE, MARKET_ORDER_FEE
 
 
 class OrderMetrics(object):
+    __slots__ = ('drawdown_max', 'upside_max', 'steps_in_position', 'price_index')
 
     def __init__(self):
         """
         Class for capturing order / position metrics
+
+        Note: metrics are derived from the position's price history when read with
+            `Position.get_order_metrics()`, rather than updated on every step.
         """
         self.drawdown_max = 0.0
         self.upside_max = 0.0
         self.steps_in_position = 0
+        # index of the position's first price update after the order was executed
+        self.price_index = -1
 
     def __str__(self):
         return ('OrderMetrics: [ drawdown_max={} | upside_max={} | '
@@ -25,6 +31,8 @@ class OrderMetrics(object):
 
 
 class Order(ABC):
+    __slots__ = ('order_type', 'ccy', 'side', 'price', 'step', 'average_execution_price',
+                 'metrics', 'executed', 'executed_notional', 'queue_ahead', 'id')
     DEFAULT_SIZE = 1000.
     _id = 0
     LIMIT_ORDER_FEE = LIMIT_ORDER_FEE * 2
@@ -49,8 +57,8 @@ class Order(ABC):
         self.average_execution_price = average_execution_price
         self.metrics = OrderMetrics()
         self.executed = 0.
+        self.executed_notional = 0.
         self.queue_ahead = 0.
-        self.executions = dict()
         Order._id += 1
         self.id = Order._id
 
@@ -68,34 +76,10 @@ class Order(ABC):
         """
         return self.executed >= Order.DEFAULT_SIZE
 
-    def update_metrics(self, price: float, step: int) -> None:
-        """
-        Update specific position metrics per each order.
-
-        :param price: (float) current midpoint price
-        :param step: (int) current time step
-        :return: (void)
-        """
-        self.metrics.steps_in_position = step - self.step
-        if self.is_filled:
-            if self.side == 'long':
-                unrealized_pnl = (price - self.average_execution_price) / \
-                                 self.average_execution_price
-            elif self.side == 'short':
-                unrealized_pnl = (self.average_execution_price - price) / \
-                                 self.average_execution_price
-            else:
-                unrealized_pnl = 0.0
-                LOGGER.warning('alert: unknown order.step() side %s' % self.side)
-
-            if unrealized_pnl < self.metrics.drawdown_max:
-                self.metrics.drawdown_max = unrealized_pnl
-
-            if unrealized_pnl > self.metrics.upside_max:
-                self.metrics.upside_max = unrealized_pnl
-
 
 class MarketOrder(Order):
+    __slots__ = ()
+
     def __init__(self, ccy='BTC-USD', side='long', price=0.0, step=-1):
         super(MarketOrder, self).__init__(price=price,
                                           step=step,
@@ -109,6 +93,7 @@ class MarketOrder(Order):
 
 
 class LimitOrder(Order):
+    __slots__ = ()
 
     def __init__(self, ccy='BTC-USD', side='long', price=0.0, step=-1, queue_ahead=100.):
         super(LimitOrder, self).__init__(price=price,
@@ -153,11 +138,8 @@ class LimitOrder(Order):
             overflow = self.executed - Order.DEFAULT_SIZE
             self.executed -= overflow
 
-        _price = float(self.price)
-        if _price in self.executions:
-            self.executions[_price] += volume - overflow
-        else:
-            self.executions[_price] = volume - overflow
+        # keep a running notional of executions instead of the fills at each price
+        self.executed_notional += (volume - overflow) * self.price
 
     def get_average_execution_price(self) -> float:
         """
@@ -168,9 +150,7 @@ class LimitOrder(Order):
 
         :return: (float) average execution price
         """
-        self.average_execution_price = sum(
-            [notional_volume * price for price, notional_volume in
-             self.executions.items()]) / self.DEFAULT_SIZE
+        self.average_execution_price = self.executed_notional / self.DEFAULT_SIZE
         return round(self.average_execution_price, 2)
 
     @property
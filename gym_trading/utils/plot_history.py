@@ -39,24 +39,124 @@ def plot_observation_space(observation: np.ndarray,
         plt.close(fig)
 
 
+RECORDING_MODES = ('off', 'ring', 'full', 'sampled')
+
+
+class HistoryBuffer(object):
+
+    def __init__(self, mode: str = 'full', length: int = 86400, interval: int = 1,
+                 dtype: type = np.float32):
+        """
+        Preallocated storage for one row of values per time step.
+
+        :param mode: recording mode
+            1) 'off' --> nothing is stored
+            2) 'ring' --> only the last `length` rows are stored
+            3) 'full' --> all rows are stored (storage doubles when full)
+            4) 'sampled' --> every `interval`-th row is stored (storage doubles when
+                full)
+        :param length: number of rows to preallocate (and the size of the ring buffer)
+        :param interval: number of rows between stored rows in 'sampled' mode
+        :param dtype: data type of the storage
+        """
+        assert mode in RECORDING_MODES, \
+            "Error: recording mode must be one of {}, not {}".format(
+                RECORDING_MODES, mode)
+        assert length > 0, "Error: length must be greater than zero, not {}".format(
+            length)
+        assert interval > 0, "Error: interval must be greater than zero, not {}".format(
+            interval)
+        self.mode = mode
+        self._length = length
+        self._interval = interval
+        self._dtype = dtype
+        self._buffer = None  # allocated on the first row, once the width is known
+        self._size = 0  # number of rows stored
+        self._count = 0  # number of rows received
+
+    def __len__(self):
+        return self._size
+
+    def append(self, values) -> None:
+        """
+        Add a row.
+
+        :param values: (np.array or tuple) values for the current time step
+        :return: (void)
+        """
+        count = self._count
+        self._count += 1
+        if self.mode == 'off':
+            return
+        if self.mode == 'sampled' and count % self._interval != 0:
+            return
+
+        if self._buffer is None:
+            self._buffer = np.empty((self._length, np.size(values)), dtype=self._dtype)
+
+        if self.mode == 'ring':
+            self._buffer[count % self._length] = values
+            self._size = min(self._size + 1, self._length)
+            return
+
+        if self._size == self._buffer.shape[0]:
+            self._buffer = np.concatenate((self._buffer, np.empty_like(self._buffer)))
+        self._buffer[self._size] = values
+        self._size += 1
+
+    def to_array(self) -> np.ndarray:
+        """
+        Get the stored rows in chronological order.
+
+        :return: (np.array) stored rows
+        """
+        if self._buffer is None:
+            return np.empty((0, 0), dtype=self._dtype)
+        if self.mode == 'ring' and self._count > self._length:
+            start = self._count % self._length
+            return np.concatenate((self._buffer[start:], self._buffer[:start]))
+        return self._buffer[:self._size]
+
+    def clear(self) -> None:
+        """
+        Remove all rows, but keep the storage allocated.
+
+        :return: (void)
+        """
+        self._size = 0
+        self._count = 0
+
+
 class Visualize(object):
 
     def __init__(self,
                  columns: list or None,
-                 store_historical_observations: bool = True):
+                 store_historical_observations: bool = True,
+                 recording_mode: str = 'full',
+                 recording_length: int = 86400,
+                 recording_interval: int = 1):
         """
         Helper class to store episode performance.
 
         :param columns: Column names (or labels) for rending data
         :param store_historical_observations: if TRUE, store observation
             space for rendering as an image at the end of an episode
+        :param recording_mode: 'off', 'ring', 'full', or 'sampled' (see
+            `HistoryBuffer`) for storing the episode history and observations
+        :param recording_length: number of time steps to preallocate storage for
+            (and the number of time steps kept in 'ring' mode)
+        :param recording_interval: number of time steps between stored time steps in
+            'sampled' mode
         """
-        self._data = list()
+        self._data = HistoryBuffer(mode=recording_mode, length=recording_length,
+                                   interval=recording_interval, dtype=np.float64)
         self._columns = columns
 
         # Observation space for rendering
         self._store_historical_observations = store_historical_observations
-        self._historical_observations = list()
+        self._historical_observations = HistoryBuffer(
+            mode=recording_mode if store_historical_observations else 'off',
+            length=recording_length, interval=recording_interval)
         self.observation_labels = None
 
     def add_observation(self, obs: np.ndarray) -> None:
@@ -66,8 +166,7 @@ class Visualize(object):
 
         :param obs: Current time step observation from the environment
         """
-        if self._store_historical_observations:
-            self._historical_observations.append(obs)
+        self._historical_observations.append(obs)
 
     def add(self, *args):
         """
@@ -84,7 +183,8 @@ class Visualize(object):
 
         :return: DataFrame with episode history of prices and agent transactions
         """
-        return pd.DataFrame(data=self._data, columns=self._columns)
+        data = self._data.to_array() if len(self._data) > 0 else None
+        return pd.DataFrame(data=data, columns=self._columns)
 
     def reset(self) -> None:
         """
@@ -191,7 +291,7 @@ class Visualize(object):
         """
         Represent all the observation spaces seen by the agent as one image.
         """
-        observations = np.asarray(self._historical_observations, dtype=np.float32)
+        observations = self._historical_observations.to_array()
         plot_observation_space(observation=observations,
                                labels=self.observation_labels,
                                save_filename=save_filename)
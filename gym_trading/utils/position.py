@@ -6,7 +6,7 @@
 from collections import deque
 
 from configurations import (ENCOURAGEMENT, LIMIT_ORDER_FEE, LOGGER, MARKET_ORDER_FEE)
-from gym_trading.utils.order import LimitOrder, MarketOrder
+from gym_trading.utils.order import LimitOrder, MarketOrder, OrderMetrics
 from gym_trading.utils.statistic import TradeStatistics
 
 
@@ -14,7 +14,8 @@ class Position(object):
 
     def __init__(self, side: str,
                  max_position: int = 10,
-                 transaction_fee: bool = False):
+                 transaction_fee: bool = False,
+                 max_orders: int = 1):
         """
         Position class keeps track the agent's trades and provides stats
         (e.g., pnl) on all trades.
@@ -24,8 +25,11 @@ class Position(object):
             at a given time.
         :param transaction_fee: (bool) fee to use for add/remove order transactions;
                 If NONE, then transaction fees are omitted.
+        :param max_orders: (int) maximum number of LIMIT orders resting in the book at
+            a given time (each at a different price).
         """
         self.max_position_count = max_position
+        self.max_orders = max_orders
         self.positions = deque()
         self.realized_pnl = 0.0
         self.full_inventory = False
@@ -34,8 +38,13 @@ class Position(object):
         self.average_price = 0.0
         self.total_trade_count = 0
         self.transaction_fee = transaction_fee
-        self.order = None
+        self.orders = dict()  # order ladder: price -> open LIMIT order
         self.statistics = TradeStatistics()
+        # prices since the oldest position was executed, used to derive metrics
+        self._price_count = 0
+        self._last_step = 0
+        self._min_prices = deque()  # (index, price) with increasing prices
+        self._max_prices = deque()  # (index, price) with decreasing prices
 
     def __str__(self):
         msg = 'PositionI-{}: [realized_pnl={:.4f}'.format(self.side, self.realized_pnl)
@@ -55,8 +64,12 @@ class Position(object):
         self.total_exposure = 0.0
         self.average_price = 0.0
         self.total_trade_count = 0
-        self.order = None
+        self.orders.clear()
         self.statistics.reset()
+        self._price_count = 0
+        self._last_step = 0
+        self._min_prices.clear()
+        self._max_prices.clear()
 
     @property
     def position_count(self) -> int:
@@ -67,44 +80,122 @@ class Position(object):
         """
         return self.positions.__len__()
 
-    def _process_transaction_volume(self, volume: float) -> None:
+    @property
+    def order_count(self) -> int:
+        """
+        Number of open LIMIT orders.
+
+        :return: (int) number of open orders
+        """
+        return self.orders.__len__()
+
+    @property
+    def order(self) -> LimitOrder or None:
         """
-        Handle order executions in LOB queue.
+        Open LIMIT order closest to the top of the book.
 
-        :param volume: unsigned notional value of trades (either buy or sell)
-        :return:(void)
+        :return: (LimitOrder) open order, or None if there are no open orders
         """
-        if self.order.is_first_in_queue:
-            self.order.process_executions(volume)
+        if not self.orders:
+            return None
+        if self.side == 'long':
+            return self.orders[max(self.orders)]
+        return self.orders[min(self.orders)]
+
+    def get_orders(self) -> list:
+        """
+        Open LIMIT orders, sorted from the top of the book.
+
+        :return: (list) open orders
+        """
+        return [self.orders[price] for price in
+                sorted(self.orders, reverse=self.side == 'long')]
+
+    @staticmethod
+    def _process_order_flow(order: LimitOrder, market_volume: float,
+                            cancel_volume: float = 0.) -> None:
+        """
+        Deplete the queue ahead of an open order and execute whatever market order
+        volume is left over.
+
+        :param order: open order
+        :param market_volume: notional value of market orders reaching the order's
+            price level
+        :param cancel_volume: notional value of cancellations ahead of the order
+        :return: (void)
+        """
+        queue_ahead = max(order.queue_ahead - cancel_volume, 0.)
+        if queue_ahead > 0. and queue_ahead >= market_volume:
+            order.queue_ahead = queue_ahead - market_volume
         else:
-            self.order.reduce_queue_ahead(volume)
+            order.queue_ahead = 0.
+            order.process_executions(volume=market_volume - queue_ahead)
 
     def _step_limit_order(self, bid_price: float, ask_price: float, buy_volume: float,
-                          sell_volume: float, step: int) -> bool:
+                          sell_volume: float, step: int, levels: tuple or None = None
+                          ) -> int:
         """
         Step in environment and update LIMIT order inventories.
 
+        Queues ahead and executions of every open order are updated in a single pass
+        over the order ladder, with one of two fill models:
+            1) if `levels` is NONE, an order's queue is depleted by all the trade
+                volume of the time step whenever the best price is at or through the
+                order's price
+            2) otherwise, an order resting at a price level of the snapshot is depleted
+                by that level's market orders and its share of the level's
+                cancellations (trade volume is used if the market moved through the
+                order's price)
+
         :param bid_price: best bid price
         :param ask_price: best ask price
         :param buy_volume: executions initiated by buyers (in notional terms)
         :param sell_volume: executions initiated by sellers (in notional terms)
         :param step: current time step
-        :return: (bool) TRUE if a limit order was filled, otherwise FALSE
-        """
-        if self.order is None:
-            return False
-
-        if self.order.side == 'long':
-            if bid_price <= self.order.price:
-                self._process_transaction_volume(volume=sell_volume)
-
-        elif self.order.side == 'short':
-            if ask_price >= self.order.price:
-                self._process_transaction_volume(volume=buy_volume)
-
-        if self.order.is_filled:
-            avg_execution_px = self.order.get_average_execution_price()
-            self.positions.append(self.order)
+        :param levels: (tuple) price level data of the order's side of the book:
+            prices, and an array of the market notional, cancel notional, and
+            notional (rows) of each price level (columns)
+        :return: (int) number of limit orders filled
+        """
+        if not self.orders:
+            return 0
+
+        is_long = self.side == 'long'
+        volume = sell_volume if is_long else buy_volume
+        level_prices = None if levels is None else levels[0].tolist()
+        filled_prices = []
+        for price, order in self.orders.items():
+            # orders at the top level rest at the touch, even when the best price is
+            # stored with less precision than the level prices (e.g., float32)
+            at_touch = level_prices is not None and price == level_prices[0]
+            # orders are executed when the market trades through them
+            if not at_touch and ((bid_price < price) if is_long else
+                                 (ask_price > price)):
+                self._process_order_flow(order=order, market_volume=volume)
+
+            elif level_prices is None:
+                # ...or reaches them, if price levels are not used
+                if bid_price == price if is_long else ask_price == price:
+                    self._process_order_flow(order=order, market_volume=volume)
+
+            elif price in level_prices:
+                market_volume, cancel_volume, level_notional = \
+                    levels[1][:, level_prices.index(price)].tolist()
+                # cancellations are assumed to be spread evenly over the level's queue
+                if level_notional > order.queue_ahead:
+                    cancel_volume *= order.queue_ahead / level_notional
+                self._process_order_flow(order=order, market_volume=market_volume,
+                                         cancel_volume=cancel_volume)
+
+            if order.is_filled:
+                filled_prices.append(price)
+
+        # fills closer to the top of the book are added to the inventory first
+        filled_prices.sort(reverse=is_long)
+        for price in filled_prices:
+            order = self.orders.pop(price)
+            avg_execution_px = order.get_average_execution_price()
+            self._append_position(order=order)
             self.total_exposure += avg_execution_px
             self.average_price = self.total_exposure / self.position_count
             self.full_inventory = self.position_count >= self.max_position_count
@@ -112,41 +203,114 @@ class Position(object):
 
             LOGGER.debug(
                 'FILLED {} order #{} at {:.3f} after {} steps on {}.'.format(
-                    self.order.side, self.order.id, avg_execution_px,
-                    self.order.metrics.steps_in_position, step)
+                    order.side, order.id, avg_execution_px, step - order.step, step)
             )
 
-            self.order = None  # set the slot back to no open orders
             self.statistics.orders_executed += 1
 
             # deduct transaction fees when the LIMIT order gets filled
             if self.transaction_fee:
                 self.realized_pnl -= LIMIT_ORDER_FEE
 
-            return True
+        return len(filled_prices)
 
-        return False
+    def _append_position(self, order: MarketOrder or LimitOrder) -> None:
+        """
+        Add an executed order to the inventory.
+
+        :param order: executed order
+        :return: (void)
+        """
+        order.metrics.price_index = self._price_count
+        self.positions.append(order)
 
     def _step_position_metrics(self, bid_price: float, ask_price: float, step: int) -> None:
         """
         Step in environment and update position metrics.
 
+        Instead of updating the metrics of every position, the running minimum and
+        maximum prices since each position was executed are kept in monotonic
+        queues, so the cost per step does not depend on the number of positions.
+
         :param bid_price: best bid price
         :param ask_price: best ask price
         :param step: current time step
         :return: (void)
         """
+        self._last_step = step
+
+        if self.position_count == 0:
+            if self._price_count > 0:
+                self._price_count = 0
+                self._min_prices.clear()
+                self._max_prices.clear()
+            return
+
         price = bid_price if self.side == 'long' else ask_price
+        index = self._price_count
+        self._price_count += 1
 
-        if self.order:
-            self.order.update_metrics(price=price, step=step)
+        min_prices, max_prices = self._min_prices, self._max_prices
+        while min_prices and min_prices[-1][1] >= price:
+            min_prices.pop()
+        min_prices.append((index, price))
+        while max_prices and max_prices[-1][1] <= price:
+            max_prices.pop()
+        max_prices.append((index, price))
 
-        if self.position_count > 0:
-            for position in self.positions:
-                position.update_metrics(price=price, step=step)
+        # prices before the oldest position was executed are no longer needed
+        oldest_index = self.positions[0].metrics.price_index
+        while min_prices[0][0] < oldest_index:
+            min_prices.popleft()
+        while max_prices[0][0] < oldest_index:
+            max_prices.popleft()
+
+    @staticmethod
+    def _get_price_since(prices: deque, index: int) -> float or None:
+        """
+        Get the minimum (or maximum) price since a price update.
+
+        :param prices: monotonic queue of (index, price)
+        :param index: index of the first price update to include
+        :return: (float) price, or None if there are no price updates since `index`
+        """
+        for price_index, price in prices:
+            if price_index >= index:
+                return price
+        return None
+
+    def get_order_metrics(self, order: MarketOrder or LimitOrder) -> OrderMetrics:
+        """
+        Update and return the metrics (drawdown, upside, and steps in position) of an
+        open order or position held in inventory.
+
+        :param order: open order or position
+        :return: (OrderMetrics) metrics of the order
+        """
+        metrics = order.metrics
+        metrics.steps_in_position = max(self._last_step - order.step, 0)
+
+        if order.is_filled and 0 <= metrics.price_index < self._price_count:
+            min_price = self._get_price_since(self._min_prices, metrics.price_index)
+            max_price = self._get_price_since(self._max_prices, metrics.price_index)
+            if min_price is None or max_price is None:
+                return metrics
+
+            if self.side == 'long':
+                worst_price, best_price = min_price, max_price
+            else:
+                worst_price, best_price = max_price, min_price
+
+            entry_price = order.average_execution_price
+            sign = 1. if self.side == 'long' else -1.
+            metrics.drawdown_max = min(
+                sign * (worst_price - entry_price) / entry_price, 0.)
+            metrics.upside_max = max(sign * (best_price - entry_price) / entry_price, 0.)
+
+        return metrics
 
     def step(self, bid_price: float, ask_price: float, buy_volume: float,
-             sell_volume: float, step: int) -> bool:
+             sell_volume: float, step: int, levels: tuple or None = None) -> int:
         """
         Step in environment and update broker inventories.
 
@@ -155,27 +319,38 @@ class Position(object):
         :param buy_volume: executions initiated by buyers (in notional terms)
         :param sell_volume: executions initiated by sellers (in notional terms)
         :param step: current time step
-        :return: (bool) TRUE if a limit order was filled, otherwise FALSE
+        :param levels: (tuple) price level data used by the fill model (see
+            `_step_limit_order()`)
+        :return: (int) number of limit orders filled
         """
-        is_filled = self._step_limit_order(bid_price=bid_price, ask_price=ask_price,
-                                           buy_volume=buy_volume, sell_volume=sell_volume,
-                                           step=step)
+        fills = self._step_limit_order(bid_price=bid_price, ask_price=ask_price,
+                                       buy_volume=buy_volume, sell_volume=sell_volume,
+                                       step=step, levels=levels)
 
         self._step_position_metrics(bid_price=bid_price, ask_price=ask_price, step=step)
-        return is_filled
+        return fills
 
-    def cancel_limit_order(self) -> bool:
+    def cancel_limit_order(self, price: float or None = None) -> bool:
         """
         Cancel a limit order.
 
+        :param price: (float) price of the order to cancel; if NONE, all open orders
+            are cancelled
         :return: (bool) TRUE if cancel was successful
         """
-        if self.order is None:
-            LOGGER.debug('No {} open orders to cancel.'.format(self.side))
+        if price is None:
+            if not self.orders:
+                LOGGER.debug('No {} open orders to cancel.'.format(self.side))
+                return False
+            LOGGER.debug('Cancelling {} {} orders'.format(self.order_count, self.side))
+            self.orders.clear()
+            return True
+
+        if price not in self.orders:
+            LOGGER.debug('No {} open order at {} to cancel.'.format(self.side, price))
             return False
 
-        LOGGER.debug('Cancelling order ({})'.format(self.order))
-        self.order = None
+        LOGGER.debug('Cancelling order ({})'.format(self.orders.pop(price)))
         return True
 
     def _add_market_order(self, order: MarketOrder) -> bool:
@@ -195,7 +370,7 @@ class Position(object):
 
         # Update position inventory attributes
         self.cancel_limit_order()  # remove any unfilled limit orders
-        self.positions.append(order)  # execute and save the market order
+        self._append_position(order=order)  # execute and save the market order
         self.total_exposure += order.average_execution_price
         self.average_price = self.total_exposure / self.position_count
         self.full_inventory = self.position_count >= self.max_position_count
@@ -218,35 +393,92 @@ class Position(object):
         """
         Add / update a LIMIT order.
 
+        If the order ladder is full, the open order farthest from the new order's
+        price is moved to that price.
+
         :param order: (Order) New order to be used for updating existing order or
                         placing a new order
         """
-        if self.order is None:
-            if self.full_inventory:
+        if order.price in self.orders:
+            LOGGER.debug("\nNothing to update about the order {}".format(
+                self.orders[order.price]))
+
+        elif self.order_count < self.max_orders:
+            # open orders count towards the position limit, since they could be filled
+            if self.position_count + self.order_count >= self.max_position_count:
                 LOGGER.debug(
                     "{} order rejected. Already at max position limit ({})".format(
                         self.side, self.max_position_count)
                 )
                 return False
-            self.order = order
+            self.orders[order.price] = order
             # update statistics
             self.statistics.orders_placed += 1
             LOGGER.debug('\nOpened new order={}'.format(order))
 
-        elif self.order.price != order.price:
-            self.order.price = order.price
-            self.order.queue_ahead = order.queue_ahead
-            self.order.id = order.id
-            self.order.step = order.step
-            # update statistics
-            self.statistics.orders_updated += 1
-            LOGGER.debug('\nUpdating order{} --> \n{}'.format(order, self.order))
+        else:
+            self._move_limit_order(price=order.price, queue_ahead=order.queue_ahead,
+                                   step=order.step).id = order.id
+
+        return True
+
+    def _move_limit_order(self, price: float, queue_ahead: float,
+                          step: int) -> LimitOrder:
+        """
+        Move the open LIMIT order farthest from `price` to `price`.
+
+        :param price: (float) new price of the order
+        :param queue_ahead: (float) notional value resting ahead of the order at the
+            new price
+        :param step: (int) current time step
+        :return: (LimitOrder) the order that was moved
+        """
+        old_price = max(self.orders, key=lambda order_price: abs(order_price - price))
+        order = self.orders.pop(old_price)
+        order.price = price
+        order.queue_ahead = queue_ahead
+        order.step = step
+        self.orders[price] = order
+        # update statistics
+        self.statistics.orders_updated += 1
+        LOGGER.debug('\nUpdated order --> \n{}'.format(order))
+        return order
+
+    def update_limit_order(self, price: float, queue_ahead: float, step: int) -> bool:
+        """
+        Update an open LIMIT order in place (i.e., without creating a new order). If
+        there is no open order at `price`, the open order farthest from `price` is
+        moved.
+
+        :param price: (float) new price of the order
+        :param queue_ahead: (float) notional value resting ahead of the order at the
+            new price
+        :param step: (int) current time step
+        :return: (bool) TRUE if there is an open order, otherwise FALSE
+        """
+        if not self.orders:
+            return False
 
+        if price in self.orders:
+            LOGGER.debug("\nNothing to update about the order {}".format(
+                self.orders[price]))
         else:
-            LOGGER.debug("\nNothing to update about the order {}".format(self.order))
+            self._move_limit_order(price=price, queue_ahead=queue_ahead, step=step)
 
         return True
 
+    def get_queues_ahead_features(self) -> list:
+        """
+        Scaled [-1, 1] ratio of how 'complete' each open order is, sorted from the
+        top of the book (see `Broker.get_queues_ahead_features()`).
+
+        :return: (list) open order completion ratios, padded with zeros to `max_orders`
+        """
+        features = [(order.executed - order.queue_ahead) /
+                    (order.queue_ahead + order.DEFAULT_SIZE)
+                    for order in self.get_orders()]
+        return features + [0.] * (self.max_orders - len(features))
+
     def add(self, order: MarketOrder or LimitOrder) -> bool:
         """
         Add / update an order.
@@ -275,18 +507,32 @@ class Position(object):
         :param netting_order: order object used to net position
         :return: (bool) TRUE if position removed successfully
         """
+        LOGGER.debug('remove-> Netting {} position with {} trade #{}'.format(
+            self.side, netting_order.side, netting_order.id))
+        return self.net_position(price=netting_order.price)
+
+    def net_position(self, price: float) -> float:
+        """
+        Remove the oldest position from inventory at a given price and return the
+        position PnL (i.e., without creating a netting order).
+
+        :param price: (float) price the position is netted out at
+        :return: (float) PnL from netting the position
+        """
         pnl = 0.
         if self.position_count < 1:
             LOGGER.info('Error. No {} positions to remove.'.format(self.side))
             return pnl
 
-        order = self.positions.popleft()
+        order = self.positions[0]
+        self.get_order_metrics(order=order)
+        self.positions.popleft()
 
         # Calculate PnL
         if self.side == 'long':
-            pnl = (netting_order.price / order.average_execution_price) - 1.
+            pnl = (price / order.average_execution_price) - 1.
         elif self.side == 'short':
-            pnl = (order.average_execution_price / netting_order.price) - 1.
+            pnl = (order.average_execution_price / price) - 1.
 
         # Add Profit and Loss to realized gains/losses
         self.realized_pnl += pnl
@@ -298,8 +544,8 @@ class Position(object):
         self.full_inventory = self.position_count >= self.max_position_count
 
         LOGGER.debug(
-            'remove-> Netted {} position #{} with {} trade #{} PnL = {:.4f}'.format(
-                self.side, order.id, netting_order.side, netting_order.id, pnl)
+            'net_position-> Netted {} position #{} at {:.3f} PnL = {:.4f}'.format(
+                self.side, order.id, price, pnl)
         )
 
         return pnl
@@ -311,7 +557,9 @@ class Position(object):
         :return: (LimitOrder) position being netted out
         """
         if self.position_count > 0:
-            position = self.positions.popleft()
+            position = self.positions[0]
+            self.get_order_metrics(order=position)
+            self.positions.popleft()
 
             # update positions attributes
             self.total_exposure -= position.average_execution_price
@@ -363,13 +611,8 @@ class Position(object):
             return -ENCOURAGEMENT
 
         pnl = 0.
-        # Need to reverse the side to reflect the correct direction of
-        # the flatten_order()
-        side = 'long' if self.side == 'short' else 'short'
-
         while self.position_count > 0:
-            order = MarketOrder(ccy=None, side=side, price=price)
-            pnl += self.remove(netting_order=order)
+            pnl += self.net_position(price=price)
             self.total_trade_count += 1
 
             # Deduct transaction fee based on order type
@@ -389,6 +632,7 @@ class Position(object):
         :param midpoint: (float) current midpoint of crypto currency
         :return: (float) distance between open order and midpoint price
         """
-        if self.order is None:
+        order = self.order
+        if order is None:
             return 0.
-        return midpoint / self.order.price - 1.
+        return midpoint / order.price - 1.
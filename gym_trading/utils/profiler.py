@@ -0,0 +1,108 @@
+# profiler.py
+#
+#   Opt-in wall time profiler for the phases of an environment step
+#
+#
+from functools import wraps
+from time import perf_counter_ns
+
+
+class Profiler(object):
+
+    def __init__(self, total_phase: str = 'step'):
+        """
+        Accumulate wall time (in nanoseconds) and call counts per phase.
+
+        Functions are timed by replacing them with the wrappers returned by
+        `wrap()`, so nothing is timed (and there is no overhead) unless a
+        function has been wrapped.
+
+        :param total_phase: phase used as the denominator of each phase's share of
+            time when printing the summary
+        """
+        self.total_phase = total_phase
+        self._elapsed_ns = dict()
+        self._calls = dict()
+
+    def __str__(self):
+        summary = self.get_summary(total_phase=self.total_phase)
+        lines = ['{:<24}{:>10}{:>14}{:>12}{:>10}'.format(
+            'Phase', 'Calls', 'Total (ms)', 'Mean (us)', 'Share')]
+        for phase, stats in summary.items():
+            lines.append('{:<24}{:>10}{:>14.2f}{:>12.2f}{:>9.1f}%'.format(
+                phase, stats['calls'], stats['total_ms'], stats['mean_us'],
+                stats['share'] * 100.))
+        return '\n'.join(lines)
+
+    def wrap(self, phase: str, func):
+        """
+        Wrap a function to accumulate its wall time and call count under `phase`.
+
+        Note: several functions can be wrapped under the same phase.
+
+        :param phase: name of the phase
+        :param func: function to time
+        :return: wrapped function
+        """
+        self._elapsed_ns.setdefault(phase, 0)
+        self._calls.setdefault(phase, 0)
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start_time = perf_counter_ns()
+            output = func(*args, **kwargs)
+            self._elapsed_ns[phase] += perf_counter_ns() - start_time
+            self._calls[phase] += 1
+            return output
+
+        return timed
+
+    def add(self, phase: str, elapsed_ns: int) -> None:
+        """
+        Accumulate a call timed by the caller under `phase`.
+
+        :param phase: name of the phase
+        :param elapsed_ns: wall time of the call in nanoseconds
+        :return: (void)
+        """
+        self._elapsed_ns[phase] = self._elapsed_ns.get(phase, 0) + elapsed_ns
+        self._calls[phase] = self._calls.get(phase, 0) + 1
+
+    def reset(self) -> None:
+        """
+        Reset all phase timers.
+
+        :return: (void)
+        """
+        for phase in self._elapsed_ns:
+            self._elapsed_ns[phase] = 0
+            self._calls[phase] = 0
+
+    @property
+    def total_calls(self) -> int:
+        """
+        Total number of calls to all phases.
+
+        :return: (int) number of calls
+        """
+        return sum(self._calls.values())
+
+    def get_summary(self, total_phase: str = 'step') -> dict:
+        """
+        Get the wall time and call count of each phase.
+
+        :param total_phase: phase used as the denominator of each phase's share of
+            time (e.g., the whole environment step)
+        :return: (dict) phase -> calls, total_ms, mean_us, and share
+        """
+        total_ns = self._elapsed_ns.get(total_phase, 0)
+        summary = dict()
+        for phase, elapsed_ns in self._elapsed_ns.items():
+            calls = self._calls[phase]
+            summary[phase] = dict(
+                calls=calls,
+                total_ms=elapsed_ns / 1e6,
+                mean_us=elapsed_ns / calls / 1e3 if calls > 0 else 0.,
+                share=elapsed_ns / total_ns if total_ns > 0 else 0.,
+            )
+        return summary
@@ -0,0 +1,252 @@
+import numpy as np
+
+
+class ReplayMemory(object):
+
+    def __init__(self, limit: int = 1000000, window_size: int = 100,
+                 action_repeats: int = 5, format_3d: bool = False, seed: int = 1):
+        """
+        Experience replay memory for the `gym_trading` environments, which stores
+        transitions as indices instead of observations.
+
+        Each row of an observation is the normalized LOB data of a time step,
+        followed by the agent's features (indicators, positions, action and reward).
+        Since consecutive observations overlap by all but `action_repeats` rows, the
+        memory only stores the agent's features and time step of every row once, and
+        references the normalized data of the day (shared with the environment)
+        rather than copying it. Observation windows are rebuilt when sampled.
+
+        :param limit: maximum number of transitions
+        :param window_size: number of lags in the observation space
+        :param action_repeats: number of steps taken in the environment per action,
+            used to size the storage for rows
+        :param format_3d: if TRUE, observations are rebuilt as tensors
+        :param seed: random seed number used to sample transitions
+        """
+        assert limit > 0, "Error: limit must be positive, not {}".format(limit)
+        self.limit = limit
+        self.window_size = window_size
+        self._random_state = np.random.RandomState(seed=seed)
+
+        # normalized data of the days referenced by the rows
+        self._days = dict()  # day ID -> normalized data
+        self._day_ids = dict()  # day key -> day ID
+        self._next_day_id = 0
+        self._number_of_day_features = None
+        self._format_3d = format_3d
+
+        # rows of the observations, in a ring buffer
+        self._row_capacity = limit * min(action_repeats, window_size) + window_size
+        self._row_count = 0  # number of rows added
+        self._row_days = np.zeros(self._row_capacity, dtype=np.int32)
+        self._row_steps = np.zeros(self._row_capacity, dtype=np.int64)
+        self._row_features = None  # allocated once the number of features is known
+
+        # transitions, in a ring buffer
+        self._transition_start = 0  # oldest transition that can be sampled
+        self._transition_count = 0  # number of transitions added
+        self._states = np.zeros(limit, dtype=np.int64)
+        self._next_states = np.zeros(limit, dtype=np.int64)
+        self._actions = np.zeros(limit, dtype=np.int64)
+        self._rewards = np.zeros(limit, dtype=np.float32)
+        self._terminals = np.zeros(limit, dtype=np.bool_)
+
+        # last row observed with `observe()`
+        self._last_day_id = self._last_step = None
+
+    def __str__(self):
+        return 'ReplayMemory: [transitions={} | rows={} | days={} | nbytes={:,}]'.format(
+            len(self), min(self._row_count, self._row_capacity), len(self._days),
+            self.nbytes)
+
+    def __len__(self):
+        return self._transition_count - self._transition_start
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the stored rows and transitions, not including the normalized
+        data shared with the environments.
+
+        :return: (int) number of bytes
+        """
+        nbytes = self._row_days.nbytes + self._row_steps.nbytes + \
+            self._states.nbytes + self._next_states.nbytes + self._actions.nbytes + \
+            self._rewards.nbytes + self._terminals.nbytes
+        if self._row_features is not None:
+            nbytes += self._row_features.nbytes
+        return nbytes
+
+    def add_day(self, key: str, normalized_data: np.ndarray) -> int:
+        """
+        Reference the normalized data of a trading day.
+
+        :param key: key of the day (e.g., `Day.key`)
+        :param normalized_data: (np.array) scaled environment data of the day
+        :return: (int) day ID
+        """
+        day_id = self._day_ids.get(key)
+        if day_id is not None:
+            return day_id
+
+        if self._number_of_day_features is None:
+            self._number_of_day_features = normalized_data.shape[1]
+        assert normalized_data.shape[1] == self._number_of_day_features, \
+            "Error: {} has {} features instead of {}".format(
+                key, normalized_data.shape[1], self._number_of_day_features)
+
+        # release the days that are no longer referenced by any row
+        referenced = set(np.unique(
+            self._row_days[:min(self._row_count, self._row_capacity)]).tolist())
+        for old_key, old_day_id in list(self._day_ids.items()):
+            if old_day_id not in referenced and old_day_id != self._last_day_id:
+                del self._day_ids[old_key]
+                del self._days[old_day_id]
+
+        day_id = self._next_day_id
+        self._next_day_id += 1
+        self._day_ids[key] = day_id
+        self._days[day_id] = normalized_data
+        return day_id
+
+    def add_rows(self, day_id: int, steps: np.ndarray, features: np.ndarray) -> int:
+        """
+        Add the rows of an observation that are not stored yet.
+
+        :param day_id: day ID returned by `self.add_day()`
+        :param steps: (np.array) time step of each row in the day
+        :param features: (np.array) agent features of each row (i.e., the columns
+            of the observation after the normalized data)
+        :return: (int) ID of the last row, which identifies the observation ending
+            with it
+        """
+        if self._row_features is None:
+            self._row_features = np.zeros((self._row_capacity, features.shape[1]),
+                                          dtype=np.float32)
+
+        positions = np.arange(self._row_count, self._row_count + steps.shape[0]) % \
+            self._row_capacity
+        self._row_days[positions] = day_id
+        self._row_steps[positions] = steps
+        self._row_features[positions] = features
+        self._row_count += steps.shape[0]
+
+        # forget the transitions whose observations have been overwritten
+        oldest_row = self._row_count - self._row_capacity + self.window_size - 1
+        while len(self) > 0 and \
+                self._states[self._transition_start % self.limit] < oldest_row:
+            self._transition_start += 1
+        return self._row_count - 1
+
+    @staticmethod
+    def get_rows(env, observation: np.ndarray, last_step: int or None = None) -> (
+            np.ndarray, np.ndarray):
+        """
+        Get the rows of an environment's observation after a time step.
+
+        :param env: (BaseEnvironment) environment which returned the observation
+        :param observation: (np.array) observation returned by `reset()` or `step()`
+        :param last_step: last time step stored, or None to get every row
+        :return: (np.array) time step and agent features of each row
+        """
+        window_size = observation.shape[0]
+        observation = observation.reshape(window_size, -1)
+
+        # the observation's rows are the consecutive time steps before the current one
+        step = env.local_step_number - 1
+        if last_step is None:
+            number_of_rows = window_size
+        else:
+            number_of_rows = max(min(step - last_step, window_size), 0)
+        return (np.arange(step - number_of_rows + 1, step + 1),
+                observation[window_size - number_of_rows:,
+                            env.day.normalized_data.shape[1]:])
+
+    def observe(self, env, observation: np.ndarray, new_episode: bool = False) -> int:
+        """
+        Add the rows of an environment's observation that are not stored yet. Only
+        observations of one environment can be added with this method.
+
+        :param env: (BaseEnvironment) environment which returned the observation
+        :param observation: (np.array) observation returned by `reset()` or `step()`
+        :param new_episode: if TRUE, the observation was returned by `reset()`
+        :return: (int) ID of the observation
+        """
+        day = env.day
+        day_id = self.add_day(key=day.key, normalized_data=day.normalized_data)
+        if new_episode or day_id != self._last_day_id:
+            self._last_step = None
+        steps, features = self.get_rows(env=env, observation=observation,
+                                        last_step=self._last_step)
+        self._last_day_id, self._last_step = day_id, env.local_step_number - 1
+        if steps.shape[0] == 0:
+            return self._row_count - 1
+        return self.add_rows(day_id=day_id, steps=steps, features=features)
+
+    def append(self, state: int, action: int, reward: float, next_state: int,
+               terminal: bool) -> None:
+        """
+        Add a transition.
+
+        :param state: observation ID before the action
+        :param action: (int) action taken
+        :param reward: (float) reward received
+        :param next_state: observation ID after the action
+        :param terminal: TRUE if the episode ended
+        :return: (void)
+        """
+        position = self._transition_count % self.limit
+        self._states[position] = state
+        self._next_states[position] = next_state
+        self._actions[position] = action
+        self._rewards[position] = reward
+        self._terminals[position] = terminal
+        self._transition_count += 1
+        self._transition_start = max(self._transition_start,
+                                     self._transition_count - self.limit)
+
+    def get_observations(self, states: np.ndarray) -> np.ndarray:
+        """
+        Rebuild observations from their IDs.
+
+        :param states: (np.array) observation IDs
+        :return: (np.array) observations, in the same format as the environment's
+        """
+        rows = states[:, None] + np.arange(1 - self.window_size, 1)
+        positions = rows % self._row_capacity
+        day_ids = self._row_days[positions[:, -1]]
+        steps = self._row_steps[positions]
+
+        observations = np.empty((states.shape[0], self.window_size,
+                                 self._number_of_day_features +
+                                 self._row_features.shape[1]), dtype=np.float32)
+        for day_id in np.unique(day_ids):
+            mask = day_ids == day_id
+            observations[mask, :, :self._number_of_day_features] = \
+                self._days[day_id][steps[mask]]
+        observations[:, :, self._number_of_day_features:] = self._row_features[positions]
+
+        if self._format_3d:
+            observations = np.expand_dims(observations, axis=-1)
+        return observations
+
+    def sample(self, batch_size: int = 32) -> (np.ndarray, np.ndarray, np.ndarray,
+                                               np.ndarray, np.ndarray):
+        """
+        Sample transitions uniformly.
+
+        :param batch_size: number of transitions
+        :return: (np.array) observations, actions, rewards, next observations, and
+            terminal flags
+        :raises ValueError: if the memory has no transitions
+        """
+        if len(self) == 0:
+            raise ValueError('Error: cannot sample from an empty ReplayMemory')
+        indices = self._random_state.randint(
+            low=self._transition_start, high=self._transition_count,
+            size=batch_size) % self.limit
+        return (self.get_observations(self._states[indices]),
+                self._actions[indices],
+                self._rewards[indices],
+                self.get_observations(self._next_states[indices]),
+                self._terminals[indices])
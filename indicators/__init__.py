@@ -1,4 +1,6 @@
-from indicators.ema import ExponentialMovingAverage, apply_ema_all_data, load_ema, reset_ema
+from indicators.ema import (
+    ExponentialMovingAverage, apply_ema_all_data, apply_ema_to_array, load_ema, reset_ema,
+)
 from indicators.indicator import IndicatorManager
 from indicators.rsi import RSI
 from indicators.tns import TnS
@@ -43,6 +43,16 @@ class ExponentialMovingAverage(object):
         """
         return self._value
 
+    @value.setter
+    def value(self, value: float or np.ndarray or None) -> None:
+        """
+        Set the EMA value (e.g., to continue smoothing from a saved state).
+
+        :param value: EMA smoothed value, or NONE to restart smoothing
+        :return: (void)
+        """
+        self._value = value
+
     def reset(self) -> None:
         """
         Reset EMA.
@@ -86,30 +96,45 @@ def apply_ema_all_data(
     if ema is None:
         return data
 
-    smoothed_data = []
     labels = data.columns.tolist()
-
     if isinstance(ema, ExponentialMovingAverage):
         LOGGER.info("Applying EMA to data...")
-        for row in data.values:
-            ema.step(value=row)
-            smoothed_data.append(ema.value)
-        smoothed_data = np.asarray(smoothed_data, dtype=np.float32)
-        return pd.DataFrame(smoothed_data, columns=labels, index=data.index)
     elif isinstance(ema, list):
         LOGGER.info("Applying list of EMAs to data...")
         labels = [f'{label}_{e.alpha}' for e in ema for label in labels]
-        for row in data.values:
-            tmp_row = []
-            for e in ema:
+
+    smoothed_data = np.empty((data.shape[0], len(labels)), dtype=np.float32)
+    apply_ema_to_array(ema=ema, data=data.values, out=smoothed_data)
+    return pd.DataFrame(smoothed_data, columns=labels, index=data.index)
+
+
+def apply_ema_to_array(
+        ema: Union[List[ExponentialMovingAverage], ExponentialMovingAverage],
+        data: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Apply exponential moving average to every row of an array, writing the smoothed
+    rows into a preallocated array. With a list of EMAs, the smoothed rows of each
+    EMA are placed side by side.
+
+    :param ema: EMA handler
+    :param data: (np.array) data set to smooth
+    :param out: (np.array) smoothed data set, with `len(ema)` times as many columns
+        as `data` for a list of EMAs
+    :return: (np.array) out
+    """
+    if isinstance(ema, ExponentialMovingAverage):
+        for i, row in enumerate(data):
+            ema.step(value=row)
+            out[i] = ema.value
+    elif isinstance(ema, list):
+        width = data.shape[1]
+        for i, row in enumerate(data):
+            for j, e in enumerate(ema):
                 e.step(value=row)
-                tmp_row.append(e.value)
-            smoothed_data.append(tmp_row)
-        smoothed_data = np.asarray(smoothed_data, dtype=np.float32).reshape(
-            data.shape[0], -1)
-        return pd.DataFrame(smoothed_data, columns=labels, index=data.index)
+                out[i, j * width:(j + 1) * width] = e.value
     else:
         raise ValueError(f"_apply_ema() --> unknown ema type: {type(ema)}")
+    return out
 
 
 def reset_ema(ema: Union[List[ExponentialMovingAverage], ExponentialMovingAverage, None]) -> \
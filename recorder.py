@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import time
 from datetime import datetime as dt
@@ -11,12 +12,17 @@ from data_recorder.coinbase_connector.coinbase_client import CoinbaseClient
 
 class Recorder(Process):
 
-    def __init__(self, symbols):
+    def __init__(self, symbols, policy_filename: str or None = None,
+                 fitting_file: str or None = None):
         """
         Constructor of Recorder.
 
         :param symbols: basket of securities to record...
                         Example: symbols = [('BTC-USD, 'tBTCUSD')]
+        :param policy_filename: if provided, a policy saved with `NumpyPolicy.save()`
+            is run on the Coinbase order book at every snapshot (see `LiveAgent`)
+        :param fitting_file: prior trading day used to normalize the policy's
+            observations; defaults to the last day exported for the Coinbase symbol
         """
         super(Recorder, self).__init__()
         self.symbols = symbols
@@ -24,6 +30,9 @@ class Recorder(Process):
         self.workers = dict()
         self.current_time = dt.now()
         self.daemon = False
+        self.policy_filename = policy_filename
+        self.fitting_file = fitting_file
+        self.agent = None
 
     def run(self) -> None:
         """
@@ -40,6 +49,22 @@ class Recorder(Process):
         self.workers[coinbase] = CoinbaseClient(sym=coinbase)
         self.workers[bitfinex] = BitfinexClient(sym=bitfinex)
 
+        if self.policy_filename is not None:
+            # imported here, so recording does not depend on the gym environments
+            from gym_trading.utils.day_source import get_archive_days
+            from gym_trading.utils.live_pipeline import LiveAgent
+            fitting_file = self.fitting_file
+            if fitting_file is None:
+                days = get_archive_days(symbol=coinbase)
+                if len(days) == 0:
+                    raise FileNotFoundError(
+                        'No days of {} were exported to the archive; provide a '
+                        'fitting_file to normalize the live data'.format(coinbase))
+                fitting_file = days[-1]
+            self.agent = LiveAgent(
+                policy_filename=self.policy_filename, fitting_file=fitting_file,
+                feature_names=self.workers[coinbase].book.render_lob_feature_names())
+
         self.workers[coinbase].start(), self.workers[bitfinex].start()
 
         Timer(5.0, self.timer_worker,
@@ -82,41 +107,53 @@ class Recorder(Process):
 
         if coinbaseClient.book.done_warming_up & \
                 bitfinexClient.book.done_warming_up:
-            """
-            This is the place to insert a trading model. 
-            You'll have to create your own.
-            
-            Example:
-                orderbook_data = tuple(coinbaseClient.book, bitfinexClient.book)
-                model = agent.dqn.Agent()
-                fix_api = SomeFixAPI() 
-                action = model(orderbook_data)
-                if action is buy:
-                    buy_order = create_order(pair, price, etc.)
-                    fix_api.send_order(buy_order)
-            
-            """
             LOGGER.info(f'{coinbaseClient.sym} >> {coinbaseClient.book}')
             # The `render_book()` method returns a numpy array of the LOB's current state,
             # as well as resets the Order Flow Imbalance trackers.
             # The LOB snapshot is in a tabular format with columns as defined in
             # `render_lob_feature_names()`
-            _ = coinbaseClient.book.render_book()
+            self.render_coinbase_book(coinbaseClient=coinbaseClient)
             _ = bitfinexClient.book.render_book()
         elif coinbaseClient.book.done_warming_up and not bitfinexClient.book.done_warming_up:
             LOGGER.info(f'Bitfinex - {bitfinexClient.sym} is warming up')
-            _ = coinbaseClient.book.render_book()
+            self.render_coinbase_book(coinbaseClient=coinbaseClient)
         elif bitfinexClient.book.done_warming_up and not coinbaseClient.book.done_warming_up:
             LOGGER.info(f'Coinbase - {coinbaseClient.sym} is warming up')
             _ = bitfinexClient.book.render_book()
         else:
             LOGGER.info('Both Coinbase and Bitfinex are still warming up...')
 
+    def render_coinbase_book(self, coinbaseClient: CoinbaseClient) -> None:
+        """
+        Render a snapshot of the Coinbase LOB, and pass it to the live agent (if any),
+        which chooses an action once its observation has warmed up.
+
+        Note: the actions are logged, and not sent to the exchange.
+
+        :param coinbaseClient: CoinbaseClient
+        :return: void
+        """
+        if self.agent is None:
+            _ = coinbaseClient.book.render_book()
+            return
+
+        action = self.agent.act(book=coinbaseClient.book)
+        if action is not None:
+            LOGGER.info(f'{coinbaseClient.sym} >> action #{action}')
+
 
 def main():
+    parser = argparse.ArgumentParser(description='Record limit order book data.')
+    parser.add_argument('--policy',
+                        default=None,
+                        help="Policy to run on the live Coinbase order books (e.g., "
+                             "'agent/dqn_weights/dqn_market-maker-v0_cnn_weights.npz')",
+                        type=str)
+    args = parser.parse_args()
+
     LOGGER.info(f'Starting recorder with basket = {BASKET}')
     for coinbase, bitfinex in BASKET:
-        Recorder((coinbase, bitfinex)).start()
+        Recorder((coinbase, bitfinex), policy_filename=args.policy).start()
         LOGGER.info(f'Process started up for {coinbase}')
         time.sleep(9)
 
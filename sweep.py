@@ -0,0 +1,344 @@
+import argparse
+import contextlib
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime as dt
+from time import perf_counter, process_time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.results import get_commit
+from configurations import EMA_ALPHA, LOGGER, SWEEP_PATH, TIMEZONE
+from experiment import parser as experiment_parser
+from gym_trading.utils.day_source import DayCache, DaySource, load_day
+
+# variables read by BLAS libraries and TensorFlow to size their thread pools
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                    'NUMEXPR_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS',
+                    'TF_NUM_INTEROP_THREADS')
+
+# columns at the front of the results table
+RESULT_COLUMNS = ['run', 'status', 'seconds', 'cpu_seconds', 'setup_seconds',
+                  'run_seconds', 'number_of_steps', 'steps_per_second']
+
+
+def expand_grid(spec: dict) -> list:
+    """
+    Expand a grid search specification into the parameters of each run.
+
+    :param spec: parameter name -> list of values (or a single value)
+    :return: (list of dict) parameters of every combination of values
+    """
+    names = list(spec.keys())
+    values = [v if isinstance(v, list) else [v] for v in spec.values()]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def sample_runs(spec: dict, number_of_runs: int, seed: int = 1) -> list:
+    """
+    Draw the parameters of random search runs.
+
+    :param spec: parameter name -> list of values to choose from, or a range
+        {'low': ..., 'high': ...} to draw uniformly from (integers if both bounds are
+        integers), or a single value
+    :param number_of_runs: number of runs
+    :param seed: random seed number
+    :return: (list of dict) parameters of each run
+    """
+    random_state = np.random.RandomState(seed=seed)
+    runs = list()
+    for _ in range(number_of_runs):
+        run = dict()
+        for name, value in spec.items():
+            if isinstance(value, list):
+                run[name] = value[random_state.randint(len(value))]
+            elif isinstance(value, dict):
+                low, high = value['low'], value['high']
+                if isinstance(low, int) and isinstance(high, int):
+                    run[name] = int(random_state.randint(low, high + 1))
+                else:
+                    run[name] = float(random_state.uniform(low, high))
+            else:
+                run[name] = value
+        runs.append(run)
+    return runs
+
+
+def get_runs(spec: dict, search: str = 'grid', number_of_runs: int = 10,
+             seed: int = 1, base: dict or None = None) -> list:
+    """
+    Get the keyword arguments of each run of a sweep.
+
+    :param spec: search specification (see `expand_grid()` and `sample_runs()`)
+    :param search: 'grid' or 'random'
+    :param number_of_runs: number of runs of a random search
+    :param seed: random seed number of a random search
+    :param base: keyword arguments shared by every run; defaults to the arguments of
+        `experiment.py`
+    :return: (list of dict) keyword arguments of each run
+    """
+    if base is None:
+        base = vars(experiment_parser.parse_args([]))
+    if search == 'grid':
+        runs = expand_grid(spec=spec)
+    elif search == 'random':
+        runs = sample_runs(spec=spec, number_of_runs=number_of_runs, seed=seed)
+    else:
+        raise ValueError('Unknown search: {}'.format(search))
+    return [dict(base, **run) for run in runs]
+
+
+def _get_day_arguments(kwargs: dict) -> tuple:
+    """
+    Get the arguments to prepare the trading day of a run.
+
+    :return: (tuple) fitting file, testing file, and EMA alpha
+    """
+    return kwargs['fitting_file'], kwargs['testing_file'], \
+        kwargs.get('ema_alpha', EMA_ALPHA)
+
+
+def prepare_days(runs: list, memmap_path: str) -> int:
+    """
+    Prepare the trading days of the runs once, and save them to a memory-mapped
+    cache shared by the runs (see `DayCache`).
+
+    :param runs: (list of dict) keyword arguments of each run
+    :param memmap_path: directory of the shared cache
+    :return: (int) number of days
+    """
+    cache = DayCache(memmap_path=memmap_path)
+    days = sorted(set(_get_day_arguments(kwargs=kwargs) for kwargs in runs),
+                  key=str)
+    for fitting_file, testing_file, ema_alpha in days:
+        key = DayCache.get_key(fitting_file=fitting_file, testing_file=testing_file,
+                               ema_alpha=ema_alpha)
+        if cache.get(key=key) is None:
+            cache.put(key=key, day=load_day(fitting_file=fitting_file,
+                                            testing_file=testing_file,
+                                            ema_alpha=ema_alpha))
+    LOGGER.info('Prepared {} days for the sweep in {}'.format(len(days), memmap_path))
+    return len(days)
+
+
+def run_experiment(kwargs: dict) -> dict:
+    """
+    Train or test a DQN agent (see `experiment.py`).
+
+    :param kwargs: keyword arguments of `agent.dqn.Agent`
+    :return: (dict) environment steps taken, and seconds spent creating the agent
+        and training (or testing) it
+    """
+    # imported here, so that Keras is only loaded in the worker processes
+    from agent.dqn import Agent
+    start_time = perf_counter()
+    agent = Agent(**kwargs)
+    setup_seconds = perf_counter() - start_time
+    LOGGER.info(f'Agent created. {agent}')
+    start_time = perf_counter()
+    agent.start()
+    return dict(number_of_steps=agent.number_of_steps, setup_seconds=setup_seconds,
+                run_seconds=perf_counter() - start_time)
+
+
+def _run(run_id: int, target, kwargs: dict, memmap_path: str or None,
+         output_path: str) -> dict:
+    """
+    Execute a run in a worker process, and measure its throughput.
+
+    :param run_id: run number
+    :param target: function running an experiment from keyword arguments, which
+        returns a dict of metrics (including 'number_of_steps' taken and, optionally,
+        the 'run_seconds' spent taking them)
+    :param kwargs: keyword arguments of the run
+    :param memmap_path: if provided, environments use the days in this shared cache
+    :param output_path: directory of the sweep's runs; each run writes its outputs
+        to its own 'run_<run_id>' subdirectory
+    :return: (dict) results of the run
+    """
+    result = dict(run=run_id, status='ok')
+    start_time, start_cpu_time = perf_counter(), process_time()
+    day_source = None
+    kwargs = dict(kwargs, output_directory=os.path.join(output_path,
+                                                        'run_{}'.format(run_id)))
+    try:
+        if memmap_path is not None:
+            fitting_file, testing_file, ema_alpha = _get_day_arguments(kwargs=kwargs)
+            # the environment keeps the same day for every episode
+            day_source = DaySource(days=[fitting_file, testing_file],
+                                   ema_alpha=ema_alpha, episodes_per_day=sys.maxsize,
+                                   cache=DayCache(memmap_path=memmap_path))
+            kwargs = dict(kwargs, day_source=day_source)
+        result.update(target(kwargs))
+    except Exception:
+        result.update(status='error', error=traceback.format_exc().splitlines()[-1])
+        LOGGER.warning('Run {} failed:\n{}'.format(run_id, traceback.format_exc()))
+    finally:
+        if day_source is not None:
+            day_source.close()
+
+    result['seconds'] = perf_counter() - start_time
+    result['cpu_seconds'] = process_time() - start_cpu_time
+    # throughput excludes the setup (e.g., importing Keras) when the target times it
+    result['steps_per_second'] = result.get('number_of_steps', np.nan) / \
+        result.get('run_seconds', result['seconds'])
+    return result
+
+
+@contextlib.contextmanager
+def thread_limits(threads: int):
+    """
+    Limit the threads of the BLAS libraries and TensorFlow in processes started
+    within the context, which inherit the environment variables.
+    """
+    previous = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    os.environ.update({variable: str(threads) for variable in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                del os.environ[variable]
+            else:
+                os.environ[variable] = value
+
+
+def run_sweep(runs: list, target=run_experiment, max_workers: int = 2,
+              threads_per_run: int = 1, share_days: bool = True,
+              keep_days: bool = False, path: str = SWEEP_PATH) -> pd.DataFrame:
+    """
+    Execute runs on a bounded pool of processes, and save a consolidated results
+    table.
+
+    :param runs: (list of dict) keyword arguments of each run (see `get_runs()`)
+    :param target: picklable function running an experiment from keyword arguments
+    :param max_workers: number of runs executed at the same time
+    :param threads_per_run: number of CPU threads used by each run's libraries, so
+        that parallel runs do not oversubscribe the cores
+    :param share_days: if TRUE, the trading days are prepared once and
+        memory-mapped by every run
+    :param keep_days: if TRUE, keep the shared days after the sweep, otherwise
+        delete them
+    :param path: directory of the results table, the shared days, and the outputs of
+        the runs (in '<sweep name>/run_<run id>')
+    :return: (pd.DataFrame) results of each run
+    """
+    name = 'sweep_{}_{}'.format(get_commit(), dt.now(tz=TIMEZONE).strftime(
+        '%Y%m%d-%H%M%S'))
+    memmap_path = os.path.join(path, name + '_days') if share_days else None
+    output_path = os.path.join(path, name)
+
+    start_time = perf_counter()
+    results = list()
+    try:
+        if memmap_path is not None:
+            prepare_days(runs=runs, memmap_path=memmap_path)
+
+        LOGGER.info('Starting {} runs on {} workers with {} threads each'.format(
+            len(runs), max_workers, threads_per_run))
+        with thread_limits(threads=threads_per_run), ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_run, run_id=i, target=target, kwargs=kwargs,
+                                       memmap_path=memmap_path,
+                                       output_path=output_path)
+                       for i, kwargs in enumerate(runs)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                LOGGER.info('Run {} finished ({}) in {:.1f} seconds [{}/{}]'.format(
+                    result['run'], result['status'], result['seconds'], len(results),
+                    len(runs)))
+    finally:
+        if memmap_path is not None and not keep_days:
+            shutil.rmtree(memmap_path, ignore_errors=True)
+            LOGGER.info('Deleted the shared days in {}'.format(memmap_path))
+
+    # swept parameters, i.e., the arguments that differ between runs
+    parameters = pd.DataFrame([{k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                                for k, v in kwargs.items()} for kwargs in runs])
+    parameters = parameters.loc[:, parameters.nunique(dropna=False) > 1]
+    table = pd.DataFrame(results).sort_values('run').set_index('run', drop=False)
+    table = table.join(parameters)
+    columns = [c for c in RESULT_COLUMNS if c in table.columns]
+    table = table[columns + [c for c in table.columns if c not in columns]]
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+    filename = os.path.join(path, name + '.csv')
+    table.to_csv(filename, index=False)
+    LOGGER.info('Sweep of {} runs finished in {:.1f} seconds; saved results to {}\n'
+                '{}'.format(len(runs), perf_counter() - start_time, filename,
+                            table.to_string(index=False)))
+    return table
+
+
+def get_target(name: str):
+    """
+    Import a run target.
+
+    :param name: 'module:function'
+    :return: function
+    """
+    module, function = name.split(':')
+    return getattr(importlib.import_module(module), function)
+
+
+if __name__ == '__main__':
+    sweep_parser = argparse.ArgumentParser(
+        description='Run experiment.py over a grid or random search of arguments.')
+    sweep_parser.add_argument('spec',
+                              help="JSON file mapping experiment arguments to lists "
+                                   "of values, or to ranges {'low': ..., 'high': ...} "
+                                   "for random search (e.g., {\"reward_type\": "
+                                   "[\"default\", \"asymmetrical\"], \"seed\": [1, 2]})",
+                              type=str)
+    sweep_parser.add_argument('--search',
+                              default='grid',
+                              choices=['grid', 'random'],
+                              help="Expand every combination, or draw random runs",
+                              type=str)
+    sweep_parser.add_argument('--number_of_runs',
+                              default=10,
+                              help="Number of runs of a random search",
+                              type=int)
+    sweep_parser.add_argument('--seed',
+                              default=1,
+                              help="Random number seed of a random search",
+                              type=int)
+    sweep_parser.add_argument('--max_workers',
+                              default=max(multiprocessing.cpu_count() // 2, 1),
+                              help="Number of runs executed at the same time",
+                              type=int)
+    sweep_parser.add_argument('--threads_per_run',
+                              default=1,
+                              help="Number of CPU threads used by each run",
+                              type=int)
+    sweep_parser.add_argument('--keep_days',
+                              default=False,
+                              help="If TRUE, keep the trading days prepared for the "
+                                   "sweep",
+                              type=bool)
+    sweep_parser.add_argument('--target',
+                              default='sweep:run_experiment',
+                              help="Function executing a run, as 'module:function'",
+                              type=str)
+    sweep_args = sweep_parser.parse_args()
+
+    with open(sweep_args.spec, 'r') as f:
+        sweep_spec = json.load(f)
+    run_sweep(runs=get_runs(spec=sweep_spec, search=sweep_args.search,
+                            number_of_runs=sweep_args.number_of_runs,
+                            seed=sweep_args.seed),
+              target=get_target(name=sweep_args.target),
+              max_workers=sweep_args.max_workers,
+              threads_per_run=sweep_args.threads_per_run,
+              keep_days=sweep_args.keep_days)